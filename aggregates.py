@@ -0,0 +1,129 @@
+import os
+import pandas as pd
+from data_utils import get_feedback_data
+import figure_cache
+import local_mirror
+from snapshot import feedback_snapshot
+
+# Agrégats partagés par les onglets : un cube heure × sentiment × note calculé une seule fois
+# par (filtres, version des données) et mis en cache, dont tous les graphiques sont des tranches.
+# Au-delà de ROLLUP_SPAN (période où les séries temporelles ne sont plus tracées à l'heure), le cube mis en
+# cache est regroupé par jour : sa taille suit le nombre de jours et non plus d'heures d'historique
+# (la colonne 'hour' contient alors le début de chaque jour).
+
+SENTIMENTS = ['positive', 'neutral', 'negative']
+
+# Séries temporelles : nombre de points borné quelle que soit la durée de la période affichée
+MAX_TIME_POINTS = int(os.getenv("TIME_SERIES_MAX_POINTS", "400"))
+TREND_WINDOW = 3
+# Pas de regroupement candidats, du plus fin au plus grossier, avec leur durée minimale
+TIME_BINS = [
+    ('h', pd.Timedelta(hours=1)),
+    ('D', pd.Timedelta(days=1)),
+    ('W-MON', pd.Timedelta(days=7)),
+    ('MS', pd.Timedelta(days=28)),
+    ('QS', pd.Timedelta(days=90)),
+    ('YS', pd.Timedelta(days=365)),
+]
+ROLLUP_SPAN = pd.Timedelta(hours=MAX_TIME_POINTS - 2)  # Pas horaire impossible au-delà (choose_time_bin)
+
+
+def build_cube(df):
+    if df.empty:
+        return pd.DataFrame({'hour': pd.Series(dtype='datetime64[ns]'), 'sentiment': pd.Series(dtype='object'),
+                             'rating': pd.Series(dtype='float64'), 'count': pd.Series(dtype='int64')})
+    hours = pd.to_datetime(df['timestamp']).dt.floor('h')
+    # dropna=False : les commentaires sans sentiment comptent dans les distributions de notes
+    return (df.assign(hour=hours)
+              .groupby(['hour', 'sentiment', 'rating'], dropna=False)
+              .size()
+              .rename('count')
+              .reset_index())
+
+
+# Regroupement par jour des cubes couvrant plus de ROLLUP_SPAN
+def rollup(cube):
+    if cube.empty or cube['hour'].max() - cube['hour'].min() <= ROLLUP_SPAN:
+        return cube
+    return (cube.assign(hour=cube['hour'].dt.floor('D'))
+                .groupby(['hour', 'sentiment', 'rating'], dropna=False)['count']
+                .sum()
+                .reset_index())
+
+
+# Cube en cache ; `df` évite un rechargement si le callback a déjà les données filtrées
+def get_cube(filters, df=None):
+    key = figure_cache.make_key('cube', filters, '')
+    cube = figure_cache.get(key)
+    if cube is not figure_cache.MISSING:
+        return cube
+    mirror = local_mirror.mirror_for(filters) if df is None else None
+    if mirror is not None:
+        cube = mirror.cube(filters)  # Agrégé en SQL sur le miroir local
+    elif feedback_snapshot is not None and not any((filters or {}).values()):
+        cube = feedback_snapshot.cube()  # Cube de l'instantané complété par le delta
+    else:
+        cube = build_cube(df if df is not None else get_feedback_data(filters))
+    cube = rollup(cube)
+    figure_cache.put(key, cube)
+    return cube
+
+
+def total(cube):
+    return int(cube['count'].sum())
+
+
+def mean_rating(cube):
+    rated = cube.dropna(subset=['rating'])
+    count = rated['count'].sum()
+    return float((rated['rating'] * rated['count']).sum() / count) if count else 0.0
+
+
+# Nombre de commentaires par note (équivalent de df['rating'].value_counts().sort_index())
+def rating_counts(cube):
+    return cube.dropna(subset=['rating']).groupby('rating')['count'].sum().sort_index()
+
+
+# Nombre de commentaires par sentiment (sans les commentaires non classés)
+def sentiment_counts(cube):
+    return cube.dropna(subset=['sentiment']).groupby('sentiment')['count'].sum()
+
+
+# Tableau croisé sentiment × note (équivalent de df.groupby(['sentiment', 'rating']).size().unstack(fill_value=0))
+def sentiment_by_rating(cube):
+    rated = cube.dropna(subset=['sentiment', 'rating'])
+    return rated.pivot_table(index='sentiment', columns='rating', values='count', aggfunc='sum', fill_value=0)
+
+
+# Nombre de commentaires par heure (par jour si le cube a été regroupé)
+def hourly_counts(cube):
+    return cube.groupby('hour')['count'].sum().sort_index()
+
+
+# Pas le plus fin dont le nombre de points sur [start, end] reste sous MAX_TIME_POINTS
+def choose_time_bin(start, end):
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    for freq, duration in TIME_BINS:
+        if span / duration + 2 <= MAX_TIME_POINTS:
+            return freq
+    return TIME_BINS[-1][0]
+
+
+# Série temporelle prête à tracer : effectif par pas, tendance (moyenne glissante) et cumul.
+# La fenêtre est celle du filtre de dates si elle est fournie, sinon l'étendue des données.
+def time_series(cube, date_range=None):
+    counts = hourly_counts(cube)
+    if counts.empty:
+        return 'D', pd.DataFrame(columns=['timestamp', 'counts', 'trend', 'cumulative'])
+    start, end = counts.index.min(), counts.index.max()
+    if date_range and date_range[0] and date_range[1]:
+        start = max(start, pd.Timestamp(date_range[0]))
+        end = min(end, pd.Timestamp(date_range[1]))
+    freq = choose_time_bin(start, end)
+    binned = counts.resample(freq, label='left', closed='left').sum()
+    series = pd.DataFrame({
+        'counts': binned,
+        'trend': binned.rolling(window=TREND_WINDOW).mean(),
+        'cumulative': binned.cumsum(),
+    }).rename_axis('timestamp').reset_index()
+    return freq, series
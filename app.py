@@ -3,22 +3,26 @@ import dash
 from dash import html, dcc, callback, Output, Input, State, ALL
 import dash_bootstrap_components as dbc
 import pandas as pd
-from sqlalchemy import create_engine
-import re
 from datetime import datetime, timedelta
 from collections import Counter
 import io
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Image, Spacer
+from reportlab.lib.units import inch
 from reportlab.lib.styles import getSampleStyleSheet
+from flask import jsonify
 from data_utils import get_feedback_data
+import profiling
+import change_feed
+import filter_metadata
+import local_mirror
+import reports
 
 # Configuration de la connexion à Supabase
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("La variable d'environnement DATABASE_URL n'est pas définie")
-engine = create_engine(DATABASE_URL)
 
 # Initialisation de l'application Dash avec un thème Bootstrap et Font Awesome
 app = dash.Dash(__name__, update_title=None, external_stylesheets=[dbc.themes.BOOTSTRAP, 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css'], suppress_callback_exceptions=True)
@@ -27,6 +31,12 @@ app.title = "Feedback"
 
 server = app.server  # Expose Flask server pour endpoints custom
 
+# Profilage des callbacks (temps, DB, lignes, taille de réponse) exposé sur /metrics
+profiling.init_app(app)
+
+# Version des données poussée par LISTEN/NOTIFY (ou polling léger) exposée sur /version et /events
+change_feed.init_app(app)
+
 # Dictionnaire pour le multilinguisme
 translations = {
     'fr': {
@@ -104,31 +114,55 @@ translations = {
 def health_check():
     return jsonify({"status": "ok"})
     
-# Calcul des KPI avec évolution sur 1 semaine
-def calculate_kpis(df):
+# Statistiques brutes d'une fenêtre de commentaires (comparées d'une semaine à l'autre)
+def _period_values(df):
     total_comments = len(df)
-    avg_rating = df['rating'].mean() if total_comments > 0 else 0
-    sentiment_counts = df['sentiment'].value_counts().to_dict()
-    positive = sentiment_counts.get('positive', 0)
-    neutral = sentiment_counts.get('neutral', 0)
-    negative = sentiment_counts.get('negative', 0)
-    top_ratings = len(df[df['rating'] == df['rating'].max()]) if total_comments > 0 else 0
-    hourly_freq = df['timestamp'].dt.hour.value_counts().idxmax() if total_comments > 0 and not df['timestamp'].empty else 'N/A'
-    lang_counts = df['language'].value_counts().to_dict()
-    dominant_lang = max(lang_counts.items(), key=lambda x: x[1])[0] if lang_counts else 'N/A'
-    dominant_lang_count = lang_counts.get(dominant_lang, 0)
-    emoji_count = df['comment'].str.contains(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F700-\U0001F77F\U0001F780-\U0001F7FF\U0001F800-\U0001F8FF\U0001F900-\U0001F9FF\U0001FA00-\U0001FA6F\U0001FA70-\U0001FAFF\U00002702-\U000027B0\U000024C2-\U0001F251]').sum()
-    unique_users = df['unique_code'].nunique()
-    min_rating = df['rating'].min() if total_comments > 0 else 0
+    sentiment_counts = df['sentiment'].value_counts()
     time_diffs = df['timestamp'].sort_values().diff().dt.total_seconds() / 3600
-    avg_time_between = time_diffs.mean() if len(time_diffs) > 1 else 0
-    avg_hourly_freq = total_comments / (24 * 7 if total_comments > 0 else 1)
+    return {
+        'total_comments': total_comments,
+        'avg_rating': df['rating'].mean() if total_comments > 0 else 0,
+        'positive': sentiment_counts.get('positive', 0),
+        'neutral': sentiment_counts.get('neutral', 0),
+        'negative': sentiment_counts.get('negative', 0),
+        'top_ratings': len(df[df['rating'] == df['rating'].max()]) if total_comments > 0 else 0,
+        'min_rating': df['rating'].min() if total_comments > 0 else 0,
+        'unique_users': df['unique_code'].nunique(),
+        'emoji_count': int(df['has_emoji'].sum()),  # Colonne précalculée (comment_features)
+        'avg_time_between': time_diffs.mean() if len(time_diffs) > 1 else 0,
+        'avg_hourly_freq': total_comments / (24 * 7 if total_comments > 0 else 1),
+    }
+
+
+# Valeurs brutes des KPI à partir des lignes (même forme que local_mirror.LocalMirror.kpi_values)
+def kpi_values(df):
+    values = _period_values(df)
+    total_comments = values['total_comments']
+    values['peak_hour'] = df['timestamp'].dt.hour.value_counts().idxmax() if total_comments > 0 and not df['timestamp'].empty else 'N/A'
+    lang_counts = df['language'].value_counts().to_dict()
+    values['dominant_lang'] = max(lang_counts.items(), key=lambda x: x[1])[0] if lang_counts else 'N/A'
+    values['dominant_lang_count'] = lang_counts.get(values['dominant_lang'], 0)
+    # Emojis extraits une fois par commentaire (colonne emojis), comptés sur la chaîne concaténée
+    all_emojis = ''.join(df['emojis'])
+    values['top_emojis'] = Counter(all_emojis).most_common(3) if all_emojis else []
 
-    # Calcul de l'évolution sur les dernières 7 jours
-    now = datetime.now()
-    one_week_ago = now - timedelta(days=7)
-    df_recent = df[df['timestamp'] >= one_week_ago]
-    df_previous = df[df['timestamp'] < one_week_ago]
+    # Période de comparaison : commentaires antérieurs aux 7 derniers jours
+    one_week_ago = datetime.now() - timedelta(days=7)
+    values['previous'] = _period_values(df[df['timestamp'] < one_week_ago])
+    return values
+
+
+# Valeurs des KPI pour des filtres : agrégats SQL du miroir local s'il est activé, sinon calcul sur les lignes
+def get_kpi_values(filters):
+    mirror = local_mirror.mirror_for(filters)
+    if mirror is not None:
+        return mirror.kpi_values(filters)
+    return kpi_values(get_feedback_data(filters))
+
+
+# Calcul des KPI avec évolution sur 1 semaine
+def calculate_kpis(values):
+    previous = values['previous']
 
     def calculate_change(current, previous):
         if previous == 0:
@@ -136,32 +170,6 @@ def calculate_kpis(df):
         change = ((current - previous) / abs(previous)) * 100
         return max(min(change, 99.99), -99.99)
 
-    total_comments_prev = len(df_previous)
-    avg_rating_prev = df_previous['rating'].mean() if total_comments_prev > 0 else 0
-    positive_prev = df_previous['sentiment'].value_counts().get('positive', 0)
-    neutral_prev = df_previous['sentiment'].value_counts().get('neutral', 0)
-    negative_prev = df_previous['sentiment'].value_counts().get('negative', 0)
-    top_ratings_prev = len(df_previous[df_previous['rating'] == df_previous['rating'].max()]) if total_comments_prev > 0 else 0
-    min_rating_prev = df_previous['rating'].min() if total_comments_prev > 0 else 0
-    time_diffs_prev = df_previous['timestamp'].sort_values().diff().dt.total_seconds() / 3600
-    avg_time_between_prev = time_diffs_prev.mean() if len(time_diffs_prev) > 1 else 0
-    avg_hourly_freq_prev = total_comments_prev / (24 * 7 if total_comments_prev > 0 else 1)
-    unique_users_prev = df_previous['unique_code'].nunique()
-    emoji_count_prev = df_previous['comment'].str.contains(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F700-\U0001F77F\U0001F780-\U0001F7FF\U0001F800-\U0001F8FF\U0001F900-\U0001F9FF\U0001FA00-\U0001FA6F\U0001FA70-\U0001FAFF\U00002702-\U000027B0\U000024C2-\U0001F251]').sum()
-
-    # Évolution en pourcentage
-    total_comments_change = calculate_change(total_comments, total_comments_prev)
-    avg_rating_change = calculate_change(avg_rating, avg_rating_prev)
-    positive_change = calculate_change(positive, positive_prev)
-    neutral_change = calculate_change(neutral, neutral_prev)
-    negative_change = calculate_change(negative, negative_prev)
-    top_ratings_change = calculate_change(top_ratings, top_ratings_prev)
-    min_rating_change = calculate_change(min_rating, min_rating_prev)
-    avg_time_between_change = calculate_change(avg_time_between, avg_time_between_prev)
-    avg_hourly_freq_change = calculate_change(avg_hourly_freq, avg_hourly_freq_prev)
-    unique_users_change = calculate_change(unique_users, unique_users_prev)
-    emoji_count_change = calculate_change(emoji_count, emoji_count_prev)
-
     # Icône et couleur selon l'évolution
     def get_trend_icon(change):
         if change > 0:
@@ -171,55 +179,42 @@ def calculate_kpis(df):
         else:
             return (html.I(className="fas fa-minus", style={"color": "orange"}), "0%")
 
-    emoji_pattern = re.compile(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F700-\U0001F77F\U0001F780-\U0001F7FF\U0001F800-\U0001F8FF\U0001F900-\U0001F9FF\U0001FA00-\U0001FA6F\U0001FA70-\U0001FAFF\U00002702-\U000027B0\U000024C2-\U0001F251]')
-    all_emojis = []
-    for comment in df['comment']:
-        emojis = emoji_pattern.findall(comment)
-        all_emojis.extend(emojis)
-    top_emojis = Counter(all_emojis).most_common(3) if all_emojis else []
-
-    return {
-        'total_comments': total_comments,
-        'avg_rating': round(avg_rating, 2),
-        'positive': positive,
-        'neutral': neutral,
-        'negative': negative,
-        'top_ratings': top_ratings,
-        'peak_hour': hourly_freq,
-        'dominant_lang': dominant_lang,
-        'dominant_lang_count': dominant_lang_count,
-        'emoji_count': emoji_count,
-        'unique_users': unique_users,
-        'min_rating': min_rating,
-        'avg_time_between': round(avg_time_between, 2),
-        'avg_hourly_freq': round(avg_hourly_freq, 2),
-        'top_emojis': top_emojis,
-        'total_comments_trend': get_trend_icon(total_comments_change),
-        'avg_rating_trend': get_trend_icon(avg_rating_change),
-        'positive_trend': get_trend_icon(positive_change),
-        'neutral_trend': get_trend_icon(neutral_change),
-        'negative_trend': get_trend_icon(negative_change),
-        'top_ratings_trend': get_trend_icon(top_ratings_change),
-        'min_rating_trend': get_trend_icon(min_rating_change),
-        'avg_time_between_trend': get_trend_icon(avg_time_between_change),
-        'avg_hourly_freq_trend': get_trend_icon(avg_hourly_freq_change),
-        'unique_users_trend': get_trend_icon(unique_users_change),
-        'emoji_count_trend': get_trend_icon(emoji_count_change)
+    kpis = {
+        'total_comments': values['total_comments'],
+        'avg_rating': round(values['avg_rating'], 2),
+        'positive': values['positive'],
+        'neutral': values['neutral'],
+        'negative': values['negative'],
+        'top_ratings': values['top_ratings'],
+        'peak_hour': values['peak_hour'],
+        'dominant_lang': values['dominant_lang'],
+        'dominant_lang_count': values['dominant_lang_count'],
+        'emoji_count': values['emoji_count'],
+        'unique_users': values['unique_users'],
+        'min_rating': values['min_rating'],
+        'avg_time_between': round(values['avg_time_between'], 2),
+        'avg_hourly_freq': round(values['avg_hourly_freq'], 2),
+        'top_emojis': values['top_emojis'],
     }
-
-# Modal pour les filtres sur petits écrans
-filter_modal = dbc.Modal(
-    [
-        dbc.ModalHeader(dbc.ModalTitle(translations['fr']['filters'])),
+    # Évolution en pourcentage par rapport à la période précédente
+    for name in ('total_comments', 'avg_rating', 'positive', 'neutral', 'negative', 'top_ratings', 'min_rating',
+                 'avg_time_between', 'avg_hourly_freq', 'unique_users', 'emoji_count'):
+        kpis[f'{name}_trend'] = get_trend_icon(calculate_change(values[name], previous[name]))
+    return kpis
+
+# Contenu du modal pour les filtres sur petits écrans (partagé par le layout et le changement de langue)
+def build_filter_modal_content(t):
+    return [
+        dbc.ModalHeader(dbc.ModalTitle(t['filters'])),
         dbc.ModalBody([
             # Filtre Langue
             dbc.Row([
                 html.I(className="fas fa-globe"),
                 dcc.Dropdown(
                     id='filter-language-modal',
-                    options=[{'label': lang, 'value': lang} for lang in pd.read_sql_query("SELECT DISTINCT language FROM feedback", engine)['language'].dropna().unique()],
+                    options=filter_metadata.language_options(),
                     multi=True,
-                    placeholder=translations['fr']['filter_language']
+                    placeholder=t['filter_language']
                 )
             ], className="mb-3"),
             # Filtre Sentiment
@@ -254,14 +249,36 @@ filter_modal = dbc.Modal(
                 html.I(className="fas fa-calendar"),
                 dcc.DatePickerRange(
                     id='filter-date-modal',
-                    start_date=pd.read_sql_query("SELECT MIN(timestamp)::text AS min_timestamp FROM feedback", engine)['min_timestamp'][0],
+                    start_date=filter_metadata.default_start_date(),
                     end_date=pd.to_datetime('today'),
                     display_format='YYYY-MM-DD'
                 )
             ], className="mb-3"),
+            # Filtre Recherche texte (index plein texte)
+            dbc.Row([
+                html.I(className="fas fa-search"),
+                dcc.Input(
+                    id='filter-text-search-modal',
+                    type='search',
+                    debounce=0.5,
+                    placeholder=t['filter_text_search'],
+                    className="form-control"
+                )
+            ], className="mb-3"),
+            # Filtre Code unique (historique d'un répondant)
+            dbc.Row([
+                html.I(className="fas fa-user"),
+                dcc.Input(
+                    id='filter-unique-code-modal',
+                    type='text',
+                    debounce=True,
+                    placeholder=t['filter_unique_code'],
+                    className="form-control"
+                )
+            ], className="mb-3"),
             # Bouton de téléchargement PDF dans le modal
             dbc.Button(
-                [html.I(className="fas fa-download"), " ", translations['fr']['download_pdf']],
+                [html.I(className="fas fa-download"), " ", t['download_pdf']],
                 id='download-pdf-modal',
                 color="success",
                 className="mt-3"
@@ -270,140 +287,166 @@ filter_modal = dbc.Modal(
         dbc.ModalFooter(
             dbc.Button("Close", id="close-filter-modal", className="ml-auto")
         ),
-    ],
-    id="filter-modal",
-    is_open=False,
-)
+    ]
 
-# Layout de l'application
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    dbc.Navbar(
-        [
-            # Logo à gauche
-            dbc.NavbarBrand(
-                html.Img(src=app.get_asset_url('logo.png'), height="40px"),
-                className="ms-2"
-            ),
-            # Titre centré
-            dbc.NavbarBrand(
-                id="navbar-title",
-                className="mx-auto"
-            ),
-            # Bouton hamburger pour filtres sur petits écrans
-            dbc.NavbarToggler(id="navbar-toggler", n_clicks=0, className="d-md-none"),
-            # Contenu à droite (langue et retour)
-            dbc.Nav(
-                [
-                    # Sélection de langue
-                    dbc.DropdownMenu(
-                        label=[html.I(className="fas fa-globe"), " Language"],
-                        nav=True,
-                        in_navbar=True,
-                        align_end=True,
-                        children=[
-                            dbc.DropdownMenuItem("Français", id="lang-fr"),
-                            dbc.DropdownMenuItem("English", id="lang-en"),
-                        ],
-                    ),
-                    # Bouton de retour à l'accueil
-                    dbc.Button(
-                        [html.I(className="fas fa-arrow-left"), " Home"],
-                        id="home-button",
-                        color="primary",
-                        className="ms-2",
-                        n_clicks=0
-                    ),
-                ],
-                className="ms-auto",
-                navbar=True,
-            ),
-        ],
-        color="#2c3e50",
-        dark=True,
-        className="mb-4"
-    ),
-    dbc.Tabs([
-        dbc.Tab(label=translations['fr']['tab_sentiment'], tab_id="tab-sentiment", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-sentiment-icon"),
-        dbc.Tab(label=translations['fr']['tab_evolution'], tab_id="tab-evolution", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-evolution-icon"),
-        dbc.Tab(label=translations['fr']['tab_frequence'], tab_id="tab-frequence", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-frequence-icon"),
-        dbc.Tab(label=translations['fr']['tab_comparaison'], tab_id="tab-comparaison", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-comparaison-icon"),
-        dbc.Tab(label=translations['fr']['tab_regroupement'], tab_id="tab-regroupement", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-regroupement-icon"),
-    ], id="tabs", active_tab="tab-sentiment", className="nav-tabs-custom"),
-    dbc.Row([
-        # Barre latérale des filtres (visible uniquement sur grands écrans, largeur ajustée)
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader(html.H5([html.I(className="fas fa-filter"), " Filtres"], className="mb-0")),
-                dbc.CardBody([
-                    # Filtre Langue
-                    dbc.Row([
-                        html.I(className="fas fa-globe"),
-                        dcc.Dropdown(
-                            id='filter-language',
-                            options=[{'label': lang, 'value': lang} for lang in pd.read_sql_query("SELECT DISTINCT language FROM feedback", engine)['language'].dropna().unique()],
-                            multi=True,
-                            placeholder=translations['fr']['filter_language']
-                        )
-                    ], className="mb-3"),
-                    # Filtre Sentiment
-                    dbc.Row([
-                        html.I(className="fas fa-heart"),
-                        dbc.Checklist(
-                            id='filter-sentiment',
-                            options=[
-                                {'label': [html.I(className="fas fa-smile"), " Positive"], 'value': 'positive'},
-                                {'label': [html.I(className="fas fa-meh"), " Neutral"], 'value': 'neutral'},
-                                {'label': [html.I(className="fas fa-frown"), " Negative"], 'value': 'negative'}
+# Layout de l'application (construit à chaque chargement de page, sans requête SQL au démarrage)
+def serve_layout():
+    t = translations['fr']
+    return html.Div([
+        dcc.Location(id='url', refresh=False),
+        dbc.Navbar(
+            [
+                # Logo à gauche
+                dbc.NavbarBrand(
+                    html.Img(src=app.get_asset_url('logo.png'), height="40px"),
+                    className="ms-2"
+                ),
+                # Titre centré
+                dbc.NavbarBrand(
+                    id="navbar-title",
+                    className="mx-auto"
+                ),
+                # Bouton hamburger pour filtres sur petits écrans
+                dbc.NavbarToggler(id="navbar-toggler", n_clicks=0, className="d-md-none"),
+                # Contenu à droite (langue et retour)
+                dbc.Nav(
+                    [
+                        # Sélection de langue
+                        dbc.DropdownMenu(
+                            label=[html.I(className="fas fa-globe"), " Language"],
+                            nav=True,
+                            in_navbar=True,
+                            align_end=True,
+                            children=[
+                                dbc.DropdownMenuItem("Français", id="lang-fr"),
+                                dbc.DropdownMenuItem("English", id="lang-en"),
                             ],
-                            value=[],
-                            inline=True
-                        )
-                    ], className="mb-3"),
-                    # Filtre Note
-                    dbc.Row([
-                        html.I(className="fas fa-star"),
-                        dcc.RangeSlider(
-                            id='filter-rating',
-                            min=0,
-                            max=5,
-                            step=0.5,
-                            value=[0, 5],
-                            marks={i: str(i) for i in range(0, 6)},
-                            tooltip={"placement": "bottom", "always_visible": True}
-                        )
-                    ], className="mb-3"),
-                    # Filtre Date
-                    dbc.Row([
-                        html.I(className="fas fa-calendar"),
-                        dcc.DatePickerRange(
-                            id='filter-date',
-                            start_date=pd.read_sql_query("SELECT MIN(timestamp)::text AS min_timestamp FROM feedback", engine)['min_timestamp'][0],
-                            end_date=pd.to_datetime('today'),
-                            display_format='YYYY-MM-DD'
-                        )
-                    ], className="mb-3"),
-                    # Bouton de téléchargement PDF
-                    dbc.Button(
-                        [html.I(className="fas fa-download"), " ", translations['fr']['download_pdf']],
-                        id='download-pdf',
-                        color="success",
-                        className="mt-3"
-                    ),
-                ])
-            ], style={"height": "100%", "position": "sticky", "top": "10px"})
-        ], width={"size": 2, "order": "first"}, className="d-none d-md-block", style={"padding": "10px", "background-color": "#f8f9fa"}),
-        # Contenu principal (étendu sur grands écrans)
-        dbc.Col([
-            html.Div(id="tab-content", className="p-4")
-        ], width={"size": 10, "order": "last"}, className="col-md-10 col-lg-10"),
-    ]),
-    filter_modal,  # Ajout du modal pour petits écrans
-    dcc.Store(id='language-store', data='fr'),  # Stocke la langue sélectionnée
-    dcc.Store(id='filters-store', data={}),  # Stocke les filtres appliqués
-    dcc.Download(id="download"),  # Composant de téléchargement explicite
-    dcc.Interval(id='interval-component', interval=5000, n_intervals=0)  # Mise à jour toutes les 5 secondes
-])
+                        ),
+                        # Bouton de retour à l'accueil
+                        dbc.Button(
+                            [html.I(className="fas fa-arrow-left"), " Home"],
+                            id="home-button",
+                            color="primary",
+                            className="ms-2",
+                            n_clicks=0
+                        ),
+                    ],
+                    className="ms-auto",
+                    navbar=True,
+                ),
+            ],
+            color="#2c3e50",
+            dark=True,
+            className="mb-4"
+        ),
+        dbc.Tabs([
+            dbc.Tab(label=translations['fr']['tab_sentiment'], tab_id="tab-sentiment", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-sentiment-icon"),
+            dbc.Tab(label=translations['fr']['tab_evolution'], tab_id="tab-evolution", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-evolution-icon"),
+            dbc.Tab(label=translations['fr']['tab_frequence'], tab_id="tab-frequence", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-frequence-icon"),
+            dbc.Tab(label=translations['fr']['tab_comparaison'], tab_id="tab-comparaison", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-comparaison-icon"),
+            dbc.Tab(label=translations['fr']['tab_regroupement'], tab_id="tab-regroupement", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-regroupement-icon"),
+        ], id="tabs", active_tab="tab-sentiment", className="nav-tabs-custom"),
+        dbc.Row([
+            # Barre latérale des filtres (visible uniquement sur grands écrans, largeur ajustée)
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(html.H5([html.I(className="fas fa-filter"), " Filtres"], className="mb-0")),
+                    dbc.CardBody([
+                        # Filtre Langue
+                        dbc.Row([
+                            html.I(className="fas fa-globe"),
+                            dcc.Dropdown(
+                                id='filter-language',
+                                options=filter_metadata.language_options(),
+                                multi=True,
+                                placeholder=translations['fr']['filter_language']
+                            )
+                        ], className="mb-3"),
+                        # Filtre Sentiment
+                        dbc.Row([
+                            html.I(className="fas fa-heart"),
+                            dbc.Checklist(
+                                id='filter-sentiment',
+                                options=[
+                                    {'label': [html.I(className="fas fa-smile"), " Positive"], 'value': 'positive'},
+                                    {'label': [html.I(className="fas fa-meh"), " Neutral"], 'value': 'neutral'},
+                                    {'label': [html.I(className="fas fa-frown"), " Negative"], 'value': 'negative'}
+                                ],
+                                value=[],
+                                inline=True
+                            )
+                        ], className="mb-3"),
+                        # Filtre Note
+                        dbc.Row([
+                            html.I(className="fas fa-star"),
+                            dcc.RangeSlider(
+                                id='filter-rating',
+                                min=0,
+                                max=5,
+                                step=0.5,
+                                value=[0, 5],
+                                marks={i: str(i) for i in range(0, 6)},
+                                tooltip={"placement": "bottom", "always_visible": True}
+                            )
+                        ], className="mb-3"),
+                        # Filtre Date
+                        dbc.Row([
+                            html.I(className="fas fa-calendar"),
+                            dcc.DatePickerRange(
+                                id='filter-date',
+                                start_date=filter_metadata.default_start_date(),
+                                end_date=pd.to_datetime('today'),
+                                display_format='YYYY-MM-DD'
+                            )
+                        ], className="mb-3"),
+                        # Filtre Recherche texte (index plein texte)
+                        dbc.Row([
+                            html.I(className="fas fa-search"),
+                            dcc.Input(
+                                id='filter-text-search',
+                                type='search',
+                                debounce=0.5,
+                                placeholder=translations['fr']['filter_text_search'],
+                                className="form-control"
+                            )
+                        ], className="mb-3"),
+                        # Filtre Code unique (historique d'un répondant)
+                        dbc.Row([
+                            html.I(className="fas fa-user"),
+                            dcc.Input(
+                                id='filter-unique-code',
+                                type='text',
+                                debounce=True,
+                                placeholder=translations['fr']['filter_unique_code'],
+                                className="form-control"
+                            )
+                        ], className="mb-3"),
+                        # Bouton de téléchargement PDF
+                        dbc.Button(
+                            [html.I(className="fas fa-download"), " ", translations['fr']['download_pdf']],
+                            id='download-pdf',
+                            color="success",
+                            className="mt-3"
+                        ),
+                    ])
+                ], style={"height": "100%", "position": "sticky", "top": "10px"})
+            ], width={"size": 2, "order": "first"}, className="d-none d-md-block", style={"padding": "10px", "background-color": "#f8f9fa"}),
+            # Contenu principal (étendu sur grands écrans)
+            dbc.Col([
+                html.Div(id="tab-content", className="p-4")
+            ], width={"size": 10, "order": "last"}, className="col-md-10 col-lg-10"),
+        ]),
+        dbc.Modal(build_filter_modal_content(t), id="filter-modal", is_open=False),  # Ajout du modal pour petits écrans
+        dcc.Store(id='language-store', data='fr'),  # Stocke la langue sélectionnée
+        dcc.Store(id='filters-store', data={}),  # Stocke les filtres appliqués
+        dcc.Download(id="download"),  # Composant de téléchargement explicite
+        dcc.Store(id='pdf-job'),  # Job de génération du rapport PDF en cours
+        dcc.Interval(id='pdf-poll', interval=1000, disabled=True),  # Suivi du job PDF (actif seulement pendant la génération)
+        dcc.Store(id='data-version', data=change_feed.current_version()),  # Version des données affichées
+        dcc.Interval(id='interval-component', interval=5000, n_intervals=0)  # Vérification de la version toutes les 5 secondes
+    ])
+
+app.layout = serve_layout
 
 # Callback pour ajouter les icônes dynamiquement sans doublons
 app.clientside_callback(
@@ -438,6 +481,29 @@ app.clientside_callback(
     Input('tabs', 'children')
 )
 
+# Callback pour propager la version des données : les onglets ne se recalculent que si elle change
+@callback(
+    Output('data-version', 'data'),
+    Input('interval-component', 'n_intervals'),
+    State('data-version', 'data')
+)
+def check_data_version(n_intervals, current_version):
+    version = change_feed.current_version()
+    if version == current_version:
+        return dash.no_update
+    return version
+
+# Callback pour ajouter les nouvelles langues aux filtres lorsque les données changent (métadonnées en cache)
+@callback(
+    Output('filter-language', 'options'),
+    Output('filter-language-modal', 'options'),
+    Input('data-version', 'data'),
+    prevent_initial_call=True
+)
+def refresh_filter_options(data_version):
+    options = filter_metadata.language_options()
+    return options, options
+
 # Callback pour changer la langue
 @callback(
     Output('language-store', 'data'),
@@ -474,68 +540,7 @@ def update_language_content(language):
         dbc.Tab(label=t['tab_comparaison'], tab_id="tab-comparaison", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-comparaison-icon"),
         dbc.Tab(label=t['tab_regroupement'], tab_id="tab-regroupement", label_style={"color": "#34495e"}, active_label_style={"color": "#ffffff", "background-color": "#2c3e50"}, className="tab-with-icon", id="tab-regroupement-icon"),
     ]
-    modal_content = [
-        dbc.ModalHeader(dbc.ModalTitle(t['filters'])),
-        dbc.ModalBody([
-            # Filtre Langue
-            dbc.Row([
-                html.I(className="fas fa-globe"),
-                dcc.Dropdown(
-                    id='filter-language-modal',
-                    options=[{'label': lang, 'value': lang} for lang in pd.read_sql_query("SELECT DISTINCT language FROM feedback", engine)['language'].dropna().unique()],
-                    multi=True,
-                    placeholder=t['filter_language']
-                )
-            ], className="mb-3"),
-            # Filtre Sentiment
-            dbc.Row([
-                html.I(className="fas fa-heart"),
-                dbc.Checklist(
-                    id='filter-sentiment-modal',
-                    options=[
-                        {'label': [html.I(className="fas fa-smile"), " Positive"], 'value': 'positive'},
-                        {'label': [html.I(className="fas fa-meh"), " Neutral"], 'value': 'neutral'},
-                        {'label': [html.I(className="fas fa-frown"), " Negative"], 'value': 'negative'}
-                    ],
-                    value=[],
-                    inline=True
-                )
-            ], className="mb-3"),
-            # Filtre Note
-            dbc.Row([
-                html.I(className="fas fa-star"),
-                dcc.RangeSlider(
-                    id='filter-rating-modal',
-                    min=0,
-                    max=5,
-                    step=0.5,
-                    value=[0, 5],
-                    marks={i: str(i) for i in range(0, 6)},
-                    tooltip={"placement": "bottom", "always_visible": True}
-                )
-            ], className="mb-3"),
-            # Filtre Date
-            dbc.Row([
-                html.I(className="fas fa-calendar"),
-                dcc.DatePickerRange(
-                    id='filter-date-modal',
-                    start_date=pd.read_sql_query("SELECT MIN(timestamp)::text AS min_timestamp FROM feedback", engine)['min_timestamp'][0],
-                    end_date=pd.to_datetime('today'),
-                    display_format='YYYY-MM-DD'
-                )
-            ], className="mb-3"),
-            # Bouton de téléchargement PDF dans le modal
-            dbc.Button(
-                [html.I(className="fas fa-download"), " ", t['download_pdf']],
-                id='download-pdf-modal',
-                color="success",
-                className="mt-3"
-            ),
-        ]),
-        dbc.ModalFooter(
-            dbc.Button("Close", id="close-filter-modal", className="ml-auto")
-        ),
-    ]
+    modal_content = build_filter_modal_content(t)
     return navbar_title, tabs, modal_content
 
 @callback(
@@ -545,13 +550,17 @@ def update_language_content(language):
     Input('filter-rating', 'value'),
     Input('filter-date', 'start_date'),
     Input('filter-date', 'end_date'),
+    Input('filter-text-search', 'value'),
+    Input('filter-unique-code', 'value'),
     Input('filter-language-modal', 'value'),
     Input('filter-sentiment-modal', 'value'),
     Input('filter-rating-modal', 'value'),
     Input('filter-date-modal', 'start_date'),
-    Input('filter-date-modal', 'end_date')
+    Input('filter-date-modal', 'end_date'),
+    Input('filter-text-search-modal', 'value'),
+    Input('filter-unique-code-modal', 'value')
 )
-def update_filters(lang, sent, rating, start_date, end_date, lang_modal, sent_modal, rating_modal, start_date_modal, end_date_modal):
+def update_filters(lang, sent, rating, start_date, end_date, text_search, unique_code, lang_modal, sent_modal, rating_modal, start_date_modal, end_date_modal, text_search_modal, unique_code_modal):
     try:
         filters = {}
         ctx = dash.callback_context
@@ -563,6 +572,8 @@ def update_filters(lang, sent, rating, start_date, end_date, lang_modal, sent_mo
         rating_range = rating_modal if triggered_id == 'filter-rating-modal' else rating
         date_range = [pd.to_datetime(start_date_modal), pd.to_datetime(end_date_modal)] if triggered_id in ['filter-date-modal', 'filter-date-modal-end_date'] else \
                      [pd.to_datetime(start_date), pd.to_datetime(end_date)] if start_date and end_date else None
+        search = text_search_modal if triggered_id == 'filter-text-search-modal' else text_search
+        code = unique_code_modal if triggered_id == 'filter-unique-code-modal' else unique_code
 
         # Validation et ajout des filtres
         if language and any(l for l in language if l):
@@ -573,6 +584,10 @@ def update_filters(lang, sent, rating, start_date, end_date, lang_modal, sent_mo
             filters['rating_range'] = rating_range
         if date_range and len(date_range) == 2 and date_range[0] is not None and date_range[1] is not None:
             filters['date_range'] = date_range
+        if search and search.strip():
+            filters['text_search'] = search.strip()
+        if code and code.strip():
+            filters['unique_code'] = code.strip()
 
         return filters
     except Exception as e:
@@ -584,106 +599,109 @@ from frequences import layout as frequence_layout, update_frequence_charts
 from distributions import layout as distribution_layout, update_distribution_charts
 from regroupement import layout as regroupement_layout, update_regroupement_table
 
-# Callback pour mettre à jour le contenu des onglets avec les filtres
+# Cartes des KPI (onglet sentiment uniquement)
+def build_kpi_cards(kpis, t):
+    return html.Div([
+        dbc.Row([
+            dbc.Col(html.Div([
+                html.H5(t['total_comments'], className="text-center", style={"color": "#34495e"}),
+                html.P(f"{kpis['total_comments']}", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
+                html.Div(kpis['total_comments_trend'][0], className="text-center"),
+                html.Small(kpis['total_comments_trend'][1], className="text-center")
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
+            dbc.Col(html.Div([
+                html.H5(t['avg_rating'], className="text-center", style={"color": "#34495e"}),
+                html.P(f"{kpis['avg_rating']}/5", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
+                html.Div(kpis['avg_rating_trend'][0], className="text-center"),
+                html.Small(kpis['avg_rating_trend'][1], className="text-center")
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
+            dbc.Col(html.Div([
+                html.H5(t['top_ratings'], className="text-center", style={"color": "#34495e"}),
+                html.P(f"{kpis['top_ratings']}", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
+                html.Div(kpis['top_ratings_trend'][0], className="text-center"),
+                html.Small(kpis['top_ratings_trend'][1], className="text-center")
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
+            dbc.Col(html.Div([
+                html.H5(t['min_rating'], className="text-center", style={"color": "#34495e"}),
+                html.P(f"{kpis['min_rating']}/5", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
+                html.Div(kpis['min_rating_trend'][0], className="text-center"),
+                html.Small(kpis['min_rating_trend'][1], className="text-center")
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
+        ]),
+        dbc.Row([
+            dbc.Col(html.Div([
+                html.H5(t['positive_comments'], className="text-center", style={"color": "#27ae60"}),
+                html.P(f"{kpis['positive']}", className="text-center display-4", style={"color": "#27ae60", "font-weight": "bold"}),
+                html.Div(kpis['positive_trend'][0], className="text-center"),
+                html.Small(kpis['positive_trend'][1], className="text-center")
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #e8f5e9)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
+            dbc.Col(html.Div([
+                html.H5(t['neutral_comments'], className="text-center", style={"color": "#f39c12"}),
+                html.P(f"{kpis['neutral']}", className="text-center display-4", style={"color": "#f39c12", "font-weight": "bold"}),
+                html.Div(kpis['neutral_trend'][0], className="text-center"),
+                html.Small(kpis['neutral_trend'][1], className="text-center")
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #fef9e7)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
+            dbc.Col(html.Div([
+                html.H5(t['negative_comments'], className="text-center", style={"color": "#e74c3c"}),
+                html.P(f"{kpis['negative']}", className="text-center display-4", style={"color": "#e74c3c", "font-weight": "bold"}),
+                html.Div(kpis['negative_trend'][0], className="text-center"),
+                html.Small(kpis['negative_trend'][1], className="text-center")
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #fdecea)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
+        ]),
+        dbc.Row([
+            dbc.Col(html.Div([
+                html.H5(t['peak_hour'], className="text-center", style={"color": "#2980b9"}),
+                html.P(f"{kpis['peak_hour']}:00" if kpis['peak_hour'] != 'N/A' else 'N/A', className="text-center display-4", style={"color": "#2980b9", "font-weight": "bold"})
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #e6f0fa)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
+            dbc.Col(html.Div([
+                html.H5(t['avg_hourly_freq'], className="text-center", style={"color": "#2980b9"}),
+                html.P(f"{kpis['avg_hourly_freq']}/h", className="text-center display-4", style={"color": "#2980b9", "font-weight": "bold"}),
+                html.Div(kpis['avg_hourly_freq_trend'][0], className="text-center"),
+                html.Small(kpis['avg_hourly_freq_trend'][1], className="text-center")
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #e6f0fa)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
+            dbc.Col(html.Div([
+                html.H5(t['avg_time_between'], className="text-center", style={"color": "#2980b9"}),
+                html.P(f"{kpis['avg_time_between']}h", className="text-center display-4", style={"color": "#2980b9", "font-weight": "bold"}),
+                html.Div(kpis['avg_time_between_trend'][0], className="text-center"),
+                html.Small(kpis['avg_time_between_trend'][1], className="text-center")
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #e6f0fa)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
+        ]),
+        dbc.Row([
+            dbc.Col(html.Div([
+                html.H5(t['emoji_count'], className="text-center", style={"color": "#34495e"}),
+                html.P(f"{kpis['emoji_count']}", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
+                html.Div(kpis['emoji_count_trend'][0], className="text-center"),
+                html.Small(kpis['emoji_count_trend'][1], className="text-center")
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
+            dbc.Col(html.Div([
+                html.H5(t['unique_users'], className="text-center", style={"color": "#34495e"}),
+                html.P(f"{kpis['unique_users']}", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
+                html.Div(kpis['unique_users_trend'][0], className="text-center"),
+                html.Small(kpis['unique_users_trend'][1], className="text-center")
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
+            dbc.Col(html.Div([
+                html.H5(t['dominant_lang'], className="text-center", style={"color": "#34495e"}),
+                html.P(f"{kpis['dominant_lang']} ({kpis['dominant_lang_count']})", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"})
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
+            dbc.Col(html.Div([
+                html.H5(t['top_emojis'], className="text-center", style={"color": "#34495e"}),
+                html.P(f"{', '.join([f'{emoji} ({count})' for emoji, count in kpis['top_emojis']])}", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"})
+            ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
+        ])
+    ])
+
+# Callback pour mettre à jour le contenu des onglets (aucune donnée chargée ici : chaque onglet charge les siennes)
 @callback(
     Output("tab-content", "children"),
     Input("tabs", "active_tab"),
-    Input('filters-store', 'data'),
     Input('language-store', 'data')
 )
-def render_tab_content(active_tab, filters, language):
-    df = get_feedback_data(filters)
-    kpis = calculate_kpis(df)
+def render_tab_content(active_tab, language):
     t = translations[language]
     if active_tab == "tab-sentiment":
         return html.Div([
             html.H2(t['dashboard_title'], className="text-center mb-4", style={"color": "#2c3e50", "font-family": "Roboto, sans-serif", "font-weight": "bold"}),
-            dbc.Row([
-                dbc.Col(html.Div([
-                    html.H5(t['total_comments'], className="text-center", style={"color": "#34495e"}),
-                    html.P(f"{kpis['total_comments']}", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
-                    html.Div(kpis['total_comments_trend'][0], className="text-center"),
-                    html.Small(kpis['total_comments_trend'][1], className="text-center")
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
-                dbc.Col(html.Div([
-                    html.H5(t['avg_rating'], className="text-center", style={"color": "#34495e"}),
-                    html.P(f"{kpis['avg_rating']}/5", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
-                    html.Div(kpis['avg_rating_trend'][0], className="text-center"),
-                    html.Small(kpis['avg_rating_trend'][1], className="text-center")
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
-                dbc.Col(html.Div([
-                    html.H5(t['top_ratings'], className="text-center", style={"color": "#34495e"}),
-                    html.P(f"{kpis['top_ratings']}", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
-                    html.Div(kpis['top_ratings_trend'][0], className="text-center"),
-                    html.Small(kpis['top_ratings_trend'][1], className="text-center")
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
-                dbc.Col(html.Div([
-                    html.H5(t['min_rating'], className="text-center", style={"color": "#34495e"}),
-                    html.P(f"{kpis['min_rating']}/5", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
-                    html.Div(kpis['min_rating_trend'][0], className="text-center"),
-                    html.Small(kpis['min_rating_trend'][1], className="text-center")
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
-            ]),
-            dbc.Row([
-                dbc.Col(html.Div([
-                    html.H5(t['positive_comments'], className="text-center", style={"color": "#27ae60"}),
-                    html.P(f"{kpis['positive']}", className="text-center display-4", style={"color": "#27ae60", "font-weight": "bold"}),
-                    html.Div(kpis['positive_trend'][0], className="text-center"),
-                    html.Small(kpis['positive_trend'][1], className="text-center")
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #e8f5e9)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
-                dbc.Col(html.Div([
-                    html.H5(t['neutral_comments'], className="text-center", style={"color": "#f39c12"}),
-                    html.P(f"{kpis['neutral']}", className="text-center display-4", style={"color": "#f39c12", "font-weight": "bold"}),
-                    html.Div(kpis['neutral_trend'][0], className="text-center"),
-                    html.Small(kpis['neutral_trend'][1], className="text-center")
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #fef9e7)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
-                dbc.Col(html.Div([
-                    html.H5(t['negative_comments'], className="text-center", style={"color": "#e74c3c"}),
-                    html.P(f"{kpis['negative']}", className="text-center display-4", style={"color": "#e74c3c", "font-weight": "bold"}),
-                    html.Div(kpis['negative_trend'][0], className="text-center"),
-                    html.Small(kpis['negative_trend'][1], className="text-center")
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #fdecea)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
-            ]),
-            dbc.Row([
-                dbc.Col(html.Div([
-                    html.H5(t['peak_hour'], className="text-center", style={"color": "#2980b9"}),
-                    html.P(f"{kpis['peak_hour']}:00" if kpis['peak_hour'] != 'N/A' else 'N/A', className="text-center display-4", style={"color": "#2980b9", "font-weight": "bold"})
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #e6f0fa)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
-                dbc.Col(html.Div([
-                    html.H5(t['avg_hourly_freq'], className="text-center", style={"color": "#2980b9"}),
-                    html.P(f"{kpis['avg_hourly_freq']}/h", className="text-center display-4", style={"color": "#2980b9", "font-weight": "bold"}),
-                    html.Div(kpis['avg_hourly_freq_trend'][0], className="text-center"),
-                    html.Small(kpis['avg_hourly_freq_trend'][1], className="text-center")
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #e6f0fa)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
-                dbc.Col(html.Div([
-                    html.H5(t['avg_time_between'], className="text-center", style={"color": "#2980b9"}),
-                    html.P(f"{kpis['avg_time_between']}h", className="text-center display-4", style={"color": "#2980b9", "font-weight": "bold"}),
-                    html.Div(kpis['avg_time_between_trend'][0], className="text-center"),
-                    html.Small(kpis['avg_time_between_trend'][1], className="text-center")
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #e6f0fa)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-4"),
-            ]),
-            dbc.Row([
-                dbc.Col(html.Div([
-                    html.H5(t['emoji_count'], className="text-center", style={"color": "#34495e"}),
-                    html.P(f"{kpis['emoji_count']}", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
-                    html.Div(kpis['emoji_count_trend'][0], className="text-center"),
-                    html.Small(kpis['emoji_count_trend'][1], className="text-center")
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
-                dbc.Col(html.Div([
-                    html.H5(t['unique_users'], className="text-center", style={"color": "#34495e"}),
-                    html.P(f"{kpis['unique_users']}", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"}),
-                    html.Div(kpis['unique_users_trend'][0], className="text-center"),
-                    html.Small(kpis['unique_users_trend'][1], className="text-center")
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
-                dbc.Col(html.Div([
-                    html.H5(t['dominant_lang'], className="text-center", style={"color": "#34495e"}),
-                    html.P(f"{kpis['dominant_lang']} ({kpis['dominant_lang_count']})", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"})
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
-                dbc.Col(html.Div([
-                    html.H5(t['top_emojis'], className="text-center", style={"color": "#34495e"}),
-                    html.P(f"{', '.join([f'{emoji} ({count})' for emoji, count in kpis['top_emojis']])}", className="text-center display-4", style={"color": "#2c3e50", "font-weight": "bold"})
-                ], className="card p-3 m-2", style={"background": "linear-gradient(135deg, #ffffff, #ecf0f1)", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0,0,0,0.1)", "transition": "transform 0.2s"}), className="col-12 col-md-3"),
-            ])
+            html.Div(id='kpi-content')
         ])
     elif active_tab == "tab-evolution":
         # Injecter le layout de sentiments.py et gérer le titre dynamiquement
@@ -712,6 +730,18 @@ def render_tab_content(active_tab, filters, language):
         ])
     return html.P("Développement à venir..." if language == 'fr' else "Development coming soon...")
 
+# Callback pour calculer les KPI : n'existe que lorsque l'onglet sentiment est affiché
+@callback(
+    Output('kpi-content', 'children'),
+    Input('filters-store', 'data'),
+    Input('language-store', 'data'),
+    Input('data-version', 'data')
+)
+def update_kpis(filters, language, data_version):
+    kpis = calculate_kpis(get_kpi_values(filters))
+    return build_kpi_cards(kpis, translations[language])
+
+
 # Callback pour rediriger vers la page d'accueil dans une nouvelle fenêtre
 app.clientside_callback(
     """
@@ -738,21 +768,9 @@ def toggle_modal(n1, n2, is_open):
         return not is_open
     return is_open
 
-# Callback pour générer et télécharger le PDF
-@callback(
-    Output("download", "data"),
-    Input("download-pdf", "n_clicks"),
-    Input("download-pdf-modal", "n_clicks"),
-    State('filters-store', 'data'),
-    State('language-store', 'data'),
-    prevent_initial_call=True
-)
-def generate_pdf(n_clicks, n_clicks_modal, filters, language):
-    if not (n_clicks or n_clicks_modal):
-        return dash.no_update
-    
-    df = get_feedback_data(filters)
-    kpis = calculate_kpis(df)
+# Construction du rapport PDF (exécutée dans le pool de reports, hors des callbacks)
+def build_pdf_report(filters, language):
+    kpis = calculate_kpis(get_kpi_values(filters))
     t = translations[language]
 
     buffer = io.BytesIO()
@@ -797,12 +815,65 @@ def generate_pdf(n_clicks, n_clicks_modal, filters, language):
         Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']),
         table
     ]
+    # Graphiques des onglets (images en cache, rendues en parallèle par reports.chart_images)
+    for name, image in reports.chart_images(filters, language):
+        elements += [Spacer(1, 0.2 * inch), Image(io.BytesIO(image), width=6.5 * inch, height=6.5 * inch * reports.CHART_ASPECT)]
     doc.build(elements)
 
-    buffer.seek(0)
-    return dcc.send_bytes(buffer.read(), filename="feedback_report.pdf")
+    return buffer.getvalue()
+
+# Callback pour lancer la génération du PDF en arrière-plan (téléchargement immédiat si déjà en cache)
+@callback(
+    Output("download", "data", allow_duplicate=True),
+    Output('pdf-job', 'data'),
+    Output('pdf-poll', 'disabled'),
+    Input("download-pdf", "n_clicks"),
+    Input("download-pdf-modal", "n_clicks"),
+    State('filters-store', 'data'),
+    State('language-store', 'data'),
+    prevent_initial_call=True
+)
+def generate_pdf(n_clicks, n_clicks_modal, filters, language):
+    if not (n_clicks or n_clicks_modal):
+        return dash.no_update, dash.no_update, dash.no_update
+
+    job = reports.submit(filters, language, lambda: build_pdf_report(filters, language))
+    if job is None:
+        return dash.no_update, None, True
+    if reports.status(job) == 'done':
+        pdf = reports.result(job)
+        if pdf is not None:
+            return dcc.send_bytes(pdf, filename="feedback_report.pdf"), None, True
+    return dash.no_update, job, False
+
+# Callback pour suivre le job PDF et déclencher le téléchargement une fois terminé
+@callback(
+    Output("download", "data"),
+    Output('pdf-job', 'data', allow_duplicate=True),
+    Output('pdf-poll', 'disabled', allow_duplicate=True),
+    Input('pdf-poll', 'n_intervals'),
+    State('pdf-job', 'data'),
+    prevent_initial_call=True
+)
+def poll_pdf_job(n_intervals, job):
+    if not job:
+        return dash.no_update, None, True
+    status = reports.status(job)
+    if status in ('pending', 'running'):
+        return dash.no_update, dash.no_update, False
+    if status == 'unknown' and not reports.expired(job):
+        # Job d'un autre worker dont le statut n'est pas encore visible : on continue d'attendre
+        return dash.no_update, dash.no_update, False
+    if status == 'unknown':
+        print("❌ Rapport PDF introuvable après le délai d'attente")
+    pdf = reports.result(job) if status == 'done' else None
+    if pdf is None:
+        return dash.no_update, None, True
+    return dcc.send_bytes(pdf, filename="feedback_report.pdf"), None, True
 
 server = app.server
 
 if __name__ == '__main__':
+    reports.start_chart_pool()  # Avant le démarrage des threads du serveur
+    change_feed.start()
     app.run(debug=True)
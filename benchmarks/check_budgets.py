@@ -0,0 +1,187 @@
+import gc
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import tracemalloc
+
+# Contrôle des budgets de performance des chemins critiques (benchmarks/budgets.json) sur une base SQLite
+# synthétique (benchmarks/synthetic.py) : temps de calcul, taille des figures envoyées au navigateur et
+# mémoire de pointe. Chaque mesure est comparée à son budget avec la tolérance du fichier ; un dépassement
+# ou une mesure manquante (ex. sentiment_api non importable) fait échouer la commande (code de sortie 1),
+# sauf mesure explicitement autorisée à manquer (--allow-missing ou PERF_ALLOW_MISSING=nom1,nom2).
+# À lancer avant de livrer une modification de app.py, sentiment_api.py ou des onglets ; les mêmes budgets
+# sont vérifiés par pytest (tests/perf, un test par budget).
+# Usage : python -m benchmarks.check_budgets [--budgets benchmarks/budgets.json] [--json rapport.json]
+#         python -m benchmarks.check_budgets --update [nom ...]   (resserre les budgets, tous ou ceux nommés,
+#                                                                  aux mesures actuelles si elles sont plus basses)
+# Les budgets sont des objectifs fixés explicitement (description de chaque budget), pas des mesures majorées :
+# --update ne les relâche jamais, un budget plus large se modifie à la main dans budgets.json.
+#         python -m pytest tests/perf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BUDGETS_PATH = os.path.join(ROOT, 'benchmarks', 'budgets.json')
+REPEATS = 5
+SCORER_BATCH = 500  # Commentaires notés par mesure de linear_scorer_us
+
+
+def load_config(path=BUDGETS_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+# Mesures autorisées à manquer (PERF_ALLOW_MISSING=nom1,nom2)
+def allowed_missing():
+    return {name.strip() for name in os.getenv("PERF_ALLOW_MISSING", "").split(',') if name.strip()}
+
+
+# Meilleur temps sur `repeats` exécutions, ramasse-miettes suspendu comme dans timeit (les collectes
+# déclenchées par les objets des mesures précédentes ne sont pas imputées à la fonction mesurée)
+def _best_ms(func, repeats=REPEATS):
+    timings = []
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return min(timings) * 1000
+
+
+def _figures_kb(figures):
+    return sum(len(figure.to_json()) for figure in figures if hasattr(figure, 'to_json')) / 1024
+
+
+def _peak_mb(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+# Mesures : nom du budget -> valeur mesurée
+def measure(rows, data_dir):
+    from benchmarks.run import _database
+    os.environ['DATABASE_URL'] = _database(rows, data_dir)
+    os.environ['SENTIMENT_TRANSLATION'] = '0'  # Pas d'appel au service de traduction
+
+    import app
+    import sentiments
+    import frequences
+    import distributions
+    import regroupement
+    import change_feed
+    import figure_cache
+    import fast_scorer
+    version = change_feed.current_version()
+
+    df = app.get_feedback_data({})
+    measures = {
+        'get_feedback_data_ms': _best_ms(lambda: app.get_feedback_data({}), repeats=3),
+        'get_feedback_data_peak_mb': _peak_mb(lambda: app.get_feedback_data({})),
+        'calculate_kpis_ms': _best_ms(lambda: app.calculate_kpis(app.kpi_values(df))),
+    }
+    # Callbacks des onglets cache des figures vidé (le calcul est mesuré, pas la lecture du cache)
+    measures['tab_sentiments_ms'] = _best_ms(
+        lambda: (figure_cache.clear(), sentiments.update_sentiment_charts({}, 'fr', version)), repeats=3)
+    measures['tab_distributions_ms'] = _best_ms(
+        lambda: (figure_cache.clear(), distributions.update_distribution_charts({}, None, version)), repeats=3)
+    measures['tab_sentiments_payload_kb'] = _figures_kb(sentiments.update_sentiment_charts({}, 'fr', version)[1:])
+    measures['tab_frequences_payload_kb'] = _figures_kb(frequences.update_frequence_charts({}, None, version)[1:]
+                                                        + [frequences.update_wordcloud({}, None, version)])
+    measures['tab_distributions_payload_kb'] = _figures_kb(distributions.update_distribution_charts({}, None, version)[1:])
+    # Toutes les sorties du callback : une donnée envoyée deux fois (tableau et Store) compte deux fois
+    table = regroupement.update_regroupement_table({}, None, version)
+    measures['tab_regroupement_payload_kb'] = len(json.dumps(table, default=str)) / 1024
+
+    try:
+        import sentiment_api
+    except ImportError as e:
+        print(f"ℹ️ predict_sentiment non mesuré : {e}")
+    else:
+        comment = df['comment'].iloc[0]
+        sentiment_api.predict_sentiment(comment)
+        measures['predict_sentiment_us'] = _best_ms(lambda: sentiment_api.predict_sentiment(comment), repeats=20) * 1000
+        # Scorer NumPy seul (predict_sentiment compte aussi le nettoyage, la détection de langue et TextBlob) :
+        # lot fixe de commentaires déjà nettoyés, temps par commentaire
+        if os.path.exists(fast_scorer.SCORER_PATH):
+            scorer = fast_scorer.load()
+            batch = [(sentiment_api.clean_text(text), [sentiment_api.get_emoji_score(text) * 0.5])
+                     for text in df['comment'].fillna('').iloc[:SCORER_BATCH]]
+            measures['linear_scorer_us'] = (_best_ms(lambda: [scorer.predict(text, extra) for text, extra in batch])
+                                            * 1000 / len(batch))
+    return {name: round(value, 2) for name, value in measures.items()}
+
+
+# Statut d'une mesure : 'ok', 'failed' (dépassement), 'missing' (non mesurée) ou 'skipped' (absence autorisée)
+def check_one(name, budget, value, tolerance, allow_missing=()):
+    limit = budget['max'] * (1 + tolerance)
+    if value is None:
+        status = 'skipped' if name in allow_missing else 'missing'
+    else:
+        status = 'ok' if value <= limit else 'failed'
+    return {'name': name, 'value': value, 'budget': budget['max'], 'limit': round(limit, 2), 'status': status}
+
+
+def check(config, measures, allow_missing=()):
+    return [check_one(name, budget, measures.get(name), config['tolerance'], allow_missing)
+            for name, budget in config['budgets'].items()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Contrôle des budgets de performance")
+    parser.add_argument('--budgets', default=BUDGETS_PATH)
+    parser.add_argument('--data-dir', default=os.getenv("BENCHMARK_DATA_DIR", "/tmp/feedback_bench"))
+    parser.add_argument('--json', help="Rapport JSON des mesures")
+    parser.add_argument('--update', nargs='*', metavar='BUDGET',
+                        help="Resserre les budgets (tous, ou seulement ceux nommés) aux mesures plus basses")
+    parser.add_argument('--allow-missing', nargs='*', default=sorted(allowed_missing()),
+                        help="Mesures dont l'absence n'est pas une erreur")
+    args = parser.parse_args()
+
+    config = load_config(args.budgets)
+    with contextlib.redirect_stdout(io.StringIO()):  # Journaux du chargement des données
+        measures = measure(config['rows'], args.data_dir)
+
+    if args.update is not None:
+        for name, value in measures.items():
+            if args.update and name not in args.update:
+                continue
+            budget = config['budgets'].setdefault(name, {'description': '', 'max': value})
+            budget['max'] = round(min(budget['max'], value), 1)
+        with open(args.budgets, 'w') as f:
+            json.dump(config, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"✅ Budgets mis à jour : {args.budgets}")
+
+    results = check(config, measures, set(args.allow_missing))
+    print(f"\n{'budget':<32} {'mesure':>10} {'budget':>10} {'limite':>10}")
+    for r in results:
+        icon = {'ok': '✅', 'failed': '❌', 'missing': '❌', 'skipped': 'ℹ️'}[r['status']]
+        value = '-' if r['value'] is None else r['value']
+        print(f"{icon} {r['name']:<30} {value:>10} {r['budget']:>10} {r['limit']:>10}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rows': config['rows'], 'tolerance': config['tolerance'], 'results': results}, f, indent=2)
+
+    failed = [r['name'] for r in results if r['status'] == 'failed']
+    missing = [r['name'] for r in results if r['status'] == 'missing']
+    if failed:
+        print(f"❌ Budgets dépassés ({int(config['tolerance'] * 100)}% de tolérance) : {', '.join(failed)}")
+    if missing:
+        print(f"❌ Mesures manquantes (--allow-missing pour les autoriser) : {', '.join(missing)}")
+    if failed or missing:
+        sys.exit(1)
+    print("✅ Tous les budgets sont respectés")
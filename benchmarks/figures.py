@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# Benchmark de construction des figures : l'agrégation (cube) est O(n), la construction des figures
+# à partir du cube doit rester constante quel que soit le nombre de commentaires.
+# Usage : python -m benchmarks.figures [tailles...]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///feedback.db")
+
+import aggregates
+from sentiments import build_sentiment_figures
+from frequences import build_frequence_figures
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+REPEATS = 5
+
+
+def synthetic_frame(rows, days=365, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2024-01-01')
+    return pd.DataFrame({
+        'rating': rng.integers(1, 6, rows),
+        'sentiment': rng.choice(aggregates.SENTIMENTS, rows),
+        'timestamp': start + pd.to_timedelta(rng.integers(0, days * 86400, rows), unit='s'),
+        'language': rng.choice(['fr', 'en'], rows),
+    })
+
+
+def _best_of(func, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(sizes=DEFAULT_SIZES):
+    word_freq = pd.Series({f"mot{i}": 100 - i for i in range(20)})
+    results = []
+    for rows in sizes:
+        df = synthetic_frame(rows)
+        cube_time = _best_of(lambda: aggregates.build_cube(df), repeats=3)
+        cube = aggregates.build_cube(df)
+        crosstab = aggregates.sentiment_by_rating(cube)
+        sentiment_time = _best_of(lambda: build_sentiment_figures(cube, 'fr'))
+        frequence_time = _best_of(lambda: build_frequence_figures(word_freq, crosstab, 'fr'))
+        payload = sum(len(fig.to_json()) for fig in build_sentiment_figures(cube, 'fr'))
+        results.append({
+            'rows': rows,
+            'cube_rows': len(cube),
+            'cube_ms': round(cube_time * 1000, 2),
+            'sentiment_figures_ms': round(sentiment_time * 1000, 2),
+            'frequence_figures_ms': round(frequence_time * 1000, 2),
+            'sentiment_payload_kb': round(payload / 1024, 1),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'rows':>10} {'cube rows':>10} {'cube ms':>10} {'sentiment figs ms':>18} {'frequence figs ms':>18} {'payload KB':>11}")
+    for r in run(sizes):
+        print(f"{r['rows']:>10} {r['cube_rows']:>10} {r['cube_ms']:>10} {r['sentiment_figures_ms']:>18} {r['frequence_figures_ms']:>18} {r['sentiment_payload_kb']:>11}")
@@ -0,0 +1,250 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import subprocess
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Test de charge de sentiment_api (POST /predict_feedback) sous uvicorn, traduction désactivée
+# (SENTIMENT_TRANSLATION=0) pour ne mesurer que le service lui-même.
+# - commentaires réalistes (mélange FR/EN, emojis) tirés du générateur synthétique
+# - charge fermée (--concurrency clients enchaînant les requêtes) ou ouverte (--rate requêtes/s, arrivées
+#   de Poisson ; latence comptée depuis l'heure d'arrivée prévue, attente comprise)
+# - débit, latences p50/p95/p99, taux d'erreur, CPU et mémoire (RSS) de chaque worker uvicorn
+# Rapport JSON (--output) comparable d'une version ou d'une configuration de workers à l'autre.
+# Usage : python -m benchmarks.load_api [--workers 1 2 4] [--concurrency 8] [--rate 50] [--duration 20]
+#         python -m benchmarks.load_api --in-process   (serveur dans le processus du test, sans workers)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COMMENT_MIX_SIZE = 500
+ENDPOINTS = {
+    # Nom -> (chemin, construction du corps de la requête)
+    'predict_feedback': ('/predict_feedback', lambda comment: {'comment': comment}),
+}
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+def comment_mix(size=COMMENT_MIX_SIZE, seed=0):
+    import pandas as pd
+    from benchmarks import synthetic
+    rng = np.random.default_rng(seed)
+    stamps = pd.date_range('2025-01-01', periods=size, freq='min')
+    return synthetic.generate_batch(stamps, 1, rng, synthetic._emoji_pools(), max(100, size // 20))['comment'].tolist()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base_url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/openapi.json", timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def _post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+        return response.status
+
+
+# CPU (secondes utilisateur + système) et RSS (Mo) d'un processus, lus dans /proc
+def _process_usage(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+    except (OSError, StopIteration):
+        return None
+    return {'cpu_s': (int(fields[11]) + int(fields[12])) / CLOCK_TICKS, 'rss_mb': round(rss / 1024, 1)}
+
+
+# Workers uvicorn : processus enfants du maître (le maître lui-même s'il n'y a qu'un processus)
+def _worker_pids(pid):
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children += [int(child) for child in f.read().split()]
+        except OSError:
+            pass
+    # --workers > 1 : un processus de supervision multiprocessing s'ajoute aux workers
+    workers = [child for child in children if _is_worker(child)]
+    return workers or [pid]
+
+
+def _is_worker(pid):
+    try:
+        with open(f"/proc/{pid}/cmdline") as f:
+            return 'resource_tracker' not in f.read()
+    except OSError:
+        return False
+
+
+def _closed_loop(url, payload, comments, concurrency, duration, latencies, errors):
+    stop_at = time.perf_counter() + duration
+
+    def client(seed):
+        rng = np.random.default_rng(seed)
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                _post(url, payload(comments[rng.integers(len(comments))]))
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _open_loop(url, payload, comments, concurrency, duration, rate, latencies, errors):
+    rng = np.random.default_rng(0)
+    arrivals = np.cumsum(rng.exponential(1 / rate, int(rate * duration * 2)))
+    arrivals = arrivals[arrivals < duration]
+    start = time.perf_counter()
+
+    def send(scheduled, comment):
+        try:
+            _post(url, payload(comment))
+            latencies.append(time.perf_counter() - scheduled)
+        except Exception:
+            errors.append(time.perf_counter() - scheduled)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for offset in arrivals:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, start + offset, comments[rng.integers(len(comments))])
+
+
+def _start_server(workers, port, in_process):
+    env = dict(os.environ, SENTIMENT_TRANSLATION='0')
+    if in_process:
+        import uvicorn
+        os.environ['SENTIMENT_TRANSLATION'] = '0'
+        os.chdir(ROOT)  # Modèles chargés par chemin relatif
+        import sentiment_api
+        server = uvicorn.Server(uvicorn.Config(sentiment_api.app, host='127.0.0.1', port=port, log_level='warning'))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        return server, os.getpid()
+    process = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'sentiment_api:app', '--host', '127.0.0.1',
+                                '--port', str(port), '--workers', str(workers), '--log-level', 'warning'],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process, process.pid
+
+
+def _stop_server(server, in_process):
+    if in_process:
+        server.should_exit = True
+    else:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def run_load(workers, concurrency, duration, rate=None, endpoint='predict_feedback', in_process=False, comments=None):
+    path, payload = ENDPOINTS[endpoint]
+    comments = comments or comment_mix()
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server, pid = _start_server(workers, port, in_process)
+    try:
+        if not _wait_ready(base_url):
+            raise RuntimeError(f"uvicorn ({workers} workers) n'a pas démarré")
+        url = f"{base_url}{path}"
+        # Préchauffage : modèles chargés et premiers appels faits dans chaque worker avant la mesure
+        for comment in comments[:20 * workers]:
+            _post(url, payload(comment))
+        pids = _worker_pids(pid)
+        usage_before = {p: _process_usage(p) for p in pids}
+        latencies, errors = [], []
+        start = time.perf_counter()
+        if rate:
+            _open_loop(url, payload, comments, concurrency, duration, rate, latencies, errors)
+        else:
+            _closed_loop(url, payload, comments, concurrency, duration, latencies, errors)
+        elapsed = time.perf_counter() - start
+        usage_after = {p: _process_usage(p) for p in pids}
+    finally:
+        _stop_server(server, in_process)
+
+    timings = np.array(latencies) * 1000
+    total = len(latencies) + len(errors)
+    worker_usage = []
+    for p in pids:
+        before, after = usage_before.get(p), usage_after.get(p)
+        if before and after:
+            worker_usage.append({'pid': p, 'cpu_percent': round((after['cpu_s'] - before['cpu_s']) / elapsed * 100, 1),
+                                 'rss_mb': after['rss_mb']})
+    percentile = lambda q: round(float(np.percentile(timings, q)), 1) if len(timings) else None
+    return {
+        'endpoint': endpoint,
+        'workers': 0 if in_process else workers,
+        'concurrency': concurrency,
+        'rate': rate,
+        'duration_s': round(elapsed, 1),
+        'requests': total,
+        'errors': len(errors),
+        'error_rate': round(len(errors) / total, 4) if total else None,
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'worker_usage': worker_usage,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Test de charge de sentiment_api")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, help="Arrivées par seconde (charge ouverte) ; sinon charge fermée")
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='predict_feedback')
+    parser.add_argument('--in-process', action='store_true')
+    parser.add_argument('--output', help="Rapport JSON")
+    args = parser.parse_args()
+
+    from benchmarks.run import _git_commit
+    comments = comment_mix()
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'runs': [],
+    }
+    print(f"{'workers':>8} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  CPU % / RSS Mo par worker")
+    for workers in ([1] if args.in_process else args.workers):
+        r = run_load(workers, args.concurrency, args.duration, args.rate, args.endpoint, args.in_process, comments)
+        report['runs'].append(r)
+        usage = ', '.join(f"{u['cpu_percent']}% / {u['rss_mb']}" for u in r['worker_usage'])
+        print(f"{r['workers']:>8} {r['requests']:>9} {r['errors']:>7} {r['requests_per_s']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}  {usage}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Rapport écrit : {args.output}")
@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import threading
+import urllib.request
+import numpy as np
+
+# Test de charge du tableau de bord sous gunicorn (gunicorn.conf.py + wsgi:server) :
+# requêtes /_dash-update-component concurrentes sur les callbacks des onglets, pour 1, 4 et 8 workers.
+# Rapporte le débit (requêtes/s) et les latences p50/p95 des callbacks.
+# Usage : python -m benchmarks.load_dash [--workers 1 4 8] [--clients 16] [--duration 20]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Filtres variés : une partie des requêtes manque le cache des figures, comme en usage réel
+FILTER_VARIANTS = [
+    {},
+    {'sentiment': ['positive']},
+    {'sentiment': ['negative', 'neutral']},
+    {'rating_range': [3, 5]},
+    {'rating_range': [0, 2]},
+    {'language': ['fr']},
+]
+
+
+def _callback_payload(output, outputs, inputs):
+    return {
+        'output': output,
+        'outputs': outputs,
+        'inputs': inputs,
+        'changedPropIds': [f"{inputs[0]['id']}.{inputs[0]['property']}"],
+        'state': [],
+    }
+
+
+def _payloads(version):
+    payloads = []
+    for filters in FILTER_VARIANTS:
+        payloads.append(('kpis', _callback_payload(
+            'kpi-content.children',
+            {'id': 'kpi-content', 'property': 'children'},
+            [{'id': 'filters-store', 'property': 'data', 'value': filters},
+             {'id': 'language-store', 'property': 'data', 'value': 'fr'},
+             {'id': 'data-version', 'property': 'data', 'value': version}])))
+        outputs = [{'id': i, 'property': p} for i, p in [('sentiments-title', 'children'), ('bar-chart', 'figure'),
+                                                         ('pie-chart', 'figure'), ('stacked-bar-chart', 'figure'),
+                                                         ('line-chart', 'figure'), ('area-chart', 'figure')]]
+        payloads.append(('sentiments', _callback_payload(
+            '..' + '...'.join(f"{o['id']}.{o['property']}" for o in outputs) + '..',
+            outputs,
+            [{'id': 'filters-store', 'property': 'data', 'value': filters},
+             {'id': 'language-store', 'property': 'data', 'value': 'fr'},
+             {'id': 'data-version', 'property': 'data', 'value': version}])))
+    return payloads
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def _post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+        return response.status
+
+
+def _client(url, payloads, stop_at, latencies, errors, seed):
+    rng = np.random.default_rng(seed)
+    while time.perf_counter() < stop_at:
+        name, payload = payloads[rng.integers(len(payloads))]
+        start = time.perf_counter()
+        try:
+            _post(url, payload)
+            latencies.append((name, time.perf_counter() - start))
+        except Exception:
+            errors.append(name)
+
+
+def run_load(workers, clients, duration, threads):
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads), PORT=str(port))
+    env.setdefault("DATABASE_URL", "sqlite:///feedback.db")
+    # Cache partagé vide à chaque série : les mesures restent comparables d'un nombre de workers à l'autre
+    env['FIGURE_CACHE_URL'] = f"file://{tempfile.mkdtemp(prefix='load_dash_cache_')}"
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:server'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not _wait_ready(base_url):
+            raise RuntimeError(f"gunicorn ({workers} workers) n'a pas démarré")
+        with urllib.request.urlopen(f"{base_url}/version") as response:
+            version = json.load(response)['version']
+        payloads = _payloads(version)
+        url = f"{base_url}/_dash-update-component"
+        # Préchauffage : chaque variante calculée une fois (cache partagé rempli) avant la mesure
+        for _, payload in payloads:
+            _post(url, payload)
+        latencies, errors = [], []
+        stop_at = time.perf_counter() + duration
+        pool = [threading.Thread(target=_client, args=(url, payloads, stop_at, latencies, errors, seed))
+                for seed in range(clients)]
+        start = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    timings = np.array([latency for _, latency in latencies]) * 1000
+    return {
+        'workers': workers,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(timings, 50)), 1) if len(timings) else None,
+        'p95_ms': round(float(np.percentile(timings, 95)), 1) if len(timings) else None,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Test de charge des callbacks Dash sous gunicorn")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for workers in args.workers:
+        r = run_load(workers, args.clients, args.duration, args.threads)
+        print(f"{r['workers']:>8} {r['requests']:>9} {r['errors']:>7} {r['requests_per_s']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8}")
@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import subprocess
+import pandas as pd
+
+# Benchmark de bout en bout par taille de base : chargement des données, KPI, callbacks des quatre onglets,
+# rapport PDF et prédiction de sentiment. Chaque taille est mesurée dans un processus séparé (caches vides,
+# mémoire de pointe propre à la taille) sur une base synthétique (benchmarks/synthetic.py) générée au besoin.
+# Rapports JSON (comparables d'une exécution à l'autre) et markdown dans --out ; --baseline ajoute le ratio
+# par rapport à un rapport JSON précédent.
+# Usage : python -m benchmarks.run [--sizes 1000 100000 1000000] [--baseline results/benchmark-....json]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_SIZES = [1_000, 100_000]
+DATA_DIR = os.getenv("BENCHMARK_DATA_DIR", "/tmp/feedback_bench")
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+REPEATS = 3
+PREDICT_SAMPLES = 50
+# Fin de période fixe des bases générées : mêmes données et mêmes fenêtres d'une exécution à l'autre
+DATA_END = pd.Timestamp('2026-01-01')
+
+
+FILTER_SETS = {
+    'all': {},
+    'recent_negative': {'sentiment': ['negative'], 'date_range': [str(DATA_END - pd.Timedelta(days=30)), str(DATA_END)]},
+}
+
+
+# Cas mesurés : nom -> fonction(filters) ; ordre fixe (les caches partagés, ex. le cube, se remplissent au fil des cas)
+def _cases():
+    import app
+    import sentiments
+    import frequences
+    import distributions
+    import regroupement
+    import change_feed
+    version = change_feed.current_version()
+    return {
+        'get_feedback_data': lambda f: app.get_feedback_data(f),
+        'calculate_kpis': lambda f: app.calculate_kpis(app.get_kpi_values(f)),
+        'tab_sentiments': lambda f: sentiments.update_sentiment_charts(f, 'fr', version),
+        'tab_frequences': lambda f: (frequences.update_frequence_charts(f, None, version),
+                                     frequences.update_wordcloud(f, None, version)),
+        'tab_distributions': lambda f: distributions.update_distribution_charts(f, None, version),
+        'tab_regroupement': lambda f: regroupement.update_regroupement_table(f, None, version),
+        'generate_pdf': lambda f: app.build_pdf_report(f, 'fr'),
+    }
+
+
+def _time(func, repeats=REPEATS):
+    start = time.perf_counter()
+    func()
+    cold = time.perf_counter() - start
+    warm = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        warm.append(time.perf_counter() - start)
+    return round(cold * 1000, 2), round(min(warm) * 1000, 2)
+
+
+def _predict_results(url):
+    # Textes de la base mesurée : même mélange FR/EN/emojis que le tableau de bord
+    from sqlalchemy import text
+    from data_utils import get_engine
+    try:
+        import sentiment_api
+    except ImportError as e:
+        return [{'case': 'predict_sentiment', 'filters': '-', 'skipped': f"sentiment_api indisponible : {e}"}]
+    with get_engine().connect() as conn:
+        comments = [row[0] for row in conn.execute(text(f"SELECT comment FROM feedback LIMIT {PREDICT_SAMPLES}"))]
+    cold, warm = _time(lambda: [sentiment_api.predict_sentiment(comment) for comment in comments])
+    return [{'case': 'predict_sentiment', 'filters': f'{len(comments)} comments',
+             'cold_ms': round(cold / len(comments), 2), 'warm_ms': round(warm / len(comments), 2)}]
+
+
+# Processus enfant : mesure d'une base
+def measure(url, output):
+    os.environ['DATABASE_URL'] = url
+    results = []
+    cases = _cases()
+    for filter_name, filters in FILTER_SETS.items():
+        for name, func in cases.items():
+            try:
+                cold, warm = _time(lambda: func(filters))
+                results.append({'case': name, 'filters': filter_name, 'cold_ms': cold, 'warm_ms': warm})
+            except Exception as e:
+                results.append({'case': name, 'filters': filter_name, 'error': repr(e)})
+    results += _predict_results(url)
+    from sqlalchemy import text
+    from data_utils import get_engine
+    with get_engine().connect() as conn:
+        rows = conn.execute(text("SELECT COUNT(*) FROM feedback")).scalar()
+    with open(output, 'w') as f:
+        json.dump({'rows': rows, 'results': results, 'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024}, f)
+
+
+def _database(rows, data_dir):
+    from benchmarks import synthetic
+    path = os.path.join(data_dir, f"feedback_{rows}.db")
+    url = f"sqlite:///{path}"
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        synthetic.generate(url, rows, migrate=True, end=DATA_END)
+    return url
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, data_dir=DATA_DIR, url=None):
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'sizes': [],
+    }
+    # Base fournie : une seule mesure, à sa taille réelle
+    for rows in ([None] if url else sizes):
+        database_url = url or _database(rows, data_dir)
+        os.makedirs(data_dir, exist_ok=True)
+        output = os.path.join(data_dir, f"measure_{rows or 'url'}.json")
+        start = time.perf_counter()
+        child = subprocess.run([sys.executable, '-m', 'benchmarks.run', '--measure', database_url, '--output', output],
+                               cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if child.returncode != 0:
+            raise RuntimeError(f"Mesure impossible pour {database_url} :\n{child.stderr[-2000:]}")
+        with open(output) as f:
+            measured = json.load(f)
+        report['sizes'].append(measured)
+        print(f"✅ {measured['rows']} lignes mesurées en {time.perf_counter() - start:.1f}s")
+    return report
+
+
+def _index(report):
+    return {(size['rows'], r['case'], r['filters']): r for size in report['sizes'] for r in size['results']}
+
+
+def to_markdown(report, baseline=None):
+    previous = _index(baseline) if baseline else {}
+    lines = [f"# Benchmark {report['created']} (commit {report['commit']}, {report['cpu_count']} CPU)", ""]
+    header = "| lignes | cas | filtres | froid (ms) | chaud (ms) |" + (" ratio froid |" if baseline else "")
+    lines += [header, "|" + "---|" * (6 if baseline else 5)]
+    for size in report['sizes']:
+        for r in size['results']:
+            if 'cold_ms' in r:
+                cells = [str(size['rows']), r['case'], r['filters'], f"{r['cold_ms']:.1f}", f"{r['warm_ms']:.1f}"]
+            else:
+                cells = [str(size['rows']), r['case'], r['filters'], r.get('skipped') or r.get('error'), ""]
+            if baseline:
+                before = previous.get((size['rows'], r['case'], r['filters']), {})
+                cells.append(f"{r['cold_ms'] / before['cold_ms']:.2f}x"
+                             if before.get('cold_ms') and 'cold_ms' in r else "-")
+            lines.append("| " + " | ".join(cells) + " |")
+        lines.append(f"| {size['rows']} | mémoire de pointe | | {size['peak_rss_mb']} Mo | |" + (" |" if baseline else ""))
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de bout en bout par taille de base")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--url', help="Base existante (ex. Postgres locale) au lieu des bases générées")
+    parser.add_argument('--out', default=RESULTS_DIR)
+    parser.add_argument('--baseline', help="Rapport JSON précédent à comparer")
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.output)
+        sys.exit(0)
+
+    report = run(args.sizes, args.data_dir, args.url)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    os.makedirs(args.out, exist_ok=True)
+    name = os.path.join(args.out, f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}")
+    with open(f"{name}.json", 'w') as f:
+        json.dump(report, f, indent=2)
+    markdown = to_markdown(report, baseline)
+    with open(f"{name}.md", 'w') as f:
+        f.write(markdown)
+    print(markdown)
+    print(f"✅ Rapports écrits : {name}.json, {name}.md")
@@ -0,0 +1,221 @@
+import io
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import numpy as np
+import pandas as pd
+
+# Générateur de commentaires synthétiques réalistes pour les benchmarks :
+# - textes FR/EN par sentiment, avec emojis tirés de Emoji_Sentiment_Data.csv (selon leur score et leur fréquence)
+# - notes corrélées au sentiment, répondants plus ou moins actifs (loi de Zipf)
+# - horodatages en rafales (pics d'activité) sur un profil journalier, ids croissants avec le temps
+# Usage : python -m benchmarks.synthetic --rows 100000 --url sqlite:////tmp/feedback_100k.db [--migrate]
+# (--url postgresql://... pour une base Postgres locale ; --migrate installe index, recherche plein texte et
+# colonnes dérivées, remplies directement par le générateur comme après un rattrapage)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BATCH_SIZE = 100_000
+SENTIMENTS = ['positive', 'neutral', 'negative']
+SENTIMENT_WEIGHTS = [0.55, 0.25, 0.20]
+LANGUAGE_WEIGHTS = {'fr': 0.6, 'en': 0.4}
+EMOJI_PROBABILITY = 0.4
+BURST_SHARE = 0.35  # Part des commentaires arrivés pendant un pic d'activité
+BURST_SCALE_HOURS = 3
+# Profil journalier (poids par heure, creux la nuit)
+HOURLY_WEIGHTS = np.array([1, 0.5, 0.3, 0.3, 0.3, 0.5, 1, 2, 3, 4, 4, 4, 5, 4, 4, 4, 4, 5, 5, 4, 3, 3, 2, 1.5])
+# Notes (0 à 5) selon le sentiment
+RATINGS = {
+    'positive': ([3, 4, 5], [0.15, 0.35, 0.5]),
+    'neutral': ([2, 3, 4], [0.3, 0.45, 0.25]),
+    'negative': ([0, 1, 2, 3], [0.3, 0.35, 0.25, 0.1]),
+}
+
+TEMPLATES = {
+    ('fr', 'positive'): ["Très bon accueil, {sujet} {qualif}", "Merci pour {sujet}, vraiment {qualif}",
+                         "{sujet} {qualif}, je recommande", "Super expérience, {sujet} au top"],
+    ('fr', 'neutral'): ["{sujet} correct, sans plus", "Rien à signaler concernant {sujet}",
+                        "{sujet} dans la moyenne", "Attente normale, {sujet} {qualif}"],
+    ('fr', 'negative'): ["Déçu par {sujet}, {qualif}", "{sujet} {qualif}, attente beaucoup trop longue",
+                         "Pas satisfait de {sujet}", "Très mauvaise expérience avec {sujet}"],
+    ('en', 'positive'): ["Great {subject}, really {quality}", "Thanks for the {subject}, {quality}",
+                         "The {subject} was {quality}, highly recommend", "Amazing experience, {subject} was top"],
+    ('en', 'neutral'): ["The {subject} was okay", "Nothing special about the {subject}",
+                        "Average {subject}, {quality}", "Normal wait, {subject} was {quality}"],
+    ('en', 'negative'): ["Disappointed by the {subject}, {quality}", "The {subject} was {quality}, waited too long",
+                         "Not happy with the {subject}", "Very bad experience with the {subject}"],
+}
+WORDS = {
+    'fr': {'sujet': ['le personnel', "l'accueil", 'le service', 'le médecin', 'la prise en charge', 'les infirmières'],
+           'positive': ['excellent', 'parfait', 'très professionnel', 'chaleureux'],
+           'neutral': ['correct', 'acceptable', 'moyen', 'standard'],
+           'negative': ['décevant', 'désagréable', 'lent', 'peu professionnel']},
+    'en': {'subject': ['staff', 'reception', 'service', 'doctor', 'care', 'nurses'],
+           'positive': ['excellent', 'perfect', 'very professional', 'friendly'],
+           'neutral': ['fine', 'acceptable', 'average', 'standard'],
+           'negative': ['disappointing', 'rude', 'slow', 'unprofessional']},
+}
+
+
+# Emojis par sentiment, pondérés par leur fréquence d'usage
+def _emoji_pools():
+    data = pd.read_csv(os.path.join(ROOT, 'Emoji_Sentiment_Data.csv'))
+    total = data['Negative'] + data['Neutral'] + data['Positive']
+    score = (data['Positive'] - data['Negative']) / total.where(total > 0)
+    masks = {'positive': score > 0.4, 'neutral': score.abs() < 0.1, 'negative': score < -0.1}
+    pools = {}
+    for sentiment, mask in masks.items():
+        subset = data[mask & (data['Occurrences'] >= 50)]
+        pools[sentiment] = (subset['Emoji'].to_numpy(), (subset['Occurrences'] / subset['Occurrences'].sum()).to_numpy())
+    return pools
+
+
+def timestamps(rows, days, rng, end=None):
+    end = (end or pd.Timestamp.now()).floor('s')
+    start = end - pd.Timedelta(days=days)
+    base_rows = rows - int(rows * BURST_SHARE)
+    day_offsets = rng.integers(0, days, base_rows) * 86400
+    hours = rng.choice(24, base_rows, p=HOURLY_WEIGHTS / HOURLY_WEIGHTS.sum()) * 3600
+    base = day_offsets + hours + rng.integers(0, 3600, base_rows)
+    # Pics : environ un par semaine, commentaires concentrés dans les heures qui suivent
+    centers = rng.integers(0, days * 86400, max(1, days // 7))
+    burst = rng.choice(centers, rows - base_rows) + rng.exponential(BURST_SCALE_HOURS * 3600, rows - base_rows).astype('int64')
+    seconds = np.sort(np.clip(np.concatenate([base, burst]), 0, days * 86400 - 1))
+    return start + pd.to_timedelta(seconds, unit='s')
+
+
+def _comments(languages, sentiments, rng, emoji_pools):
+    # Tirages vectorisés (indices ramenés à la taille de chaque liste), texte assemblé ligne par ligne
+    picks = rng.integers(0, 1 << 30, (len(languages), 3))
+    comments = []
+    for language, sentiment, (template_pick, subject_pick, quality_pick) in zip(languages, sentiments, picks.tolist()):
+        words = WORDS[language]
+        subject_key = 'sujet' if language == 'fr' else 'subject'
+        quality_key = 'qualif' if language == 'fr' else 'quality'
+        templates = TEMPLATES[(language, sentiment)]
+        comment = templates[template_pick % len(templates)].format(**{
+            subject_key: words[subject_key][subject_pick % len(words[subject_key])],
+            quality_key: words[sentiment][quality_pick % len(words[sentiment])]})
+        comments.append(comment[0].upper() + comment[1:])
+    emojis, weights = zip(*(emoji_pools[sentiment] for sentiment in SENTIMENTS))
+    has_emoji = rng.random(len(comments)) < EMOJI_PROBABILITY
+    for i in np.flatnonzero(has_emoji):
+        pool = SENTIMENTS.index(sentiments[i])
+        count = rng.integers(1, 4)
+        comments[i] += ' ' + ''.join(rng.choice(emojis[pool], count, p=weights[pool]))
+    return comments
+
+
+def generate_batch(stamps, first_id, rng, emoji_pools, respondents):
+    rows = len(stamps)
+    sentiments = rng.choice(SENTIMENTS, rows, p=SENTIMENT_WEIGHTS)
+    languages = rng.choice(list(LANGUAGE_WEIGHTS), rows, p=list(LANGUAGE_WEIGHTS.values()))
+    ratings = np.empty(rows, dtype='int64')
+    for sentiment, (values, weights) in RATINGS.items():
+        mask = sentiments == sentiment
+        ratings[mask] = rng.choice(values, mask.sum(), p=weights)
+    # Répondants réguliers très actifs, majorité de répondants occasionnels
+    weights = 1 / (np.arange(respondents) + 10) ** 1.1
+    codes = rng.choice(respondents, rows, p=weights / weights.sum())
+    return pd.DataFrame({
+        'id': np.arange(first_id, first_id + rows),
+        'language': languages,
+        'comment': _comments(languages, sentiments, rng, emoji_pools),
+        'rating': ratings,
+        'unique_code': [f"U{code:07d}" for code in codes],
+        'sentiment': sentiments,
+        'timestamp': stamps.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+
+
+# Colonnes dérivées (comment_features) calculées comme au scoring, la langue générée tenant lieu de détection
+def add_features(df):
+    import comment_features
+    emoji_sentiment = comment_features.load_emoji_sentiment()
+    df = comment_features.fill_missing(df)
+    df['emoji_score'] = [float(np.mean([emoji_sentiment[e] for e in emojis if e in emoji_sentiment] or [0.0]))
+                         for emojis in df['emojis']]
+    df['detected_language'] = df['language']
+    return df
+
+
+def create_table(engine):
+    from sqlalchemy import text
+    if engine.dialect.name == 'postgresql':
+        ddl = """CREATE TABLE feedback (id SERIAL PRIMARY KEY, language TEXT, comment TEXT, rating INTEGER,
+                 unique_code TEXT, sentiment TEXT, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"""
+    else:
+        # Même schéma que feedback.db
+        ddl = """CREATE TABLE feedback (id INTEGER PRIMARY KEY AUTOINCREMENT, language TEXT, comment TEXT, rating INTEGER,
+                 unique_code TEXT, sentiment TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)"""
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS feedback CASCADE" if engine.dialect.name == 'postgresql' else "DROP TABLE IF EXISTS feedback"))
+        conn.execute(text(ddl))
+
+
+def _write(engine, df):
+    columns = ', '.join(df.columns)
+    if engine.dialect.name == 'postgresql':
+        # COPY : chargement en masse bien plus rapide que des INSERT
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        raw = engine.raw_connection()
+        try:
+            raw.cursor().copy_expert(f"COPY feedback ({columns}) FROM STDIN WITH CSV", buffer)
+            raw.commit()
+        finally:
+            raw.close()
+    else:
+        conn = sqlite3.connect(engine.url.database)
+        try:
+            rows = [tuple(None if pd.isna(v) else (v.item() if hasattr(v, 'item') else v) for v in row)
+                    for row in df.itertuples(index=False)]
+            conn.executemany(f"INSERT INTO feedback ({columns}) VALUES ({', '.join('?' * len(df.columns))})", rows)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def generate(url, rows, days=365, seed=0, migrate=False, end=None):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import NullPool
+    start = time.perf_counter()
+    engine = create_engine(url, poolclass=NullPool)
+    create_table(engine)
+    if migrate:
+        os.environ['DATABASE_URL'] = url
+        import data_utils
+        import migrations
+        data_utils.dispose_engine()
+        migrations.run_migrations()
+    rng = np.random.default_rng(seed)
+    emoji_pools = _emoji_pools()
+    stamps = timestamps(rows, days, rng, end)
+    respondents = max(100, rows // 20)
+    for offset in range(0, rows, BATCH_SIZE):
+        df = generate_batch(stamps[offset:offset + BATCH_SIZE], offset + 1, rng, emoji_pools, respondents)
+        if migrate:
+            df = add_features(df)
+        _write(engine, df)
+        print(f"ℹ️ {min(offset + BATCH_SIZE, rows)}/{rows} commentaires générés")
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as conn:
+            conn.execute(text("SELECT setval(pg_get_serial_sequence('feedback', 'id'), (SELECT MAX(id) FROM feedback))"))
+            conn.execute(text("ANALYZE feedback"))
+    engine.dispose()
+    print(f"✅ {rows} commentaires écrits dans {url} en {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Génération de commentaires synthétiques")
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--url', required=True, help="sqlite:////chemin.db ou postgresql://...")
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--migrate', action='store_true')
+    args = parser.parse_args()
+    generate(args.url, args.rows, args.days, args.seed, args.migrate)
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import select
+import threading
+from contextlib import contextmanager
+from flask import Response, jsonify, stream_with_context, has_request_context
+from sqlalchemy import text
+from data_utils import get_engine
+
+# Version des données côté serveur, modifiée à chaque changement de la table feedback.
+# Postgres : LISTEN/NOTIFY (trigger installé par migrations.py) ; sinon polling d'un marqueur léger.
+# La version est toujours lue dans la base, donc identique dans tous les processus (caches partagés entre
+# workers, aucun rafraîchissement parasite quand le polling des clients change de worker) :
+# - table feedback_version (installée explicitement par `python migrations.py` ; le tableau de bord ne modifie
+#   pas le schéma, sauf CHANGE_FEED_AUTO_MIGRATE=1) : compteur incrémenté à chaque INSERT/UPDATE/DELETE, et
+#   compteur des seuls UPDATE/DELETE (modification_count) pour les copies incrémentales
+# - sinon marqueur dérivé des données "COUNT(*):MAX(id)" (les UPDATE ne sont alors pas détectés)
+# Les clients lisent /version (ou s'abonnent à /events en SSE) et ne recalculent que si la version change.
+CHANNEL = 'feedback_changed'
+POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", "5"))
+SSE_KEEPALIVE = 15
+AUTO_MIGRATE = os.getenv("CHANGE_FEED_AUTO_MIGRATE", "0") == "1"
+
+_version = None  # Lue dans la base à la première demande
+_last_read = 0.0  # Dernière lecture à la demande (sans thread d'écoute)
+_condition = threading.Condition()
+_thread = None
+_thread_pid = None
+_lazy_start = True  # Désactivé pendant le préchargement du maître (preloading)
+
+
+# Version courante. Sans thread d'écoute actif dans ce processus (lanceur sans post_fork : uwsgi, waitress,
+# autre configuration gunicorn), le thread est démarré à la première requête HTTP servie (jamais pendant le
+# préchargement du maître gunicorn, voir preloading) et la version est relue à la demande, au plus une fois
+# par POLL_INTERVAL, pour ne jamais rester figée
+def current_version():
+    global _last_read
+    if not _listening():
+        if _lazy_start and has_request_context():
+            start()
+        if _version is None or time.monotonic() - _last_read > POLL_INTERVAL:
+            _last_read = time.monotonic()
+            try:
+                with get_engine().connect() as conn:
+                    _set_version(_read_version(conn))
+            except Exception as e:
+                print(f"❌ Lecture de la version des données impossible : {e}")
+                if _version is None:
+                    return 0
+    return _version
+
+
+def _listening():
+    return _thread is not None and _thread.is_alive() and _thread_pid == os.getpid()
+
+
+# Requêtes internes du préchargement (wsgi.create_app) : aucun thread ne doit être démarré avant le fork
+@contextmanager
+def preloading():
+    global _lazy_start
+    _lazy_start = False
+    try:
+        yield
+    finally:
+        _lazy_start = True
+
+
+def _set_version(version):
+    global _version
+    with _condition:
+        if version == _version:
+            return
+        first = _version is None
+        _version = version
+        _condition.notify_all()
+    if not first:
+        print(f"🔔 Données modifiées, version {version}")
+
+
+def _read_global_version(conn):
+    try:
+        row = conn.execute(text("SELECT version FROM feedback_version WHERE id = 1")).first()
+    except Exception:
+        conn.rollback()
+        return None
+    finally:
+        if conn.in_transaction():
+            conn.rollback()
+    return int(row[0]) if row else None
+
+
+# Nombre d'UPDATE/DELETE sur feedback (colonne modifications de feedback_version), None si indisponible :
+# les copies incrémentales le comparent à la valeur lue lors de leur dernière synchronisation
+def modification_count(conn):
+    try:
+        row = conn.execute(text("SELECT modifications FROM feedback_version WHERE id = 1")).first()
+    except Exception:
+        conn.rollback()
+        return None
+    finally:
+        if conn.in_transaction():
+            conn.rollback()
+    return int(row[0]) if row else None
+
+
+# Version globale si la table existe, sinon marqueur dérivé des données (même valeur dans tous les processus)
+def _read_version(conn):
+    version = _read_global_version(conn)
+    if version is not None:
+        return version
+    count, max_id = conn.execute(text("SELECT COUNT(*), MAX(id) FROM feedback")).one()
+    conn.rollback()
+    return f"{count}:{max_id or 0}"
+
+
+# Sur demande (CHANGE_FEED_AUTO_MIGRATE=1) : installe ou met à niveau feedback_version et ses triggers s'ils
+# manquent (idempotent). Par défaut, ou en cas d'échec (droits, dialecte non supporté), le marqueur dérivé des
+# données est utilisé
+def _ensure_version_table(engine):
+    with engine.connect() as conn:
+        if modification_count(conn) is not None:
+            return
+    if not AUTO_MIGRATE or engine.dialect.name not in ('postgresql', 'sqlite'):
+        print("ℹ️ Table feedback_version absente (python migrations.py pour l'installer) : version dérivée des données")
+        return
+    try:
+        from migrations import install_change_notify
+        with engine.begin() as conn:
+            install_change_notify(conn, engine.dialect.name)
+        print("✅ Table feedback_version installée")
+    except Exception as e:
+        # Un autre worker a pu l'installer au même moment
+        with engine.connect() as conn:
+            if modification_count(conn) is None:
+                print(f"ℹ️ Installation de feedback_version impossible ({e}) : version dérivée des données")
+
+
+# Bloque jusqu'à ce que la version diffère de `version` (ou jusqu'au timeout)
+def wait_for_change(version, timeout):
+    with _condition:
+        _condition.wait_for(lambda: _version != version, timeout=timeout)
+        return _version
+
+
+def _listen_postgres(engine):
+    raw = engine.raw_connection()
+    try:
+        dbapi_conn = getattr(raw, 'driver_connection', None) or raw.connection
+        dbapi_conn.autocommit = True
+        with dbapi_conn.cursor() as cur:
+            cur.execute(f"LISTEN {CHANNEL}")
+        with engine.connect() as conn:
+            _set_version(_read_version(conn))
+        print(f"✅ Écoute des notifications sur '{CHANNEL}'")
+        while True:
+            # Aucune requête tant qu'aucune notification n'arrive
+            if select.select([dbapi_conn], [], [], POLL_INTERVAL) == ([], [], []):
+                continue
+            dbapi_conn.poll()
+            if dbapi_conn.notifies:
+                payload = dbapi_conn.notifies[-1].payload
+                dbapi_conn.notifies.clear()
+                if payload.isdigit():
+                    _set_version(int(payload))
+                else:
+                    with engine.connect() as conn:
+                        _set_version(_read_version(conn))
+    finally:
+        raw.close()
+
+
+def _poll_marker(engine):
+    with engine.connect() as conn:
+        # Table feedback_version présente : lecture d'une seule ligne
+        if _read_global_version(conn) is not None:
+            while True:
+                _set_version(_read_global_version(conn))
+                time.sleep(POLL_INTERVAL)
+
+        # SQLite : data_version (propre à la connexion) change dès qu'une autre connexion écrit dans le
+        # fichier, le marqueur n'est relu qu'à ce moment-là
+        sqlite = engine.dialect.name == 'sqlite'
+        last_data_version = None
+        while True:
+            if sqlite:
+                data_version = conn.execute(text("PRAGMA data_version")).scalar()
+                conn.rollback()
+                if data_version != last_data_version:
+                    _set_version(_read_version(conn))
+                last_data_version = data_version
+            else:
+                _set_version(_read_version(conn))
+            time.sleep(POLL_INTERVAL)
+
+
+def _run():
+    while True:
+        try:
+            engine = get_engine()
+            _ensure_version_table(engine)
+            if engine.dialect.name == 'postgresql' and os.getenv("CHANGE_FEED_MODE", "listen") == "listen":
+                _listen_postgres(engine)
+            else:
+                _poll_marker(engine)
+        except Exception as e:
+            print(f"❌ Erreur du flux de changements : {e}")
+            # Les changements manqués pendant la coupure sont rattrapés par la relecture de la version
+            time.sleep(POLL_INTERVAL)
+
+
+# Démarre le thread d'écoute (une seule fois par processus, relancé après un fork)
+def start():
+    global _thread, _thread_pid
+    if _listening():
+        return
+    _thread = threading.Thread(target=_run, name='change-feed', daemon=True)
+    _thread_pid = os.getpid()
+    _thread.start()
+
+
+def init_app(app):
+    server = app.server
+
+    # Endpoint /version : version courante des données (aucune requête SQL)
+    @server.route('/version', methods=['GET'])
+    def data_version():
+        return jsonify({"version": current_version()})
+
+    # Endpoint /events : notifications poussées en Server-Sent Events
+    @server.route('/events', methods=['GET'])
+    def data_events():
+        def stream():
+            version = current_version()
+            yield f"event: version\ndata: {json.dumps({'version': version})}\n\n"
+            while True:
+                new_version = wait_for_change(version, SSE_KEEPALIVE)
+                if new_version == version:
+                    yield ": keepalive\n\n"
+                    continue
+                version = new_version
+                yield f"event: version\ndata: {json.dumps({'version': version})}\n\n"
+        return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    # Le thread d'écoute n'est pas démarré ici : l'import de l'application dans le maître gunicorn (preload_app)
+    # ne doit ouvrir aucun thread avant le fork ; start() est appelé par post_fork (gunicorn.conf.py), au
+    # lancement du serveur de développement (app.py), ou à défaut à la première requête (current_version)
+    return app
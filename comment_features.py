@@ -0,0 +1,169 @@
+import os
+import re
+import sys
+import time
+import threading
+import pandas as pd
+from sqlalchemy import text
+
+# Caractéristiques dérivées d'un commentaire, calculées une seule fois (au scoring par sentiment_api,
+# ou par le rattrapage ci-dessous pour les lignes existantes) et stockées avec la ligne feedback.
+# Les callbacks du tableau de bord lisent ces colonnes au lieu de retraiter le texte à chaque rafraîchissement.
+# Usage (rattrapage) : DATABASE_URL=... python comment_features.py [taille_lot]
+
+# Même plage que les KPI d'origine (emoji_count, top_emojis)
+EMOJI_PATTERN = re.compile(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F700-\U0001F77F\U0001F780-\U0001F7FF\U0001F800-\U0001F8FF\U0001F900-\U0001F9FF\U0001FA00-\U0001FA6F\U0001FA70-\U0001FAFF\U00002702-\U000027B0\U000024C2-\U0001F251]')
+EMOJI_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Emoji_Sentiment_Data.csv')
+
+# Colonnes ajoutées à feedback (migrations.py) : nom -> (type Postgres, type SQLite)
+FEATURE_COLUMNS = {
+    'emojis': ('TEXT', 'TEXT'),  # Emojis du commentaire concaténés dans l'ordre
+    'emoji_score': ('DOUBLE PRECISION', 'REAL'),  # Score moyen des emojis (Emoji_Sentiment_Data.csv)
+    'has_emoji': ('BOOLEAN', 'INTEGER'),
+    'token_count': ('INTEGER', 'INTEGER'),  # Mots séparés par des espaces ("Total Mots")
+    'char_length': ('INTEGER', 'INTEGER'),
+    'detected_language': ('TEXT', 'TEXT'),
+}
+BACKFILL_BATCH_SIZE = 1000
+
+_emoji_sentiment = None
+_columns_available = {}
+_lock = threading.Lock()
+
+
+def create_emoji_sentiment_dict(emoji_df):
+    emoji_dict = {}
+    for _, row in emoji_df.iterrows():
+        emoji = row['Emoji']
+        total = row['Negative'] + row['Neutral'] + row['Positive']
+        if total > 0:
+            score = (row['Positive'] - row['Negative']) / total
+            emoji_dict[emoji] = score
+    return emoji_dict
+
+
+# Dictionnaire emoji -> score, chargé une fois par processus
+def load_emoji_sentiment():
+    global _emoji_sentiment
+    if _emoji_sentiment is None:
+        with _lock:
+            if _emoji_sentiment is None:
+                _emoji_sentiment = create_emoji_sentiment_dict(pd.read_csv(EMOJI_DATA_PATH))
+    return _emoji_sentiment
+
+
+def emoji_score(comment):
+    emoji_sentiment = load_emoji_sentiment()
+    emojis = [char for char in str(comment) if char in emoji_sentiment]
+    if not emojis:
+        return 0.0
+    return sum(emoji_sentiment[emoji] for emoji in emojis) / len(emojis)
+
+
+def detect_language(comment):
+    try:
+        from langdetect import detect, DetectorFactory  # Dépendance de sentiment_api
+        DetectorFactory.seed = 0
+        return detect(comment)
+    except Exception:
+        return None  # Texte sans lettres (emojis seuls) ou langdetect absent
+
+
+# Caractéristiques d'un commentaire ; `score` évite de recalculer le score emoji déjà connu de l'appelant
+def compute_features(comment, score=None):
+    comment = comment if isinstance(comment, str) else ''
+    emojis = ''.join(EMOJI_PATTERN.findall(comment))
+    return {
+        'emojis': emojis,
+        'emoji_score': float(score if score is not None else emoji_score(comment)),
+        'has_emoji': bool(emojis),
+        'token_count': len(comment.split()),
+        'char_length': len(comment),
+        'detected_language': detect_language(comment) if comment.strip() else None,
+    }
+
+
+def _has_columns(conn):
+    dialect = conn.engine.dialect.name
+    try:
+        if dialect == 'postgresql':
+            rows = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name = 'feedback'")).fetchall()
+            names = {row[0] for row in rows}
+        elif dialect == 'sqlite':
+            names = {row[1] for row in conn.execute(text("PRAGMA table_info(feedback)")).fetchall()}
+        else:
+            return False
+    finally:
+        if conn.in_transaction():
+            conn.rollback()
+    return set(FEATURE_COLUMNS) <= names
+
+
+# Colonnes présentes (migration appliquée) : vérifié une fois par base
+def columns_available(conn):
+    url = str(conn.engine.url)
+    if url not in _columns_available:
+        with _lock:
+            if url not in _columns_available:
+                _columns_available[url] = _has_columns(conn)
+                if not _columns_available[url]:
+                    print("ℹ️ Colonnes dérivées absentes (python migrations.py), calcul à la volée")
+    return _columns_available[url]
+
+
+# Versions vectorisées (pandas) des colonnes lues par le tableau de bord
+_VECTORIZED = {
+    'emojis': lambda comments: comments.str.findall(EMOJI_PATTERN).str.join(''),
+    'token_count': lambda comments: comments.str.split().str.len(),
+    'char_length': lambda comments: comments.str.len(),
+}
+
+
+# Complète les colonnes demandées pour les lignes pas encore rattrapées (ou toutes si la migration
+# n'est pas appliquée) ; sans effet si toutes les lignes ont leurs colonnes précalculées
+def fill_missing(df, columns=('emojis', 'token_count', 'char_length')):
+    columns = list(columns)
+    for column in columns:
+        if column not in df.columns:
+            df[column] = None
+    missing = df[columns].isna().any(axis=1)
+    if missing.any():
+        comments = df.loc[missing, 'comment'].fillna('').astype(str)
+        for column in columns:
+            df.loc[missing, column] = _VECTORIZED[column](comments)
+    if 'emojis' in columns:
+        df['emojis'] = df['emojis'].fillna('')
+        df['has_emoji'] = df['emojis'] != ''
+    for column in ('token_count', 'char_length'):
+        if column in columns:
+            df[column] = df[column].astype('int64')
+    return df
+
+
+# Rattrapage des lignes existantes par lots (id croissant), relançable sans risque
+def backfill(batch_size=BACKFILL_BATCH_SIZE):
+    from data_utils import get_engine
+    engine = get_engine()
+    updated = 0
+    last_id = 0
+    start = time.perf_counter()
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT id, comment FROM feedback WHERE char_length IS NULL AND id > :last_id ORDER BY id LIMIT :limit"
+            ), {'last_id': last_id, 'limit': batch_size}).fetchall()
+        if not rows:
+            break
+        params = [dict(compute_features(comment), id=row_id) for row_id, comment in rows]
+        assignments = ', '.join(f"{column} = :{column}" for column in FEATURE_COLUMNS)
+        with engine.begin() as conn:
+            conn.execute(text(f"UPDATE feedback SET {assignments} WHERE id = :id"), params)
+        updated += len(rows)
+        last_id = rows[-1][0]
+        print(f"ℹ️ {updated} commentaires rattrapés")
+    print(f"✅ Rattrapage terminé : {updated} commentaires en {time.perf_counter() - start:.1f}s")
+    return updated
+
+
+if __name__ == '__main__':
+    backfill(int(sys.argv[1]) if len(sys.argv) > 1 else BACKFILL_BATCH_SIZE)
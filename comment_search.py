@@ -0,0 +1,66 @@
+import re
+import threading
+from sqlalchemy import text
+
+# Recherche plein texte dans les commentaires, appliquée en SQL via un index (installé par migrations.py) :
+# - Postgres : colonne générée comment_tsv (tsvector français ou anglais selon la langue) + index GIN
+# - SQLite : table virtuelle FTS5 feedback_fts synchronisée par triggers
+# Sans index installé, repli sur un LIKE (parcours complet de la table).
+
+_index_available = {}
+_lock = threading.Lock()
+
+TERM_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def _has_index(conn, dialect):
+    if dialect == 'postgresql':
+        query = "SELECT 1 FROM information_schema.columns WHERE table_name = 'feedback' AND column_name = 'comment_tsv'"
+    elif dialect == 'sqlite':
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'feedback_fts'"
+    else:
+        return False
+    try:
+        return conn.execute(text(query)).first() is not None
+    finally:
+        if conn.in_transaction():
+            conn.rollback()
+
+
+# Présence de l'index vérifiée une fois par base (pas de requête supplémentaire à chaque recherche)
+def index_available(conn):
+    url = str(conn.engine.url)
+    if url not in _index_available:
+        with _lock:
+            if url not in _index_available:
+                _index_available[url] = _has_index(conn, conn.engine.dialect.name)
+                if not _index_available[url]:
+                    print("ℹ️ Index plein texte absent (python migrations.py), recherche par LIKE")
+    return _index_available[url]
+
+
+# Termes de la recherche : mots uniquement (pas de syntaxe de requête exposée à l'utilisateur)
+def search_terms(query):
+    return TERM_PATTERN.findall(query or '')
+
+
+# Condition SQL (sur la table feedback) et paramètres correspondant à la recherche ;
+# tous les termes doivent être présents, le dernier est recherché comme préfixe (saisie en cours)
+def where_clause(conn, query):
+    terms = search_terms(query)
+    if not terms:
+        return None, {}
+    dialect = conn.engine.dialect.name
+    if index_available(conn):
+        if dialect == 'postgresql':
+            tsquery = ' & '.join(terms[:-1] + [f"{terms[-1]}:*"])
+            # Deux requêtes constantes (et non une par ligne) pour que l'index GIN soit utilisé
+            return ("(comment_tsv @@ to_tsquery('french', :search_query) "
+                    "OR comment_tsv @@ to_tsquery('english', :search_query))"), {'search_query': tsquery}
+        if dialect == 'sqlite':
+            match = ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+            return ("id IN (SELECT rowid FROM feedback_fts WHERE feedback_fts MATCH :search_query)",
+                    {'search_query': match.strip()})
+    operator = 'ILIKE' if dialect == 'postgresql' else 'LIKE'
+    clauses = [f"comment {operator} :search_term_{i}" for i in range(len(terms))]
+    return ' AND '.join(clauses), {f'search_term_{i}': f'%{term}%' for i, term in enumerate(terms)}
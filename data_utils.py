@@ -4,53 +4,134 @@ import pandas as pd
 from sqlalchemy import create_engine, text
 from sqlalchemy.pool import NullPool
 import time
+import threading
+from profiling import record_db
+import comment_search
+import comment_features
+
+_engine = None
+_engine_lock = threading.Lock()
+
+# Moteur SQLAlchemy partagé par le processus (NullPool : nouvelle connexion à chaque requête)
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                # Récupérer la chaîne de connexion
+                DATABASE_URL = os.getenv("DATABASE_URL")
+                if not DATABASE_URL:
+                    raise ValueError("La variable d'environnement DATABASE_URL n'est pas définie")
+                if DATABASE_URL.startswith("postgres"):
+                    _engine = create_engine(
+                        DATABASE_URL,
+                        poolclass=NullPool,
+                        isolation_level="READ COMMITTED",  # S'assurer de lire les dernières données
+                        connect_args={
+                            'application_name': 'feedback_app',  # Pour identifier la connexion
+                            'options': '-c statement_timeout=30000'  # Timeout de 30s
+                        }
+                    )
+                else:
+                    # Base locale (SQLite) utilisée comme substitut hors ligne
+                    _engine = create_engine(DATABASE_URL, poolclass=NullPool)
+    return _engine
+
+# À appeler après un fork pour ne pas partager de connexions entre processus
+def dispose_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+
+# Conditions SQL appliquées avant le chargement (filtres servis par un index) ; les autres filtres restent en pandas
+def build_where(conn, filters):
+    clauses, params = [], {}
+    if filters and filters.get('text_search'):
+        clause, search_params = comment_search.where_clause(conn, filters['text_search'])
+        if clause:
+            clauses.append(clause)
+            params.update(search_params)
+    if filters and filters.get('unique_code'):
+        # Index feedback(unique_code, timestamp)
+        clauses.append("unique_code = :unique_code")
+        params['unique_code'] = filters['unique_code']
+    if filters and filters.get('date_range'):
+        # Bornes de dates en SQL : index feedback(timestamp) et élagage des partitions mensuelles (partitioning.py)
+        start, end = [pd.Timestamp(value).to_pydatetime() for value in filters['date_range']]
+        if conn.engine.dialect.name == 'sqlite':
+            # Dates stockées en texte 'AAAA-MM-JJ HH:MM:SS' : comparaison dans le même format
+            start, end = start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S')
+        clauses.append("timestamp >= :start_date AND timestamp <= :end_date")
+        params.update({'start_date': start, 'end_date': end})
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+# Filtres appliqués en pandas sur les lignes chargées
+def apply_filters(df, filters):
+    if filters:
+        if 'language' in filters and filters['language']:
+            df = df[df['language'].isin(filters['language'])]
+        if 'sentiment' in filters and filters['sentiment']:
+            df = df[df['sentiment'].isin(filters['sentiment'])]
+        if 'rating_range' in filters and filters['rating_range']:
+            df = df[(df['rating'] >= filters['rating_range'][0]) & (df['rating'] <= filters['rating_range'][1])]
+        if 'date_range' in filters and filters['date_range']:
+            df = df[(df['timestamp'] >= filters['date_range'][0]) & (df['timestamp'] <= filters['date_range'][1])]
+    return df
+
+# Lignes filtrées depuis l'instantané local en mémoire (snapshot.py), ou None s'il n'est pas utilisable
+def _snapshot_data(filters):
+    from snapshot import feedback_snapshot  # snapshot importe data_utils
+    if feedback_snapshot is None or (filters and filters.get('text_search')):
+        return None  # La recherche texte reste servie par l'index plein texte de la base
+    parts = []
+    for part in feedback_snapshot.parts():
+        if filters and filters.get('unique_code'):
+            part = part[part['unique_code'] == filters['unique_code']]
+        parts.append(apply_filters(part, filters))
+    df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+    if not df['timestamp'].is_monotonic_decreasing:
+        df = df.sort_values('timestamp', ascending=False, kind='stable', ignore_index=True)
+    return df
 
 def get_feedback_data(filters=None, force_refresh=False):
-    # Récupérer la chaîne de connexion
-    DATABASE_URL = os.getenv("DATABASE_URL")
-    if not DATABASE_URL:
-        raise ValueError("La variable d'environnement DATABASE_URL n'est pas définie")
-    
-    # ✅ SOLUTION : Forcer une nouvelle connexion à chaque fois
-    engine = create_engine(
-        DATABASE_URL,
-        poolclass=NullPool,
-        isolation_level="READ COMMITTED",  # S'assurer de lire les dernières données
-        connect_args={
-            'application_name': 'feedback_app',  # Pour identifier la connexion
-            'options': '-c statement_timeout=30000'  # Timeout de 30s
-        }
-    )
+    # ✅ SOLUTION : Forcer une nouvelle connexion à chaque fois (NullPool)
+    engine = get_engine()
     
     try:
+        df = None if force_refresh else _snapshot_data(filters)
+        if df is not None:
+            print(f"✅ Données chargées (instantané) : {len(df)} enregistrements")
+            return df
+
         # ✅ SOLUTION : Commencer par vérifier les données récentes
         with engine.connect() as conn:
             # Forcer la synchronisation avec la base
             conn.execute(text("SELECT 1"))
             
             # ✅ SOLUTION : Ajouter un paramètre pour forcer le rafraîchissement
-            query = "SELECT rating, sentiment, timestamp, language, unique_code, comment FROM feedback ORDER BY timestamp DESC"
+            where, params = build_where(conn, filters)
+            # Colonnes dérivées précalculées (comment_features.py) si la migration est appliquée
+            feature_columns = ", emojis, token_count, char_length" if comment_features.columns_available(conn) else ""
+            query = f"SELECT id, rating, sentiment, timestamp, language, unique_code, comment{feature_columns} FROM feedback{where} ORDER BY timestamp DESC"
             
             # ✅ SOLUTION : Utiliser execute directement pour éviter tout cache
             if force_refresh:
                 # Forcer un rafraîchissement explicite
                 conn.execute(text("COMMIT"))
             
-            df = pd.read_sql_query(text(query), conn)
+            query_start = time.perf_counter()
+            df = pd.read_sql_query(text(query), conn, params=params)
+            record_db(time.perf_counter() - query_start, len(df))
         
         # Conversion du champ timestamp
         df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # Lignes pas encore rattrapées : colonnes dérivées calculées à la volée
+        df = comment_features.fill_missing(df)
         
         # Application des filtres
-        if filters:
-            if 'language' in filters and filters['language']:
-                df = df[df['language'].isin(filters['language'])]
-            if 'sentiment' in filters and filters['sentiment']:
-                df = df[df['sentiment'].isin(filters['sentiment'])]
-            if 'rating_range' in filters and filters['rating_range']:
-                df = df[(df['rating'] >= filters['rating_range'][0]) & (df['rating'] <= filters['rating_range'][1])]
-            if 'date_range' in filters and filters['date_range']:
-                df = df[(df['timestamp'] >= filters['date_range'][0]) & (df['timestamp'] <= filters['date_range'][1])]
+        df = apply_filters(df, filters)
         
         # ✅ SOLUTION : Log pour débogage
         print(f"✅ Données chargées : {len(df)} enregistrements")
@@ -62,7 +143,3 @@ def get_feedback_data(filters=None, force_refresh=False):
     except Exception as e:
         print(f"❌ Erreur lors du chargement des données : {e}")
         raise
-    
-    finally:
-        # ✅ Fermer proprement
-        engine.dispose()
@@ -5,8 +5,10 @@ import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
 import numpy as np
-from sklearn.decomposition import PCA
+import os
 from data_utils import get_feedback_data
+from projection import comment_projection
+import figure_cache
 
 # Dictionnaire de traductions
 translations = {
@@ -26,10 +28,14 @@ translations = {
     }
 }
 
+# Au-delà de ce nombre de lignes, les distributions sont résumées côté serveur (taille de la réponse bornée)
+SUMMARY_THRESHOLD = int(os.getenv("DISTRIBUTION_SUMMARY_THRESHOLD", "5000"))
+KDE_GRID_POINTS = 100
+DENSITY_BINS = 40  # Grille de la densité 2D (40 x 40 classes)
+
 def layout():
     return html.Div([
         html.H2(id='distributions-title', className="text-center mb-4", style={"color": "#2c3e50", "font-family": "Roboto, sans-serif", "font-weight": "bold"}),
-        dcc.Store(id='distribution-data-store'),
         dbc.Row([
             dbc.Col(dcc.Graph(id='boxplot'), width=6, className="distribution-graph-col"),
             dbc.Col(dcc.Graph(id='violin'), width=6, className="distribution-graph-col")
@@ -40,106 +46,236 @@ def layout():
         ])
     ], className="p-4")
 
+# Boîte à moustaches précalculée (quartiles et moustaches à 1,5 IQR) : une boîte par sentiment
+def summary_boxplot(df, sentiment_colors):
+    fig = go.Figure()
+    for sentiment, ratings in df.groupby('sentiment')['rating']:
+        q1, median, q3 = ratings.quantile([0.25, 0.5, 0.75]).values
+        iqr = q3 - q1
+        lower = ratings[ratings >= q1 - 1.5 * iqr].min()
+        upper = ratings[ratings <= q3 + 1.5 * iqr].max()
+        fig.add_trace(go.Box(
+            x=[sentiment], name=sentiment,
+            q1=[q1], median=[median], q3=[q3], lowerfence=[lower], upperfence=[upper], mean=[ratings.mean()],
+            marker_color=sentiment_colors.get(sentiment, '#3498DB')
+        ))
+    return fig
+
+# Estimation de densité (noyau gaussien, largeur de Scott) sur une grille fixe, calculée sur les valeurs
+# distinctes pondérées par leur effectif : coût indépendant du nombre de lignes
+def rating_density(ratings, grid):
+    counts = ratings.value_counts()
+    values = counts.index.to_numpy(dtype=float)
+    weights = counts.to_numpy(dtype=float)
+    n = weights.sum()
+    std = ratings.std() if n > 1 else 0.0
+    bandwidth = max(std * n ** (-1 / 5), 0.1)
+    z = (grid[:, None] - values[None, :]) / bandwidth
+    density = (np.exp(-0.5 * z ** 2) * weights[None, :]).sum(axis=1) / (n * bandwidth * np.sqrt(2 * np.pi))
+    return density
+
+# Violons dessinés à partir des densités précalculées (contours symétriques autour de chaque catégorie)
+def summary_violin(df, sentiment_colors):
+    fig = go.Figure()
+    grid = np.linspace(df['rating'].min() - 0.5, df['rating'].max() + 0.5, KDE_GRID_POINTS)
+    groups = list(df.groupby('sentiment')['rating'])
+    for position, (sentiment, ratings) in enumerate(groups):
+        density = rating_density(ratings, grid)
+        half_width = 0.4 * density / density.max() if density.max() > 0 else density
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([position - half_width, (position + half_width)[::-1]]),
+            y=np.concatenate([grid, grid[::-1]]),
+            fill='toself', mode='lines', name=sentiment,
+            line=dict(color=sentiment_colors.get(sentiment, '#3498DB'), width=1),
+            hoverinfo='name'
+        ))
+    # Marqueurs de médiane aux mêmes positions numériques que les violons
+    fig.add_trace(go.Scatter(
+        x=list(range(len(groups))),
+        y=[ratings.median() for _, ratings in groups],
+        mode='markers',
+        name='Médiane',
+        marker=dict(color='#E74C3C', size=10)
+    ))
+    # Axe numérique étiqueté avec les sentiments (catégories simulées)
+    fig.update_xaxes(tickmode='array', tickvals=list(range(len(groups))), ticktext=[sentiment for sentiment, _ in groups])
+    return fig
+
+# Densité 2D binée côté serveur (np.histogram2d) : seuls les effectifs de la grille et les centres des classes
+# sont envoyés, pas les points (px.density_heatmap transmet toutes les coordonnées au navigateur)
+def summary_density(scatter_df, nbins):
+    counts, x_edges, y_edges = np.histogram2d(scatter_df['PC1'], scatter_df['PC2'], bins=nbins)
+    fig = go.Figure(go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        z=counts.T,  # histogram2d : lignes = classes de x ; Heatmap : lignes = classes de y
+        colorscale='Viridis',
+        colorbar=dict(title='count'),
+        hovertemplate='PC1 %{x:.2f}<br>PC2 %{y:.2f}<br>%{z:.0f}<extra></extra>'
+    ))
+    return fig
+
+# Bulles agrégées : une bulle par (note, sentiment) dont la taille est le nombre de commentaires
+def summary_bubble(df, sentiment_colors):
+    counts = df.groupby(['rating', 'sentiment']).size().reset_index(name='count')
+    fig = go.Figure()
+    max_count = counts['count'].max() if not counts.empty else 1
+    for sentiment, group in counts.groupby('sentiment'):
+        fig.add_trace(go.Scatter(
+            x=group['rating'], y=[sentiment] * len(group), mode='markers', name=sentiment,
+            marker=dict(size=group['count'], sizemode='area', sizeref=2.0 * max_count / 40 ** 2, sizemin=4,
+                        color=sentiment_colors.get(sentiment, '#3498DB')),
+            customdata=group['count'], hovertemplate='%{x} : %{customdata}<extra>%{y}</extra>'
+        ))
+    return fig
+
 @callback(
     [Output('distributions-title', 'children'),
      Output('boxplot', 'figure'),
      Output('violin', 'figure'),
      Output('scatter', 'figure'),
-     Output('bubble', 'figure'),
-     Output('distribution-data-store', 'data')],
+     Output('bubble', 'figure')],
     [Input('filters-store', 'data'),
      Input('distributions-title-store', 'data'),
-     Input('interval-component', 'n_intervals')]  # Store temporaire pour la langue
+     Input('data-version', 'data')]  # Déclenché uniquement si les données changent
 )
+@figure_cache.memoize('distributions')  # Figures réutilisées tant que filtres, langue et données sont inchangés
 def update_distribution_charts(filters, title_from_store, real_time_update):
     language = 'fr' if not title_from_store else ('en' if title_from_store in translations['en'].values() else 'fr')
     t = translations[language]
 
     df = get_feedback_data(filters)
     if df.empty:
-        return [t['distributions_title']] + [go.Figure()] * 4 + [{}]
+        return [t['distributions_title']] + [go.Figure()] * 4
 
     # Préparation des données
     df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
     df = df.dropna(subset=['rating'])
 
+    # Moyenne et médiane par sentiment en un seul groupby
+    sentiment_stats = df.groupby('sentiment')['rating'].agg(['mean', 'median'])
+
     # Graphique 10: Distribution des Notes par Sentiment (Boxplot)
     sentiment_colors = {'positive': '#27AE60', 'neutral': '#F39C12', 'negative': '#E74C3C'}
-    boxplot_fig = px.box(
-        df,
-        y='rating',
-        color='sentiment',
-        title=f"{t['boxplot_title']} (Moyenne: {df['rating'].mean():.2f})",
-        labels={'rating': 'Note' if language == 'fr' else 'Rating', 'sentiment': 'Sentiment'},
-        color_discrete_map=sentiment_colors,
-        template='plotly_white',
-        height=300
-    )
+    summarize = len(df) > SUMMARY_THRESHOLD
+    if summarize:
+        boxplot_fig = summary_boxplot(df, sentiment_colors)
+        boxplot_fig.update_layout(
+            title=f"{t['boxplot_title']} (Moyenne: {df['rating'].mean():.2f})",
+            yaxis_title='Note' if language == 'fr' else 'Rating',
+            template='plotly_white',
+            height=300
+        )
+    else:
+        boxplot_fig = px.box(
+            df,
+            y='rating',
+            color='sentiment',
+            title=f"{t['boxplot_title']} (Moyenne: {df['rating'].mean():.2f})",
+            labels={'rating': 'Note' if language == 'fr' else 'Rating', 'sentiment': 'Sentiment'},
+            color_discrete_map=sentiment_colors,
+            template='plotly_white',
+            height=300
+        )
     boxplot_fig.add_trace(go.Scatter(
-        x=df['sentiment'].unique(),
-        y=[df[df['sentiment'] == s]['rating'].mean() for s in df['sentiment'].unique()],
+        x=sentiment_stats.index,
+        y=sentiment_stats['mean'].values,
         mode='markers',
         name='Moyenne',
         marker=dict(color='#3498DB', size=10)
     ))
 
     # Graphique 11: Densité des Notes par Sentiment (Violin)
-    violin_fig = px.violin(
-        df,
-        y='rating',
-        color='sentiment',
-        title=f"{t['violin_title']} (Médiane: {df['rating'].median():.2f})",
-        labels={'rating': 'Note' if language == 'fr' else 'Rating', 'sentiment': 'Sentiment'},
-        color_discrete_map=sentiment_colors,
-        template='plotly_white',
-        height=300
-    )
-    violin_fig.add_trace(go.Scatter(
-        x=df['sentiment'].unique(),
-        y=[df[df['sentiment'] == s]['rating'].median() for s in df['sentiment'].unique()],
-        mode='markers',
-        name='Médiane',
-        marker=dict(color='#E74C3C', size=10)
-    ))
+    if summarize:
+        violin_fig = summary_violin(df, sentiment_colors)
+        violin_fig.update_layout(
+            title=f"{t['violin_title']} (Médiane: {df['rating'].median():.2f})",
+            yaxis_title='Note' if language == 'fr' else 'Rating',
+            template='plotly_white',
+            height=300
+        )
+    else:
+        violin_fig = px.violin(
+            df,
+            y='rating',
+            color='sentiment',
+            title=f"{t['violin_title']} (Médiane: {df['rating'].median():.2f})",
+            labels={'rating': 'Note' if language == 'fr' else 'Rating', 'sentiment': 'Sentiment'},
+            color_discrete_map=sentiment_colors,
+            template='plotly_white',
+            height=300
+        )
+    if not summarize:
+        # En mode résumé, summary_violin place lui-même les médianes sur son axe numérique
+        violin_fig.add_trace(go.Scatter(
+            x=sentiment_stats.index,
+            y=sentiment_stats['median'].values,
+            mode='markers',
+            name='Médiane',
+            marker=dict(color='#E74C3C', size=10)
+        ))
 
     # Graphique 12: Répartition des Commentaires par Composantes (Scatter)
-    text_features = df['comment'].dropna().apply(lambda x: len(str(x)))  # Longueur des commentaires
-    X = np.vstack([df['rating'].values, text_features.values]).T
-    pca = PCA(n_components=2)
-    X_pca = pca.fit_transform(X)
-    scatter_df = pd.DataFrame(X_pca, columns=['PC1', 'PC2'])
-    scatter_df['sentiment'] = df['sentiment']
-    scatter_fig = px.scatter(
-        scatter_df,
-        x='PC1',
-        y='PC2',
-        color='sentiment',
-        title=f"{t['scatter_title']} (Variance Expliquée: {sum(pca.explained_variance_ratio_)*100:.1f}%)",
-        labels={'PC1': 'Composante Principale 1', 'PC2': 'Composante Principale 2', 'sentiment': 'Sentiment'},
-        color_discrete_map=sentiment_colors,
-        template='plotly_white',
-        height=300
-    )
-    scatter_fig.update_traces(marker=dict(size=10))
+    # Coordonnées issues de la projection incrémentale (ajustée une fois par version des données)
+    coordinates, explained_variance = comment_projection.project(df['id'])
+    scatter_df = coordinates.reset_index(drop=True)
+    scatter_df['sentiment'] = df['sentiment'].values
+    scatter_df = scatter_df.dropna(subset=['PC1', 'PC2'])
+    scatter_title = f"{t['scatter_title']} (Variance Expliquée: {explained_variance*100:.1f}%)"
+    scatter_labels = {'PC1': 'Composante Principale 1', 'PC2': 'Composante Principale 2', 'sentiment': 'Sentiment'}
+    if summarize:
+        # Densité 2D : taille de la réponse bornée par la grille, pas par le nombre de commentaires
+        scatter_fig = summary_density(scatter_df, nbins=DENSITY_BINS)
+        scatter_fig.update_layout(
+            title=scatter_title,
+            xaxis_title=scatter_labels['PC1'],
+            yaxis_title=scatter_labels['PC2'],
+            template='plotly_white',
+            height=300
+        )
+    else:
+        scatter_fig = px.scatter(
+            scatter_df,
+            x='PC1',
+            y='PC2',
+            color='sentiment',
+            title=scatter_title,
+            labels=scatter_labels,
+            color_discrete_map=sentiment_colors,
+            template='plotly_white',
+            height=300,
+            render_mode='webgl'  # Rendu WebGL (scattergl)
+        )
+        scatter_fig.update_traces(marker=dict(size=10))
 
     # Graphique 13: Taille des Notes par Sentiment (Bubble)
-    bubble_fig = px.scatter(
-        df,
-        x='rating',
-        y='sentiment',
-        size='rating',  # Taille proportionnelle à la note
-        color='sentiment',
-        title=t['bubble_title'],
-        labels={'rating': 'Note' if language == 'fr' else 'Rating', 'sentiment': 'Sentiment'},
-        color_discrete_map=sentiment_colors,
-        template='plotly_white',
-        height=300
-    )
-    bubble_fig.update_traces(marker=dict(sizemin=10, sizemode='area'))
+    if summarize:
+        bubble_fig = summary_bubble(df, sentiment_colors)
+        bubble_fig.update_layout(
+            title=t['bubble_title'],
+            xaxis_title='Note' if language == 'fr' else 'Rating',
+            yaxis_title='Sentiment',
+            template='plotly_white',
+            height=300
+        )
+    else:
+        bubble_fig = px.scatter(
+            df,
+            x='rating',
+            y='sentiment',
+            size='rating',  # Taille proportionnelle à la note
+            color='sentiment',
+            title=t['bubble_title'],
+            labels={'rating': 'Note' if language == 'fr' else 'Rating', 'sentiment': 'Sentiment'},
+            color_discrete_map=sentiment_colors,
+            template='plotly_white',
+            height=300
+        )
+        bubble_fig.update_traces(marker=dict(sizemin=10, sizemode='area'))
     bubble_fig.add_annotation(
         text=f"Total: {len(df)}",
         xref="paper", yref="paper",
         x=0.95, y=0.95, showarrow=False
     )
 
-    return [t['distributions_title'], boxplot_fig, violin_fig, scatter_fig, bubble_fig, df.to_dict('records')]
\ No newline at end of file
+    return [t['distributions_title'], boxplot_fig, violin_fig, scatter_fig, bubble_fig]
\ No newline at end of file
@@ -0,0 +1,173 @@
+import os
+import re
+import sys
+import time
+import hashlib
+from collections import Counter
+import numpy as np
+
+# Prédiction du modèle de sentiment sans scikit-learn : le vectoriseur TF-IDF (vocabulaire, idf) et le modèle
+# linéaire (coefficients, constantes) sont exportés dans un fichier .npz compact, puis un commentaire est noté
+# par un produit scalaire creux (seuls les mots présents du vocabulaire sont lus) : mêmes étiquettes que
+# model.predict, sans la validation ni l'aiguillage de scikit-learn appelés à chaque commentaire.
+# Le fichier garde l'empreinte SHA-256 des .pkl exportés : après un réentraînement sans nouvel export, le scorer
+# est considéré périmé (is_current) et sentiment_api repasse par scikit-learn.
+# Usage : python fast_scorer.py export   (à relancer après chaque réentraînement des .pkl)
+#         python fast_scorer.py verify   (étiquettes comparées à scikit-learn sur les commentaires de la base)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCORER_PATH = os.path.join(ROOT, 'sentiment_scorer.npz')
+MODEL_PATH = os.path.join(ROOT, 'sentiment_model.pkl')
+VECTORIZER_PATH = os.path.join(ROOT, 'tfidf_vectorizer.pkl')
+
+# Paramètres du vectoriseur reproduits par le scorer (toute autre valeur est refusée à l'export)
+SUPPORTED_VECTORIZER = {
+    'analyzer': 'word', 'ngram_range': (1, 1), 'stop_words': None, 'strip_accents': None, 'binary': False,
+    'sublinear_tf': False, 'use_idf': True, 'preprocessor': None, 'tokenizer': None,
+}
+
+
+class LinearScorer:
+    def __init__(self, terms, idf, coef, intercept, classes, token_pattern, lowercase, norm):
+        self.vocabulary = {term: index for index, term in enumerate(terms)}
+        self.idf = idf
+        self.coef = np.ascontiguousarray(coef.T)  # (caractéristiques, classes) : une ligne lue par mot présent
+        self.intercept = intercept
+        self.classes = classes
+        self.token_pattern = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.vocabulary_size = len(terms)
+
+    # Scores de décision (équivalent de model.decision_function) ; `extra` = caractéristiques ajoutées après le TF-IDF
+    def decision(self, text, extra=()):
+        text = text.lower() if self.lowercase else text
+        counts = Counter(self.vocabulary[token] for token in self.token_pattern.findall(text) if token in self.vocabulary)
+        scores = self.intercept.copy()
+        if counts:
+            indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+            weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self.idf[indices]
+            if self.norm == 'l2':
+                weights /= np.sqrt(weights @ weights)
+            scores += weights @ self.coef[indices]
+        if len(extra):
+            scores += np.asarray(extra, dtype=np.float64) @ self.coef[self.vocabulary_size:]
+        return scores
+
+    def predict(self, text, extra=()):
+        scores = self.decision(text, extra)
+        if len(self.classes) == 2:
+            return self.classes[int(scores[0] > 0)]  # Modèle binaire : un seul score
+        return self.classes[int(np.argmax(scores))]
+
+
+# Empreinte des fichiers du modèle et du vectoriseur
+def source_hash(paths=(MODEL_PATH, VECTORIZER_PATH)):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Le scorer correspond-il aux .pkl présents ? (True si les .pkl ne sont pas livrés avec le service)
+def is_current(path=SCORER_PATH, paths=(MODEL_PATH, VECTORIZER_PATH)):
+    if not all(os.path.exists(source) for source in paths):
+        return True
+    with np.load(path, allow_pickle=False) as data:
+        if 'source_sha256' not in data:
+            return False
+        return str(data['source_sha256']) == source_hash(paths)
+
+
+def export(vectorizer, model, path=SCORER_PATH, source_sha256=''):
+    params = vectorizer.get_params()
+    unsupported = {name: params[name] for name, value in SUPPORTED_VECTORIZER.items() if params[name] != value}
+    if unsupported or params['norm'] not in ('l2', None):
+        raise ValueError(f"Vectoriseur non reproductible par le scorer : {unsupported or params['norm']}")
+    if not (hasattr(model, 'coef_') and hasattr(model, 'intercept_')):
+        raise ValueError(f"Modèle non linéaire ({type(model).__name__}) : export impossible")
+    terms = np.empty(len(vectorizer.vocabulary_), dtype=object)
+    for term, index in vectorizer.vocabulary_.items():
+        terms[index] = term
+    np.savez_compressed(
+        path,
+        terms=terms.astype(str),
+        idf=vectorizer.idf_.astype(np.float64),
+        coef=model.coef_.astype(np.float64),
+        intercept=np.atleast_1d(model.intercept_).astype(np.float64),
+        classes=np.asarray(model.classes_).astype(str),
+        token_pattern=np.array(params['token_pattern']),
+        lowercase=np.array(params['lowercase']),
+        norm=np.array(params['norm'] or ''),
+        source_sha256=np.array(source_sha256),
+    )
+    print(f"✅ Scorer exporté : {path} ({os.path.getsize(path) / 1024:.0f} Ko, {len(terms)} mots, {model.coef_.shape[1]} caractéristiques)")
+
+
+def load(path=SCORER_PATH):
+    with np.load(path, allow_pickle=False) as data:
+        return LinearScorer(
+            terms=data['terms'].tolist(),
+            idf=data['idf'],
+            coef=data['coef'],
+            intercept=data['intercept'],
+            classes=data['classes'].tolist(),
+            token_pattern=str(data['token_pattern']),
+            lowercase=bool(data['lowercase']),
+            norm=str(data['norm']) or None,
+        )
+
+
+def _load_pickles():
+    import joblib
+    return joblib.load(VECTORIZER_PATH), joblib.load(MODEL_PATH)
+
+
+# Comparaison avec scikit-learn : mêmes entrées que sentiment_api (texte nettoyé sans traduction, score emoji x 0.5)
+def verify(path=SCORER_PATH):
+    import pandas as pd
+    from sqlalchemy import text
+    from data_utils import get_engine
+    os.environ['SENTIMENT_TRANSLATION'] = '0'
+    import sentiment_api
+    vectorizer, model = _load_pickles()
+    scorer = load(path)
+    with get_engine().connect() as conn:
+        comments = pd.read_sql_query(text("SELECT comment FROM feedback"), conn)['comment'].fillna('').tolist()
+    # Commentaires synthétiques en plus : vocabulaire et emojis variés
+    from benchmarks import synthetic
+    rng = np.random.default_rng(0)
+    stamps = pd.date_range('2025-01-01', periods=2000, freq='min')
+    comments += synthetic.generate_batch(stamps, 1, rng, synthetic._emoji_pools(), 100)['comment'].tolist()
+    inputs = [(sentiment_api.clean_text(comment), sentiment_api.get_emoji_score(comment) * 0.5) for comment in comments]
+
+    mismatches = 0
+    sklearn_time = scorer_time = 0.0
+    for cleaned, emoji_feature in inputs:
+        start = time.perf_counter()
+        features = np.hstack((vectorizer.transform([cleaned]).toarray(), [[emoji_feature]]))
+        expected = model.predict(features)[0]
+        sklearn_time += time.perf_counter() - start
+        start = time.perf_counter()
+        label = scorer.predict(cleaned, [emoji_feature])
+        scorer_time += time.perf_counter() - start
+        mismatches += label != expected
+    count = len(inputs)
+    print(f"{'étiquettes identiques':<24} {count - mismatches}/{count}")
+    print(f"{'scikit-learn':<24} {sklearn_time / count * 1e6:>8.1f} µs/commentaire")
+    print(f"{'scorer NumPy':<24} {scorer_time / count * 1e6:>8.1f} µs/commentaire")
+    return mismatches == 0
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'export'
+    if command == 'export':
+        export(*_load_pickles(), source_sha256=source_hash())
+    elif command == 'verify':
+        os.environ.setdefault("DATABASE_URL", "sqlite:///feedback.db")
+        sys.exit(0 if verify() else 1)
+    else:
+        print("Usage : python fast_scorer.py [export|verify]")
+        sys.exit(2)
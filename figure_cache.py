@@ -0,0 +1,209 @@
+import os
+import json
+import pickle
+import hashlib
+import threading
+from functools import wraps
+from collections import OrderedDict
+import change_feed
+
+# Cache des figures des onglets, indexé par (onglet, filtres normalisés, langue, version des données).
+# Niveau 1 : LRU borné en mémoire, partagé par tous les callbacks d'un worker.
+# Niveau 2 (optionnel, partagé entre workers gunicorn) via FIGURE_CACHE_URL :
+#   - redis://host:port/0 (nécessite le paquet redis)
+#   - file:///chemin/vers/dossier (un fichier pickle par entrée)
+MAX_ENTRIES = int(os.getenv("FIGURE_CACHE_SIZE", "128"))
+CACHE_URL = os.getenv("FIGURE_CACHE_URL", "")
+REDIS_TTL = int(os.getenv("FIGURE_CACHE_TTL", "3600"))
+
+MISSING = object()
+
+
+class _FileBackend:
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pkl')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                stored_key, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return MISSING
+        return value if stored_key == key else MISSING
+
+    def set(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # Écriture atomique, lisible par les autres workers
+        self._evict()
+
+    def _evict(self):
+        entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.pkl')]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda path: os.path.getmtime(path))
+        for path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(self.directory, name))
+
+
+class _RedisBackend:
+    def __init__(self, url):
+        import redis  # Dépendance optionnelle
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        data = self.client.get(f"figure_cache:{key}")
+        return pickle.loads(data) if data is not None else MISSING
+
+    def set(self, key, value):
+        self.client.set(f"figure_cache:{key}", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=REDIS_TTL)
+
+    def clear(self):
+        for key in self.client.scan_iter("figure_cache:*"):
+            self.client.delete(key)
+
+
+def _create_backend(url):
+    if not url:
+        return None
+    try:
+        if url.startswith('redis://') or url.startswith('rediss://'):
+            return _RedisBackend(url)
+        if url.startswith('file://'):
+            return _FileBackend(url[len('file://'):], MAX_ENTRIES * 4)
+        return _FileBackend(url, MAX_ENTRIES * 4)
+    except Exception as e:
+        print(f"❌ Cache partagé indisponible ({url}) : {e}")
+        return None
+
+
+_lru = OrderedDict()
+_lock = threading.Lock()
+_backend = _create_backend(CACHE_URL)
+_stats = {'hits': 0, 'shared_hits': 0, 'misses': 0}
+
+
+# Représentation canonique des filtres (ordre des listes et format des dates sans importance)
+def normalize_filters(filters):
+    normalized = {}
+    for name, value in sorted((filters or {}).items()):
+        if value in (None, [], '', {}):
+            continue
+        if name == 'date_range':
+            value = [str(v)[:19].replace('T', ' ') if v is not None else None for v in value]
+        elif name == 'rating_range':
+            value = [float(v) for v in value]
+        elif isinstance(value, (list, tuple)):
+            value = sorted(str(v) for v in value)
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+def make_key(namespace, filters, language, version=None):
+    if version is None:
+        version = change_feed.current_version()
+    return f"{namespace}|{normalize_filters(filters)}|{language}|{version}"
+
+
+def get(key):
+    with _lock:
+        if key in _lru:
+            _lru.move_to_end(key)
+            _stats['hits'] += 1
+            return _lru[key]
+    if _backend is not None:
+        try:
+            value = _backend.get(key)
+        except Exception as e:
+            print(f"❌ Lecture du cache partagé impossible : {e}")
+            value = MISSING
+        if value is not MISSING:
+            _store_local(key, value)
+            _stats['shared_hits'] += 1
+            return value
+    _stats['misses'] += 1
+    return MISSING
+
+
+def _store_local(key, value):
+    with _lock:
+        _lru[key] = value
+        _lru.move_to_end(key)
+        while len(_lru) > MAX_ENTRIES:
+            _lru.popitem(last=False)
+
+
+def put(key, value):
+    _store_local(key, value)
+    if _backend is not None:
+        try:
+            _backend.set(key, value)
+        except Exception as e:
+            print(f"❌ Écriture du cache partagé impossible : {e}")
+
+
+# Valeurs modifiables partagées entre workers (ex. statut d'un job de rapport) : lues et écrites dans le
+# cache partagé uniquement, sans passer par le LRU local qui en garderait une copie périmée.
+# Sans cache partagé, get_shared renvoie MISSING et put_shared ne fait rien.
+def get_shared(key):
+    if _backend is None:
+        return MISSING
+    try:
+        return _backend.get(key)
+    except Exception as e:
+        print(f"❌ Lecture du cache partagé impossible : {e}")
+        return MISSING
+
+
+def put_shared(key, value):
+    if _backend is None:
+        return
+    try:
+        _backend.set(key, value)
+    except Exception as e:
+        print(f"❌ Écriture du cache partagé impossible : {e}")
+
+
+def clear():
+    with _lock:
+        _lru.clear()
+    if _backend is not None:
+        _backend.clear()
+
+
+def stats():
+    with _lock:
+        size = len(_lru)
+    return dict(_stats, size=size, max_entries=MAX_ENTRIES, shared=type(_backend).__name__ if _backend else None)
+
+
+# Décorateur pour les callbacks d'onglet de signature (filters, language, *déclencheurs) :
+# seuls les filtres, la langue et la version des données entrent dans la clé
+def memoize(namespace):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(filters, language, *args):
+            key = make_key(namespace, filters, language)
+            cached = get(key)
+            if cached is not MISSING:
+                return cached
+            result = func(filters, language, *args)
+            put(key, result)
+            return result
+        return wrapper
+    return decorator
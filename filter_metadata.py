@@ -0,0 +1,66 @@
+import os
+import time
+import threading
+import pandas as pd
+from sqlalchemy import text
+from data_utils import get_engine
+from profiling import record_db
+import change_feed
+
+# Métadonnées des filtres (langues, bornes de dates, nombre de lignes) calculées en une seule requête,
+# mises en cache et invalidées lorsque la version des données (change_feed) change.
+_cache = {'version': None, 'metadata': None}
+# Fenêtre de dates proposée par défaut (jours) ; 0 = tout l'historique
+DEFAULT_WINDOW_DAYS = int(os.getenv("DEFAULT_WINDOW_DAYS", "0"))
+_lock = threading.Lock()
+
+
+def _load_metadata():
+    query = """
+        SELECT language, COUNT(*) AS count, MIN(timestamp) AS min_timestamp, MAX(timestamp) AS max_timestamp
+        FROM feedback
+        GROUP BY language
+    """
+    query_start = time.perf_counter()
+    with get_engine().connect() as conn:
+        df = pd.read_sql_query(text(query), conn)
+    record_db(time.perf_counter() - query_start, len(df))
+
+    min_timestamp = pd.to_datetime(df['min_timestamp']).min() if not df.empty else None
+    max_timestamp = pd.to_datetime(df['max_timestamp']).max() if not df.empty else None
+    languages = df.dropna(subset=['language'])
+    return {
+        'languages': sorted(languages['language'].tolist()),
+        'language_counts': dict(zip(languages['language'], languages['count'].astype(int))),
+        'min_timestamp': str(min_timestamp) if pd.notna(min_timestamp) else None,
+        'max_timestamp': str(max_timestamp) if pd.notna(max_timestamp) else None,
+        'row_count': int(df['count'].sum()) if not df.empty else 0,
+    }
+
+
+def get_filter_metadata():
+    version = change_feed.current_version()
+    if _cache['metadata'] is not None and _cache['version'] == version:
+        return _cache['metadata']
+    with _lock:
+        if _cache['metadata'] is None or _cache['version'] != version:
+            _cache['metadata'] = _load_metadata()
+            _cache['version'] = version
+            print(f"✅ Métadonnées des filtres chargées : {_cache['metadata']['row_count']} enregistrements")
+    return _cache['metadata']
+
+
+def language_options():
+    return [{'label': lang, 'value': lang} for lang in get_filter_metadata()['languages']]
+
+
+def min_timestamp():
+    return get_filter_metadata()['min_timestamp']
+
+
+# Début de la plage de dates par défaut : requêtes bornées aux partitions récentes si DEFAULT_WINDOW_DAYS est défini
+def default_start_date():
+    start = min_timestamp()
+    if DEFAULT_WINDOW_DAYS <= 0 or start is None:
+        return start
+    return str(max(pd.Timestamp(start), pd.Timestamp('today').normalize() - pd.Timedelta(days=DEFAULT_WINDOW_DAYS)))
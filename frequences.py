@@ -1,3 +1,4 @@
+import os
 import dash
 from dash import html, dcc, callback, Output, Input, State
 import dash_bootstrap_components as dbc
@@ -5,10 +6,14 @@ import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
 from wordcloud import WordCloud
-from PIL import Image
-import numpy as np
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from data_utils import get_feedback_data
+from PIL import features
+import figure_cache
+from word_index import word_index
+import aggregates
 
 # Dictionnaire de traductions
 translations = {
@@ -31,7 +36,6 @@ translations = {
 def layout():
     return html.Div([
         html.H2(id='frequences-title', className="text-center mb-4", style={"color": "#2c3e50", "font-family": "Roboto, sans-serif", "font-weight": "bold"}),
-        dcc.Store(id='frequence-data-store'),
         dbc.Row([
             dbc.Col(dcc.Graph(id='wordcloud'), width=6, className="frequence-graph-col"),
             dbc.Col(dcc.Graph(id='wordfreq-bar'), width=6, className="frequence-graph-col")
@@ -42,40 +46,111 @@ def layout():
         ])
     ], className="p-4")
 
+# Rendu des nuages de mots dans un pool borné : le thread de requête attend son rendu (appel bloquant), mais des
+# demandes identiques simultanées partagent un seul rendu. Pool dimensionné comme les threads d'un worker
+# (GUNICORN_THREADS) pour que des filtres différents ne fassent pas la queue derrière un seul rendu.
+WORDCLOUD_MAX_WORDS = 200
+RENDER_THREADS = int(os.getenv("WORDCLOUD_RENDER_THREADS", os.getenv("GUNICORN_THREADS", "4")))
+_render_pool = ThreadPoolExecutor(max_workers=RENDER_THREADS, thread_name_prefix='wordcloud')
+_pending_renders = {}
+_pending_lock = threading.Lock()
+_IMAGE_FORMAT = 'webp' if features.check('webp') else 'png'  # WebP ~2x plus léger que PNG si disponible
+
+def _render_wordcloud_image(frequencies):
+    wordcloud = WordCloud(width=800, height=300, background_color='white', min_font_size=10,
+                          colormap='viridis', max_words=WORDCLOUD_MAX_WORDS).generate_from_frequencies(frequencies)  # Palette viridis pour un gradient
+    buffer = BytesIO()
+    if _IMAGE_FORMAT == 'webp':
+        wordcloud.to_image().save(buffer, format='WEBP', quality=85, method=4)
+    else:
+        wordcloud.to_image().save(buffer, format='PNG', optimize=True)
+    return f"data:image/{_IMAGE_FORMAT};base64," + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+# Image du nuage (data URI WebP/PNG) et total de mots en cache par (filtres, version des données), indépendants de la langue
+def get_wordcloud_image(filters):
+    key = figure_cache.make_key('wordcloud', filters, '')
+    cached = figure_cache.get(key)
+    if cached is not figure_cache.MISSING:
+        return cached
+    with _pending_lock:
+        future = _pending_renders.get(key)
+    if future is None:
+        # Fréquences calculées hors du verrou (rafraîchissement possible de l'index) : seuls la vérification
+        # et l'enregistrement du rendu en cours sont sérialisés
+        frequencies, total_words = word_index.top_words(filters, top_n=WORDCLOUD_MAX_WORDS)
+        if frequencies.empty:
+            return None, total_words
+        with _pending_lock:
+            future = _pending_renders.get(key)
+            if future is None:
+                future = _render_pool.submit(_render_wordcloud_image, frequencies.to_dict())
+                future.total_words = total_words
+                _pending_renders[key] = future
+    try:
+        result = (future.result(), future.total_words)
+    finally:
+        with _pending_lock:
+            _pending_renders.pop(key, None)
+    figure_cache.put(key, result)
+    return result
+
+@callback(
+    Output('wordcloud', 'figure'),
+    [Input('filters-store', 'data'),
+     Input('frequences-title-store', 'data'),
+     Input('data-version', 'data')]  # Déclenché uniquement si les données changent
+)
+def update_wordcloud(filters, title_from_store, real_time_update):
+    language = 'fr' if not title_from_store else ('en' if title_from_store in translations['en'].values() else 'fr')
+    t = translations[language]
+
+    image, total_words = get_wordcloud_image(filters)
+    if image is None:
+        return go.Figure()
+
+    # Graphique 6: Nuage de mots (image compressée plutôt qu'une matrice de pixels)
+    wordcloud_fig = go.Figure()
+    wordcloud_fig.add_layout_image(dict(source=image, xref='x', yref='y', x=0, y=300, sizex=800, sizey=300,
+                                        sizing='stretch', layer='below'))
+    wordcloud_fig.update_xaxes(visible=False, range=[0, 800])
+    wordcloud_fig.update_yaxes(visible=False, range=[0, 300], scaleanchor='x')
+    wordcloud_fig.update_layout(
+        title=f"{t['wordcloud_title']} (Total Mots: {total_words})",
+        height=300,
+        margin=dict(l=0, r=0, t=40, b=0),
+        autosize=False,
+        template='plotly_white'
+    )
+    return wordcloud_fig
+
 @callback(
     [Output('frequences-title', 'children'),
-     Output('wordcloud', 'figure'),
      Output('wordfreq-bar', 'figure'),
      Output('grouped-bar', 'figure'),
-     Output('heatmap', 'figure'),
-     Output('frequence-data-store', 'data')],
+     Output('heatmap', 'figure')],
     [Input('filters-store', 'data'),
      Input('frequences-title-store', 'data'),
-     Input('interval-component', 'n_intervals')]  # Store temporaire pour la langue
+     Input('data-version', 'data')]  # Déclenché uniquement si les données changent
 )
+@figure_cache.memoize('frequences')  # Figures réutilisées tant que filtres, langue et données sont inchangés
 def update_frequence_charts(filters, title_from_store, real_time_update):
     language = 'fr' if not title_from_store else ('en' if title_from_store in translations['en'].values() else 'fr')
     t = translations[language]
 
-    df = get_feedback_data(filters)
-    if df.empty:
-        return [t['frequences_title']] + [go.Figure()] * 4 + [{}]
+    # Tableau croisé sentiment × note issu du cube partagé (données chargées seulement s'il n'est pas en cache)
+    cube = aggregates.get_cube(filters)
+    if aggregates.total(cube) == 0:
+        return [t['frequences_title']] + [go.Figure()] * 3
 
-    # Préparation des données textuelles
-    text_data = ' '.join(df['comment'].dropna().astype(str).values)
-    word_freq = pd.Series(text_data.lower().split()).value_counts()[:20]  # Top 20 mots
+    # Préparation des données textuelles : top 20 issu de l'index incrémental (sans re-tokenisation)
+    word_freq, _ = word_index.top_words(filters, top_n=20)
+    crosstab = aggregates.sentiment_by_rating(cube)
 
-    # Graphique 6: Nuage de mots
-    wordcloud = WordCloud(width=800, height=300, background_color='white', min_font_size=10,
-                          colormap='viridis').generate(text_data)  # Palette viridis pour un gradient
-    img_array = np.array(wordcloud.to_image())
-    wordcloud_fig = go.Figure(go.Image(z=img_array))
-    wordcloud_fig.update_layout(
-        title=f"{t['wordcloud_title']} (Total Mots: {len(text_data.split())})",
-        height=300,
-        margin=dict(l=0, r=0, t=40, b=0),
-        autosize=False
-    )
+    return [t['frequences_title']] + build_frequence_figures(word_freq, crosstab, language)
+
+# Construction des figures à partir des agrégats uniquement (top des mots et tableau croisé)
+def build_frequence_figures(word_freq, crosstab, language):
+    t = translations[language]
 
     # Graphique 7: Diagramme en barres des mots les plus fréquents
     wordfreq_fig = go.Figure(
@@ -96,7 +171,7 @@ def update_frequence_charts(filters, title_from_store, real_time_update):
     )
 
     # Graphique 8: Diagramme en barres groupées (par sentiment)
-    grouped_data = df.groupby(['sentiment', 'rating']).size().unstack(fill_value=0)
+    grouped_data = crosstab
     sentiment_colors = {'positive': '#27AE60', 'neutral': '#F39C12', 'negative': '#E74C3C'}  # Couleurs caractéristiques
     grouped_fig = go.Figure(
         data=[go.Bar(
@@ -120,7 +195,7 @@ def update_frequence_charts(filters, title_from_store, real_time_update):
     )
 
     # Graphique 9: Carte thermique
-    heatmap_data = df.groupby(['sentiment', 'rating']).size().unstack(fill_value=0)
+    heatmap_data = crosstab
     heatmap_fig = go.Figure(
         data=go.Heatmap(
             z=heatmap_data.values,
@@ -143,4 +218,4 @@ def update_frequence_charts(filters, title_from_store, real_time_update):
         x=0.95, y=0.95, showarrow=False
     )
 
-    return [t['frequences_title'], wordcloud_fig, wordfreq_fig, grouped_fig, heatmap_fig, df.to_dict('records')]
\ No newline at end of file
+    return [wordfreq_fig, grouped_fig, heatmap_fig]
\ No newline at end of file
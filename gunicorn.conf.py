@@ -0,0 +1,40 @@
+import os
+import multiprocessing
+
+# Configuration gunicorn de production pour le tableau de bord Dash.
+# Usage : gunicorn -c gunicorn.conf.py wsgi:server
+#
+# - preload_app : imports lourds (pandas, plotly, sklearn), métadonnées des filtres, index des mots et
+#   projection ACP chargés une seule fois dans le maître puis partagés (copy-on-write) par les workers
+# - workers gthread : les callbacks attendent surtout la base, plusieurs threads par worker suffisent
+# - post_fork : chaque worker recrée son moteur SQLAlchemy, son pool de rendu des graphiques PDF et son
+#   écoute des changements
+# - cache des figures partagé entre workers (FIGURE_CACHE_URL, fichiers locaux par défaut)
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8050')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))  # Attention : chaque client /events (SSE) occupe un thread
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))  # Recyclage des workers (fuites mémoire)
+max_requests_jitter = 200
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", None)
+errorlog = "-"
+
+# Lu par figure_cache à l'import : doit être défini avant le chargement de l'application
+os.environ.setdefault("FIGURE_CACHE_URL", "file:///tmp/feedback_figure_cache")
+
+
+def post_fork(server, worker):
+    import data_utils
+    import change_feed
+    import reports
+    # Aucune connexion héritée du maître ; pool des graphiques PDF forké tant que le worker n'a qu'un thread,
+    # puis thread d'écoute propre au worker
+    data_utils.dispose_engine()
+    reports.start_chart_pool()
+    change_feed.start()
+    server.log.info(f"✅ Worker {worker.pid} initialisé")
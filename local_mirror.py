@@ -0,0 +1,236 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+import pandas as pd
+from sqlalchemy import text
+from data_utils import get_engine
+from profiling import record_db
+import change_feed
+import comment_features
+
+# Miroir analytique local (SQLite, un fichier par machine, partagé par les workers) de la table feedback.
+# Synchronisé par réplication incrémentale (id > plus grand id déjà copié) à chaque changement de version ;
+# reconstruction complète si des lignes ont été modifiées ou supprimées : compteur des UPDATE/DELETE de
+# feedback_version (change_feed.modification_count) différent de celui de la dernière synchronisation, ou
+# nombre de lignes différent. Sans table feedback_version, seules les suppressions sont détectées (une ligne
+# modifiée en place reste périmée dans le miroir jusqu'à la prochaine reconstruction).
+# Les agrégats du tableau de bord (cube des graphiques, KPI) sont alors calculés en SQL sur ce fichier local,
+# sans transférer les lignes brutes depuis la base distante.
+# Activé par LOCAL_MIRROR_PATH (ex. /tmp/feedback_mirror.db) ; désactivé si la variable est vide.
+MIRROR_PATH = os.getenv("LOCAL_MIRROR_PATH", "")
+SYNC_BATCH_SIZE = 10000
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+COLUMNS = ['id', 'language', 'comment', 'rating', 'unique_code', 'sentiment', 'timestamp', 'emojis', 'token_count', 'char_length']
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS feedback_mirror (
+        id INTEGER PRIMARY KEY,
+        language TEXT,
+        comment TEXT,
+        rating REAL,
+        unique_code TEXT,
+        sentiment TEXT,
+        timestamp TEXT,
+        emojis TEXT,
+        token_count INTEGER,
+        char_length INTEGER
+    )""",
+    "CREATE INDEX IF NOT EXISTS feedback_mirror_timestamp_idx ON feedback_mirror (timestamp)",
+    "CREATE INDEX IF NOT EXISTS feedback_mirror_sentiment_idx ON feedback_mirror (sentiment, rating)",
+    "CREATE INDEX IF NOT EXISTS feedback_mirror_language_idx ON feedback_mirror (language)",
+    "CREATE INDEX IF NOT EXISTS feedback_mirror_unique_code_idx ON feedback_mirror (unique_code, timestamp)",
+    # Compteur de modifications de la base principale lu lors de la dernière synchronisation
+    "CREATE TABLE IF NOT EXISTS mirror_state (id INTEGER PRIMARY KEY CHECK (id = 1), modifications INTEGER)",
+]
+
+# Filtres traduisibles en SQL sur le miroir (la recherche texte reste servie par l'index de la base principale)
+SUPPORTED_FILTERS = {'language', 'sentiment', 'rating_range', 'date_range', 'unique_code'}
+
+
+class LocalMirror:
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")  # Lectures concurrentes pendant la synchronisation
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _fetch(self, conn, after_id, limit=None):
+        features = "emojis, token_count, char_length" if comment_features.columns_available(conn) else "NULL AS emojis, NULL AS token_count, NULL AS char_length"
+        query = f"SELECT id, language, comment, rating, unique_code, sentiment, timestamp, {features} FROM feedback WHERE id > :after_id ORDER BY id"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        query_start = time.perf_counter()
+        df = pd.read_sql_query(text(query), conn, params={'after_id': after_id})
+        record_db(time.perf_counter() - query_start, len(df))
+        df['timestamp'] = pd.to_datetime(df['timestamp']).dt.strftime(TIMESTAMP_FORMAT)
+        return comment_features.fill_missing(df)[COLUMNS]
+
+    def _copy(self, mirror, primary, after_id):
+        copied = 0
+        while True:
+            df = self._fetch(primary, after_id, SYNC_BATCH_SIZE)
+            if df.empty:
+                return copied
+            rows = [tuple(None if pd.isna(value) else value for value in row) for row in df.itertuples(index=False)]
+            mirror.executemany(f"INSERT OR REPLACE INTO feedback_mirror ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            copied += len(rows)
+            after_id = int(df['id'].iloc[-1])
+
+    # Synchronisation (une fois par version des données) ; BEGIN IMMEDIATE sérialise les workers de la machine
+    def refresh(self):
+        version = change_feed.current_version()
+        if self.version == version:
+            return
+        with self._lock:
+            if self.version == version:
+                return
+            start = time.perf_counter()
+            mirror = self._connect()
+            try:
+                mirror.execute("BEGIN IMMEDIATE")
+                high_water_id, mirror_rows = mirror.execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM feedback_mirror").fetchone()
+                synced_modifications = mirror.execute("SELECT modifications FROM mirror_state WHERE id = 1").fetchone()
+                with get_engine().connect() as primary:
+                    # Lu avant la copie : une modification pendant la copie déclenchera la reconstruction suivante
+                    modifications = change_feed.modification_count(primary)
+                    modified = modifications is not None and (synced_modifications is None or synced_modifications[0] != modifications)
+                    copied = 0 if modified else self._copy(mirror, primary, high_water_id)
+                    expected_rows = primary.execute(text("SELECT COUNT(*) FROM feedback")).scalar()
+                    if modified or mirror_rows + copied != expected_rows:
+                        # Mises à jour ou suppressions : copie complète
+                        mirror.execute("DELETE FROM feedback_mirror")
+                        copied = self._copy(mirror, primary, 0)
+                        print(f"✅ Miroir local reconstruit : {copied} lignes")
+                mirror.execute("INSERT OR REPLACE INTO mirror_state (id, modifications) VALUES (1, ?)", (modifications,))
+                mirror.commit()
+            except Exception:
+                mirror.rollback()
+                raise
+            finally:
+                mirror.close()
+            if copied:
+                print(f"✅ Miroir local synchronisé : {copied} lignes en {time.perf_counter() - start:.2f}s")
+            self.version = version
+
+    def supports(self, filters):
+        return set(name for name, value in (filters or {}).items() if value) <= SUPPORTED_FILTERS
+
+    @staticmethod
+    def _where(filters, extra=None):
+        clauses, params = [], []
+        filters = filters or {}
+        if filters.get('language'):
+            clauses.append(f"language IN ({', '.join('?' * len(filters['language']))})")
+            params += list(filters['language'])
+        if filters.get('sentiment'):
+            clauses.append(f"sentiment IN ({', '.join('?' * len(filters['sentiment']))})")
+            params += list(filters['sentiment'])
+        if filters.get('rating_range'):
+            clauses.append("rating BETWEEN ? AND ?")
+            params += [float(v) for v in filters['rating_range']]
+        if filters.get('date_range'):
+            clauses.append("timestamp BETWEEN ? AND ?")
+            params += [pd.Timestamp(v).strftime(TIMESTAMP_FORMAT) for v in filters['date_range']]
+        if filters.get('unique_code'):
+            clauses.append("unique_code = ?")
+            params.append(filters['unique_code'])
+        if extra:
+            clauses.append(extra[0])
+            params += extra[1]
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _query(self, sql, params):
+        self.refresh()
+        query_start = time.perf_counter()
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        record_db(time.perf_counter() - query_start, len(rows))
+        return rows
+
+    # Cube heure × sentiment × note (même forme que aggregates.build_cube)
+    def cube(self, filters):
+        where, params = self._where(filters)
+        rows = self._query(
+            f"SELECT strftime('%Y-%m-%d %H:00:00', timestamp) AS hour, sentiment, rating, COUNT(*) AS count "
+            f"FROM feedback_mirror{where} GROUP BY 1, 2, 3", params)
+        cube = pd.DataFrame(rows, columns=['hour', 'sentiment', 'rating', 'count'])
+        cube['hour'] = pd.to_datetime(cube['hour'])
+        cube['rating'] = cube['rating'].astype('float64')
+        cube['count'] = cube['count'].astype('int64')
+        return cube
+
+    # Statistiques brutes des KPI pour une fenêtre (mêmes définitions que app.kpi_values)
+    def _period_values(self, filters, extra=None):
+        where, params = self._where(filters, extra)
+        (total, avg_rating, positive, neutral, negative, min_rating, max_rating, unique_users, emoji_count,
+         first, last) = self._query(
+            "SELECT COUNT(*), AVG(rating), SUM(sentiment = 'positive'), SUM(sentiment = 'neutral'), "
+            "SUM(sentiment = 'negative'), MIN(rating), MAX(rating), COUNT(DISTINCT unique_code), "
+            f"SUM(emojis <> ''), MIN(timestamp), MAX(timestamp) FROM feedback_mirror{where}", params)[0]
+        top_ratings = 0
+        if total:
+            top_where, top_params = self._where(filters, (f"{extra[0]} AND rating = ?" if extra else "rating = ?",
+                                                          (extra[1] if extra else []) + [max_rating]))
+            top_ratings = self._query(f"SELECT COUNT(*) FROM feedback_mirror{top_where}", top_params)[0][0]
+        # Moyenne des écarts entre commentaires consécutifs = étendue / (n - 1)
+        avg_time_between = ((pd.Timestamp(last) - pd.Timestamp(first)).total_seconds() / 3600 / (total - 1)) if total > 1 else 0
+        return {
+            'total_comments': total,
+            'avg_rating': avg_rating or 0,
+            'positive': positive or 0,
+            'neutral': neutral or 0,
+            'negative': negative or 0,
+            'top_ratings': top_ratings,
+            'min_rating': min_rating if total else 0,
+            'unique_users': unique_users,
+            'emoji_count': emoji_count or 0,
+            'avg_time_between': avg_time_between,
+            'avg_hourly_freq': total / (24 * 7 if total > 0 else 1),
+        }
+
+    def kpi_values(self, filters):
+        values = self._period_values(filters)
+        one_week_ago = (datetime.now() - timedelta(days=7)).strftime(TIMESTAMP_FORMAT)
+        values['previous'] = self._period_values(filters, ("timestamp < ?", [one_week_ago]))
+        where, params = self._where(filters)
+        peak = self._query(f"SELECT CAST(strftime('%H', timestamp) AS INTEGER), COUNT(*) FROM feedback_mirror{where} "
+                           "GROUP BY 1 ORDER BY 2 DESC LIMIT 1", params)
+        values['peak_hour'] = peak[0][0] if values['total_comments'] > 0 and peak else 'N/A'
+        languages = self._query(f"SELECT language, COUNT(*) FROM feedback_mirror{where} "
+                                "GROUP BY language HAVING language IS NOT NULL ORDER BY 2 DESC LIMIT 1", params)
+        values['dominant_lang'], values['dominant_lang_count'] = languages[0] if languages else ('N/A', 0)
+        emoji_where, emoji_params = self._where(filters, ("emojis <> ''", []))
+        emojis = ''.join(row[0] for row in self._query(f"SELECT emojis FROM feedback_mirror{emoji_where}", emoji_params))
+        values['top_emojis'] = Counter(emojis).most_common(3) if emojis else []
+        return values
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+# Miroir du processus, ou None s'il n'est pas configuré
+def get_mirror():
+    global _mirror
+    if not MIRROR_PATH:
+        return None
+    if _mirror is None:
+        with _mirror_lock:
+            if _mirror is None:
+                _mirror = LocalMirror(MIRROR_PATH)
+    return _mirror
+
+
+# Miroir utilisable pour ces filtres (sinon lecture directe de la base principale)
+def mirror_for(filters):
+    mirror = get_mirror()
+    return mirror if mirror is not None and mirror.supports(filters) else None
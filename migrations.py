@@ -0,0 +1,149 @@
+from sqlalchemy import text
+from data_utils import get_engine
+from comment_features import FEATURE_COLUMNS
+
+# Migrations idempotentes de la base feedback (Postgres en production, SQLite en local)
+# Usage : DATABASE_URL=... python migrations.py
+# Partitionnement mensuel de feedback (Postgres) : python partitioning.py migrate
+
+
+# Version globale des données (table à une ligne) incrémentée à chaque écriture sur feedback,
+# partagée par tous les processus ; sous Postgres la nouvelle version est aussi notifiée (LISTEN/NOTIFY).
+# `modifications` n'est incrémenté que par les UPDATE et DELETE : les copies incrémentales (id > dernier id
+# copié : miroir local, instantané) savent ainsi qu'une ligne déjà copiée a changé et se reconstruisent.
+# Les triggers mettent à jour une seule ligne à chaque instruction d'écriture sur feedback : les écrivains
+# concurrents sont sérialisés sur cette ligne ; installation explicite uniquement (python migrations.py).
+def install_change_notify(conn, dialect):
+    if dialect == 'postgresql':
+        conn.execute(text("CREATE TABLE IF NOT EXISTS feedback_version (id INTEGER PRIMARY KEY CHECK (id = 1), version BIGINT NOT NULL)"))
+        conn.execute(text("ALTER TABLE feedback_version ADD COLUMN IF NOT EXISTS modifications BIGINT NOT NULL DEFAULT 0"))
+        conn.execute(text("INSERT INTO feedback_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING"))
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION notify_feedback_change() RETURNS trigger AS $$
+            DECLARE
+                new_version BIGINT;
+            BEGIN
+                UPDATE feedback_version
+                SET version = version + 1,
+                    modifications = modifications + CASE WHEN TG_OP = 'INSERT' THEN 0 ELSE 1 END
+                WHERE id = 1 RETURNING version INTO new_version;
+                PERFORM pg_notify('feedback_changed', new_version::text);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """))
+        conn.execute(text("DROP TRIGGER IF EXISTS feedback_change_notify ON feedback"))
+        conn.execute(text("""
+            CREATE TRIGGER feedback_change_notify
+            AFTER INSERT OR UPDATE OR DELETE ON feedback
+            FOR EACH STATEMENT EXECUTE PROCEDURE notify_feedback_change()
+        """))
+    elif dialect == 'sqlite':
+        conn.execute(text("CREATE TABLE IF NOT EXISTS feedback_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)"))
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(feedback_version)"))}
+        if 'modifications' not in columns:
+            conn.execute(text("ALTER TABLE feedback_version ADD COLUMN modifications INTEGER NOT NULL DEFAULT 0"))
+        conn.execute(text("INSERT OR IGNORE INTO feedback_version (id, version) VALUES (1, 0)"))
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            modified = 0 if operation == 'INSERT' else 1
+            # Recréés pour mettre à jour les triggers installés avant la colonne modifications
+            conn.execute(text(f"DROP TRIGGER IF EXISTS feedback_version_{operation.lower()}"))
+            conn.execute(text(f"""
+                CREATE TRIGGER feedback_version_{operation.lower()}
+                AFTER {operation} ON feedback
+                BEGIN
+                    UPDATE feedback_version SET version = version + 1, modifications = modifications + {modified} WHERE id = 1;
+                END
+            """))
+    else:
+        print(f"ℹ️ Version globale non supportée pour {dialect}, change_feed utilisera une version dérivée des données")
+
+
+# Index plein texte des commentaires (utilisé par comment_search.py)
+def install_comment_search(conn, dialect):
+    if dialect == 'postgresql':
+        # Configuration choisie par ligne selon la langue du commentaire (français par défaut)
+        conn.execute(text("""
+            ALTER TABLE feedback ADD COLUMN IF NOT EXISTS comment_tsv tsvector
+            GENERATED ALWAYS AS (
+                to_tsvector(CASE WHEN language = 'en' THEN 'english'::regconfig ELSE 'french'::regconfig END,
+                            coalesce(comment, ''))
+            ) STORED
+        """))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS feedback_comment_tsv_idx ON feedback USING GIN (comment_tsv)"))
+    elif dialect == 'sqlite':
+        # Table FTS5 à contenu externe : seul l'index est stocké, le texte reste dans feedback
+        conn.execute(text("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts USING fts5(
+                comment, content='feedback', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            )
+        """))
+        conn.execute(text("""
+            CREATE TRIGGER IF NOT EXISTS feedback_fts_insert AFTER INSERT ON feedback BEGIN
+                INSERT INTO feedback_fts (rowid, comment) VALUES (new.id, new.comment);
+            END
+        """))
+        conn.execute(text("""
+            CREATE TRIGGER IF NOT EXISTS feedback_fts_delete AFTER DELETE ON feedback BEGIN
+                INSERT INTO feedback_fts (feedback_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+            END
+        """))
+        conn.execute(text("""
+            CREATE TRIGGER IF NOT EXISTS feedback_fts_update AFTER UPDATE OF comment ON feedback BEGIN
+                INSERT INTO feedback_fts (feedback_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+                INSERT INTO feedback_fts (rowid, comment) VALUES (new.id, new.comment);
+            END
+        """))
+        # Indexation des commentaires existants (idempotent)
+        conn.execute(text("INSERT INTO feedback_fts (feedback_fts) VALUES ('rebuild')"))
+    else:
+        print(f"ℹ️ Recherche plein texte non supportée pour {dialect}, comment_search utilisera LIKE")
+
+
+# Index pour l'historique d'un répondant (filtre unique_code, user_timeline.py) : recherche indexée
+# et lignes déjà triées par date, quel que soit le nombre de répondants
+def install_unique_code_index(conn, dialect):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS feedback_unique_code_timestamp_idx ON feedback (unique_code, timestamp)"))
+
+
+# Index des bornes de dates (filtre date_range appliqué en SQL par data_utils.build_where) ;
+# sur une table partitionnée (partitioning.py) il est créé sur chaque partition mensuelle
+def install_timestamp_index(conn, dialect):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS feedback_timestamp_idx ON feedback (timestamp)"))
+
+
+# Colonnes dérivées des commentaires (comment_features.py), remplies au scoring et par le rattrapage
+def install_comment_features(conn, dialect):
+    if dialect == 'postgresql':
+        for column, (pg_type, _) in FEATURE_COLUMNS.items():
+            conn.execute(text(f"ALTER TABLE feedback ADD COLUMN IF NOT EXISTS {column} {pg_type}"))
+    elif dialect == 'sqlite':
+        existing = {row[1] for row in conn.execute(text("PRAGMA table_info(feedback)")).fetchall()}
+        for column, (_, sqlite_type) in FEATURE_COLUMNS.items():
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE feedback ADD COLUMN {column} {sqlite_type}"))
+    else:
+        print(f"ℹ️ Colonnes dérivées non supportées pour {dialect}, calcul à la volée")
+        return
+    print("ℹ️ Lignes existantes : lancer python comment_features.py pour le rattrapage")
+
+
+MIGRATIONS = [
+    ('change_notify', install_change_notify),
+    ('comment_search', install_comment_search),
+    ('unique_code_index', install_unique_code_index),
+    ('comment_features', install_comment_features),
+    ('timestamp_index', install_timestamp_index),
+]
+
+
+def run_migrations():
+    engine = get_engine()
+    with engine.begin() as conn:
+        for name, migration in MIGRATIONS:
+            migration(conn, engine.dialect.name)
+            print(f"✅ Migration appliquée : {name}")
+
+
+if __name__ == '__main__':
+    run_migrations()
@@ -0,0 +1,250 @@
+import os
+import sys
+import time
+import argparse
+import pandas as pd
+from sqlalchemy import text
+from data_utils import get_engine
+import migrations
+
+# Partitionnement mensuel de la table feedback par plage sur timestamp (Postgres) et archivage des mois froids.
+# Les requêtes bornées en date (data_utils.build_where) ne lisent que les partitions concernées : la fenêtre
+# récente reste rapide quelle que soit la profondeur de l'historique conservé.
+# Usage : DATABASE_URL=... python partitioning.py <commande>
+#   migrate                     convertit feedback en table partitionnée (une seule fois, sauvegarde conseillée)
+#   maintain                    crée les partitions des mois à venir (à planifier, ex. cron quotidien)
+#   archive --older-than 24     exporte les mois plus anciens en CSV gzip puis supprime leurs partitions
+#   restore FICHIER             réimporte un mois archivé
+#   status                      liste les partitions (lignes, taille)
+
+PARTITION_PREFIX = 'feedback_p'
+DEFAULT_PARTITION = 'feedback_pdefault'  # Lignes hors des mois créés (rattrapées par maintain)
+MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+ARCHIVE_DIR = os.getenv("FEEDBACK_ARCHIVE_DIR", "archives")
+ARCHIVE_CHUNK_SIZE = 50000
+
+
+def _require_postgres(engine):
+    if engine.dialect.name != 'postgresql':
+        print(f"ℹ️ Partitionnement non supporté pour {engine.dialect.name} (index feedback_timestamp_idx uniquement)")
+        sys.exit(1)
+
+
+def is_partitioned(conn):
+    return conn.execute(text("""
+        SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = 'feedback'
+    """)).first() is not None
+
+
+def partition_name(month):
+    return f"{PARTITION_PREFIX}{month:%Y_%m}"
+
+
+def _month_start(value):
+    return pd.Timestamp(value).to_period('M').to_timestamp()
+
+
+# Colonnes insérables (hors colonnes générées comme comment_tsv)
+def _columns(conn, table):
+    rows = conn.execute(text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = :table AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """), {'table': table}).fetchall()
+    return [row[0] for row in rows]
+
+
+def list_partitions(conn):
+    rows = conn.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), pg_total_relation_size(c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'feedback'
+        ORDER BY c.relname
+    """)).fetchall()
+    return [{'name': name, 'bound': bound, 'size': size} for name, bound, size in rows]
+
+
+# Partition d'un mois ; les lignes de ce mois déjà tombées dans la partition par défaut y sont déplacées
+def create_partition(conn, month):
+    name = partition_name(month)
+    start, end = month, month + pd.DateOffset(months=1)
+    if conn.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is not None:
+        return False
+    bounds = {'start': start.to_pydatetime(), 'end': end.to_pydatetime()}
+    has_default = conn.execute(text("SELECT to_regclass(:name)"), {'name': DEFAULT_PARTITION}).scalar() is not None
+    misplaced = has_default and conn.execute(text(
+        f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end LIMIT 1"), bounds).first()
+    if misplaced:
+        conn.execute(text(f"ALTER TABLE feedback DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF feedback FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"))
+    if misplaced:
+        columns = ', '.join(_columns(conn, 'feedback'))
+        conn.execute(text(f"INSERT INTO feedback ({columns}) SELECT {columns} FROM {DEFAULT_PARTITION} "
+                          "WHERE timestamp >= :start AND timestamp < :end"), bounds)
+        conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end"), bounds)
+        conn.execute(text(f"ALTER TABLE feedback ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    print(f"✅ Partition créée : {name}")
+    return True
+
+
+# Partitions du mois le plus ancien (ou courant) jusqu'à MONTHS_AHEAD mois dans le futur
+def ensure_partitions(conn, first_month=None):
+    first_month = first_month or _month_start(pd.Timestamp.now())
+    last_month = _month_start(pd.Timestamp.now()) + pd.DateOffset(months=MONTHS_AHEAD)
+    created = 0
+    for month in pd.date_range(first_month, last_month, freq='MS'):
+        created += create_partition(conn, month)
+    return created
+
+
+# Les suppressions de partitions ne déclenchent pas les triggers de feedback : version (et compteur de
+# modifications, les lignes archivées disparaissent des copies locales) incrémentés à la main
+def _bump_version(conn):
+    if conn.execute(text("SELECT to_regclass('feedback_version')")).scalar() is None:
+        return
+    version = conn.execute(text("UPDATE feedback_version SET version = version + 1, modifications = modifications + 1 "
+                                "WHERE id = 1 RETURNING version")).scalar()
+    conn.execute(text("SELECT pg_notify('feedback_changed', :version)"), {'version': str(version)})
+
+
+# Conversion de feedback en table partitionnée : copie dans une nouvelle table puis échange, en une transaction
+def migrate():
+    engine = get_engine()
+    _require_postgres(engine)
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            print("ℹ️ feedback est déjà partitionnée")
+            return
+        if conn.execute(text("SELECT 1 FROM feedback WHERE timestamp IS NULL LIMIT 1")).first():
+            raise ValueError("Des lignes de feedback n'ont pas de timestamp : clé de partitionnement obligatoire")
+        columns = ', '.join(_columns(conn, 'feedback'))
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence('feedback', 'id')")).scalar()
+        conn.execute(text("ALTER TABLE feedback RENAME TO feedback_unpartitioned"))
+        # La clé primaire d'une table partitionnée doit contenir la clé de partitionnement
+        conn.execute(text("""
+            CREATE TABLE feedback (
+                LIKE feedback_unpartitioned INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS,
+                PRIMARY KEY (id, timestamp)
+            ) PARTITION BY RANGE (timestamp)
+        """))
+        if sequence:
+            # La séquence de id (serial) doit survivre à la suppression de l'ancienne table
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY feedback.id"))
+        conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF feedback DEFAULT"))
+        first = conn.execute(text("SELECT MIN(timestamp) FROM feedback_unpartitioned")).scalar()
+        ensure_partitions(conn, _month_start(first) if first is not None else None)
+        conn.execute(text(f"INSERT INTO feedback ({columns}) SELECT {columns} FROM feedback_unpartitioned"))
+        copied = conn.execute(text("SELECT COUNT(*) FROM feedback")).scalar()
+        expected = conn.execute(text("SELECT COUNT(*) FROM feedback_unpartitioned")).scalar()
+        if copied != expected:
+            raise RuntimeError(f"Copie incomplète ({copied}/{expected} lignes), migration annulée")
+        conn.execute(text("DROP TABLE feedback_unpartitioned"))
+        # Index (créés sur chaque partition) et trigger de version, sur la nouvelle table
+        for name, migration in migrations.MIGRATIONS:
+            migration(conn, 'postgresql')
+    print(f"✅ feedback partitionnée par mois : {copied} lignes en {time.perf_counter() - start:.1f}s")
+
+
+def maintain():
+    engine = get_engine()
+    _require_postgres(engine)
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            print("ℹ️ feedback n'est pas partitionnée (python partitioning.py migrate)")
+            return
+        created = ensure_partitions(conn)
+        # Lignes de la partition par défaut (dates anciennes ou très futures) : mois créés à la demande
+        months = conn.execute(text(
+            f"SELECT DISTINCT date_trunc('month', timestamp) FROM {DEFAULT_PARTITION}")).fetchall()
+        for (month,) in months:
+            created += create_partition(conn, _month_start(month))
+    print(f"✅ Maintenance terminée : {created} partitions créées")
+
+
+# Export d'une partition en CSV gzip (colonnes insérables), par lots pour borner la mémoire
+def _export(conn, name, path):
+    exported = 0
+    columns = ', '.join(_columns(conn, name))
+    for chunk in pd.read_sql_query(text(f"SELECT {columns} FROM {name} ORDER BY id"), conn, chunksize=ARCHIVE_CHUNK_SIZE):
+        chunk.to_csv(path, mode='a' if exported else 'w', header=not exported, index=False, compression='gzip')
+        exported += len(chunk)
+    return exported
+
+
+def archive(older_than_months, directory=ARCHIVE_DIR):
+    engine = get_engine()
+    _require_postgres(engine)
+    os.makedirs(directory, exist_ok=True)
+    cutoff = _month_start(pd.Timestamp.now()) - pd.DateOffset(months=older_than_months)
+    with engine.connect() as conn:
+        partitions = [p['name'] for p in list_partitions(conn)
+                      if p['name'] != DEFAULT_PARTITION and pd.Timestamp(p['name'][len(PARTITION_PREFIX):].replace('_', '-')) < cutoff]
+    archived = 0
+    for name in partitions:
+        path = os.path.join(directory, f"{name}.csv.gz")
+        with engine.begin() as conn:
+            expected = conn.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar()
+            exported = _export(conn, name, path)
+            if exported != expected:
+                raise RuntimeError(f"Export incomplet de {name} ({exported}/{expected} lignes)")
+            conn.execute(text(f"ALTER TABLE feedback DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            _bump_version(conn)
+        archived += exported
+        print(f"✅ {name} archivée : {exported} lignes -> {path} ({os.path.getsize(path) / 1024:.0f} Ko)")
+    print(f"✅ Archivage terminé : {len(partitions)} partitions, {archived} lignes")
+
+
+def restore(path):
+    engine = get_engine()
+    _require_postgres(engine)
+    restored = 0
+    with engine.begin() as conn:
+        for chunk in pd.read_csv(path, compression='gzip', chunksize=ARCHIVE_CHUNK_SIZE, parse_dates=['timestamp']):
+            for month in chunk['timestamp'].dt.to_period('M').unique():
+                create_partition(conn, month.to_timestamp())
+            chunk.to_sql('feedback', conn, if_exists='append', index=False, method='multi')
+            restored += len(chunk)
+    print(f"✅ {path} restauré : {restored} lignes")
+
+
+def status():
+    engine = get_engine()
+    _require_postgres(engine)
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            print("ℹ️ feedback n'est pas partitionnée")
+            return
+        for partition in list_partitions(conn):
+            rows = conn.execute(text(f"SELECT COUNT(*) FROM {partition['name']}")).scalar()
+            print(f"{partition['name']:<22} {rows:>10} lignes {partition['size'] / 1024 / 1024:>8.1f} Mo  {partition['bound']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Partitionnement mensuel et archivage de la table feedback")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('migrate')
+    commands.add_parser('maintain')
+    archive_parser = commands.add_parser('archive')
+    archive_parser.add_argument('--older-than', type=int, required=True, help="Âge minimal en mois")
+    archive_parser.add_argument('--dir', default=ARCHIVE_DIR)
+    restore_parser = commands.add_parser('restore')
+    restore_parser.add_argument('path')
+    commands.add_parser('status')
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        migrate()
+    elif args.command == 'maintain':
+        maintain()
+    elif args.command == 'archive':
+        archive(args.older_than, args.dir)
+    elif args.command == 'restore':
+        restore(args.path)
+    else:
+        status()
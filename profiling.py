@@ -0,0 +1,120 @@
+import os
+import time
+import cProfile
+import threading
+from collections import defaultdict, deque
+from flask import request, g, jsonify
+
+# Profilage des callbacks Dash : temps total, temps base de données, lignes chargées et taille de la réponse
+# Activer le dump cProfile pour toutes les requêtes avec DASH_PROFILE=1,
+# ou pour une seule requête avec l'en-tête "X-Profile: 1"
+PROFILE_ALL = os.getenv("DASH_PROFILE", "0") == "1"
+PROFILE_DIR = os.getenv("DASH_PROFILE_DIR", "profiles")
+MAX_SAMPLES = int(os.getenv("DASH_METRICS_SAMPLES", "500"))
+
+_DASH_UPDATE_PATH = "_dash-update-component"
+
+_samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+_lock = threading.Lock()
+_local = threading.local()
+
+
+# Appelé par data_utils pour chaque requête SQL exécutée pendant un callback
+def record_db(seconds, rows):
+    stats = getattr(_local, 'stats', None)
+    if stats is None:
+        return
+    stats['db_time'] += seconds
+    stats['db_queries'] += 1
+    stats['rows'] += rows
+
+
+def _callback_name(app, output):
+    cb = app.callback_map.get(output) if output else None
+    func = cb.get('callback') if cb else None
+    return getattr(func, '__name__', None) or output or 'unknown'
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def get_metrics():
+    with _lock:
+        snapshot = {name: list(samples) for name, samples in _samples.items()}
+    metrics = {}
+    for name, samples in snapshot.items():
+        wall = [s['wall_time'] for s in samples]
+        db = [s['db_time'] for s in samples]
+        metrics[name] = {
+            'calls': len(samples),
+            'wall_ms_mean': round(sum(wall) / len(wall) * 1000, 2),
+            'wall_ms_p95': round(_percentile(wall, 95) * 1000, 2),
+            'wall_ms_max': round(max(wall) * 1000, 2),
+            'db_ms_mean': round(sum(db) / len(db) * 1000, 2),
+            'compute_ms_mean': round((sum(wall) - sum(db)) / len(wall) * 1000, 2),
+            'db_queries_mean': round(sum(s['db_queries'] for s in samples) / len(samples), 2),
+            'rows_mean': round(sum(s['rows'] for s in samples) / len(samples), 1),
+            'payload_kb_mean': round(sum(s['payload_bytes'] for s in samples) / len(samples) / 1024, 2),
+            'payload_kb_max': round(max(s['payload_bytes'] for s in samples) / 1024, 2),
+        }
+    return metrics
+
+
+def reset_metrics():
+    with _lock:
+        _samples.clear()
+
+
+def init_app(app):
+    server = app.server
+
+    @server.before_request
+    def _start_callback_timer():
+        if not request.path.endswith(_DASH_UPDATE_PATH):
+            return
+        _local.stats = {'db_time': 0.0, 'db_queries': 0, 'rows': 0}
+        g.profiling_start = time.perf_counter()
+        g.profiler = None
+        if PROFILE_ALL or request.headers.get('X-Profile') == '1':
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @server.after_request
+    def _record_callback_timing(response):
+        start = g.pop('profiling_start', None)
+        if start is None:
+            return response
+        wall_time = time.perf_counter() - start
+        stats = getattr(_local, 'stats', None) or {'db_time': 0.0, 'db_queries': 0, 'rows': 0}
+        _local.stats = None
+
+        body = request.get_json(silent=True) or {}
+        name = _callback_name(app, body.get('output'))
+        sample = dict(stats, wall_time=wall_time, payload_bytes=response.calculate_content_length() or 0)
+        with _lock:
+            _samples[name].append(sample)
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{name}-{int(time.time() * 1000)}.prof")
+            profiler.dump_stats(path)
+            response.headers['X-Profile-Dump'] = path
+        response.headers['X-Callback-Time-Ms'] = f"{wall_time * 1000:.1f}"
+        return response
+
+    # Endpoint /metrics : agrégats par callback (JSON), ?reset=1 pour vider les échantillons
+    @server.route('/metrics', methods=['GET'])
+    def metrics():
+        data = get_metrics()
+        if request.args.get('reset') == '1':
+            reset_metrics()
+        return jsonify(data)
+
+    return app
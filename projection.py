@@ -0,0 +1,108 @@
+import time
+import threading
+import pandas as pd
+from sklearn.decomposition import IncrementalPCA
+from sqlalchemy import text
+from data_utils import get_engine
+from profiling import record_db
+import change_feed
+import comment_features
+
+# Projection ACP [note, longueur du commentaire] maintenue de façon incrémentale :
+# IncrementalPCA.partial_fit uniquement sur les nouvelles lignes (id > dernier id projeté),
+# coordonnées conservées par id et recalculées par un simple produit matriciel après chaque ajustement.
+# Aucun réajustement tant que la version des données ne change pas ; reconstruction si des lignes
+# ont été modifiées ou supprimées (compteur des UPDATE/DELETE de feedback_version, change_feed.modification_count,
+# ou nombre de lignes notées différent) ; sans table feedback_version seules les suppressions sont détectées.
+
+
+class CommentProjection:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pca = IncrementalPCA(n_components=2)
+        self.features = pd.DataFrame(columns=['rating', 'length'], dtype='float64')
+        self.coordinates = pd.DataFrame(columns=['PC1', 'PC2'], dtype='float64')
+        self.pending = None  # Lignes en attente (partial_fit exige au moins 2 lignes)
+        self.fitted = False
+        self.high_water_id = 0
+        self.modifications = None  # change_feed.modification_count() lors de la dernière lecture
+        self.version = None
+
+    def _fetch(self, conn, after_id):
+        if comment_features.columns_available(conn):
+            # Longueur précalculée ; texte lu uniquement pour les lignes pas encore rattrapées
+            columns = "id, rating, char_length, CASE WHEN char_length IS NULL THEN comment END AS comment"
+        else:
+            columns = "id, rating, comment"
+        query = f"SELECT {columns} FROM feedback WHERE id > :after_id ORDER BY id"
+        query_start = time.perf_counter()
+        df = pd.read_sql_query(text(query), conn, params={'after_id': after_id})
+        record_db(time.perf_counter() - query_start, len(df))
+        return comment_features.fill_missing(df, columns=['char_length'])
+
+    @staticmethod
+    def _build_features(df):
+        # Longueur (colonne char_length) prise sur la même ligne que la note
+        features = pd.DataFrame({
+            'rating': pd.to_numeric(df['rating'], errors='coerce').astype('float64').values,
+            'length': df['char_length'].astype('float64').values,
+        }, index=pd.Index(df['id'].astype('int64').values, name='id'))
+        return features.dropna(subset=['rating'])
+
+    def _add_rows(self, df):
+        if df.empty:
+            return
+        self.high_water_id = max(self.high_water_id, int(df['id'].max()))
+        new_features = self._build_features(df)
+        if self.pending is not None:
+            new_features = pd.concat([self.pending, new_features])
+            self.pending = None
+        if len(new_features) >= 2:
+            self.pca.partial_fit(new_features.values)
+            self.fitted = True
+        elif not self.fitted:
+            self.pending = new_features
+            return
+        # Une seule nouvelle ligne avec un modèle déjà ajusté : projetée sans réajustement
+        self.features = pd.concat([self.features, new_features]) if not self.features.empty else new_features
+        self.coordinates = pd.DataFrame(self.pca.transform(self.features.values), index=self.features.index,
+                                        columns=['PC1', 'PC2'])
+
+    def refresh(self):
+        version = change_feed.current_version()
+        if self.version == version:
+            return
+        with self._lock:
+            if self.version == version:
+                return
+            with get_engine().connect() as conn:
+                # Lu avant les lignes : une modification pendant la lecture déclenchera la reconstruction suivante
+                modifications = change_feed.modification_count(conn)
+                delta = self._fetch(conn, self.high_water_id)
+                expected_rows = conn.execute(text("SELECT COUNT(*) FROM feedback WHERE rating IS NOT NULL")).scalar()
+            pending_rows = len(self.pending) if self.pending is not None else 0
+            modified = modifications is not None and self.modifications is not None and modifications != self.modifications
+            if not modified and len(self.features) + pending_rows + len(self._build_features(delta)) == expected_rows:
+                self._add_rows(delta)
+            else:
+                self._reset()
+                with get_engine().connect() as conn:
+                    modifications = change_feed.modification_count(conn)
+                    self._add_rows(self._fetch(conn, 0))
+                print(f"✅ Projection ACP reconstruite : {len(self.features)} commentaires")
+            self.modifications = modifications
+            self.version = version
+
+    # Coordonnées des ids demandés (alignées sur `ids`) et variance expliquée
+    def project(self, ids):
+        self.refresh()
+        with self._lock:
+            coordinates = self.coordinates.reindex(pd.Index(ids).astype('int64'))
+            explained = float(self.pca.explained_variance_ratio_.sum()) if self.fitted else 0.0
+        return coordinates, explained
+
+
+comment_projection = CommentProjection()
@@ -1,31 +1,45 @@
 import dash
 from dash import html, dcc, callback, Output, Input, State, dash_table
 import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
 import pandas as pd
 from data_utils import get_feedback_data
+from user_timeline import get_user_timeline
 import io
 import base64
 
+# Colonnes du tableau et de l'export CSV (mêmes colonnes que la requête d'origine)
+TABLE_COLUMNS = ['rating', 'sentiment', 'timestamp', 'language', 'unique_code', 'comment']
+
 # Dictionnaire de traductions
 translations = {
     'fr': {
         'regroupement_title': 'Regroupement et Table',
         'table_title': 'Tableau des Commentaires',
         'download_button': [html.I(className="fas fa-download", style={'margin-right': '5px'}), 'Télécharger'],
-        'no_data': 'Aucune donnée disponible'
+        'no_data': 'Aucune donnée disponible',
+        'user_title': 'Historique du répondant',
+        'user_hint': 'Cliquez sur un commentaire ou filtrez par code unique pour afficher l\'historique du répondant',
+        'user_summary': '{count} commentaire(s), note moyenne {mean}',
+        'user_rating': 'Note',
+        'user_trend': 'Tendance du sentiment'
     },
     'en': {
         'regroupement_title': 'Grouping and Table',
         'table_title': 'Comments Table',
         'download_button': [html.I(className="fas fa-download", style={'margin-right': '5px'}), 'Download'],
-        'no_data': 'No data available'
+        'no_data': 'No data available',
+        'user_title': 'Respondent History',
+        'user_hint': 'Click a comment or filter by unique code to show the respondent history',
+        'user_summary': '{count} comment(s), average rating {mean}',
+        'user_rating': 'Rating',
+        'user_trend': 'Sentiment trend'
     }
 }
 
 def layout():
     return html.Div([
         html.H2(id='regroupement-title', className="text-center mb-4", style={"color": "#2c3e50", "font-family": "Roboto, sans-serif", "font-weight": "bold"}),
-        dcc.Store(id='regroupement-data-store'),
         html.H3(id='table-title', className="text-center mb-3", style={"color": "#34495e"}),
         dash_table.DataTable(
             id='comments-table',
@@ -55,17 +69,19 @@ def layout():
                 className="mt-3"
             ),
             dcc.Download(id='download-data')
-        ])
+        ]),
+        # Détail d'un répondant (code unique du commentaire cliqué ou du filtre)
+        dcc.Store(id='user-drilldown-code'),
+        html.Div(id='user-drilldown', className="mt-4")
     ], className="p-4")
 
 @callback(
     [Output('regroupement-title', 'children'),
      Output('table-title', 'children'),
-     Output('comments-table', 'data'),
-     Output('regroupement-data-store', 'data')],
+     Output('comments-table', 'data')],
     [Input('filters-store', 'data'),
      Input('regroupement-title-store', 'data'),
-     Input('interval-component', 'n_intervals')]  # Store temporaire pour la langue
+     Input('data-version', 'data')]  # Déclenché uniquement si les données changent
 )
 def update_regroupement_table(filters, title_from_store, real_time_update):
     language = 'fr' if not title_from_store else ('en' if title_from_store in translations['en'].values() else 'fr')
@@ -73,23 +89,24 @@ def update_regroupement_table(filters, title_from_store, real_time_update):
 
     df = get_feedback_data(filters)
     if df.empty:
-        return [t['regroupement_title'], t['no_data'], [], {}]
+        return [t['regroupement_title'], t['no_data'], []]
 
-    # Utiliser les données brutes de la base sans modification
-    data = df.to_dict('records')
+    # Colonnes affichées et exportées uniquement (get_feedback_data renvoie aussi id et les colonnes dérivées) ;
+    # envoyées une seule fois au navigateur : l'export CSV relit les données du tableau
+    data = df[TABLE_COLUMNS].to_dict('records')
 
-    return [t['regroupement_title'], t['table_title'], data, df.to_dict('records')]
+    return [t['regroupement_title'], t['table_title'], data]
 
 @callback(
     Output('download-data', 'data'),
     Input('download-button', 'n_clicks'),
     State('comments-table', 'selected_rows'),
-    State('regroupement-data-store', 'data'),
+    State('comments-table', 'data'),
     prevent_initial_call=True
 )
-def download_data(n_clicks, selected_rows, stored_data):
-    if n_clicks and stored_data:
-        df = pd.DataFrame(stored_data)
+def download_data(n_clicks, selected_rows, table_data):
+    if n_clicks and table_data:
+        df = pd.DataFrame(table_data).reindex(columns=TABLE_COLUMNS)
         if selected_rows and len(selected_rows) > 0:
             df_selected = df.iloc[selected_rows]
         else:
@@ -97,4 +114,73 @@ def download_data(n_clicks, selected_rows, stored_data):
         csv_string = df_selected.to_csv(index=False, encoding='utf-8')
         csv_string_io = io.StringIO(csv_string)
         return dcc.send_string(csv_string_io.getvalue(), filename='feedback_data.csv')
-    return None
\ No newline at end of file
+    return None
+
+# Panneau de détail : historique et tendance du sentiment d'un répondant
+def build_user_panel(unique_code, timeline, t):
+    sentiment_colors = {'positive': '#27AE60', 'neutral': '#F39C12', 'negative': '#E74C3C'}
+    mean_rating = f"{timeline['rating'].mean():.2f}" if timeline['rating'].notna().any() else 'N/A'
+    fig = go.Figure([
+        go.Scatter(
+            x=timeline['timestamp'], y=timeline['rating'], mode='lines+markers', name=t['user_rating'],
+            marker=dict(size=10, color=[sentiment_colors.get(s, '#3498DB') for s in timeline['sentiment']]),
+            line=dict(color='#BDC3C7'), text=timeline['comment'], hovertemplate='%{y} : %{text}<extra></extra>'
+        ),
+        go.Scatter(
+            x=timeline['timestamp'], y=timeline['sentiment_trend'], mode='lines', name=t['user_trend'],
+            line=dict(color='#2c3e50', dash='dash'), yaxis='y2'
+        )
+    ])
+    fig.update_layout(
+        template='plotly_white', height=300,
+        yaxis=dict(title=t['user_rating'], range=[-0.2, 5.2]),
+        yaxis2=dict(title=t['user_trend'], range=[-1.1, 1.1], overlaying='y', side='right'),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    history = timeline.sort_values('timestamp', ascending=False)[['timestamp', 'rating', 'sentiment', 'language', 'comment']]
+    history = history.assign(timestamp=history['timestamp'].dt.strftime('%Y-%m-%d %H:%M'))
+    return dbc.Card([
+        dbc.CardHeader(html.H5([html.I(className="fas fa-user"), f" {t['user_title']} : {unique_code}"], className="mb-0")),
+        dbc.CardBody([
+            html.P(t['user_summary'].format(count=len(timeline), mean=mean_rating)),
+            dcc.Graph(figure=fig),
+            dash_table.DataTable(
+                data=history.to_dict('records'),
+                columns=[{'name': c, 'id': c} for c in history.columns],
+                style_table={'overflowX': 'auto'},
+                style_cell={'textAlign': 'left', 'padding': '5px'},
+                style_header={'backgroundColor': '#f8f9fa', 'fontWeight': 'bold'},
+                page_size=5
+            )
+        ])
+    ])
+
+@callback(
+    [Output('user-drilldown', 'children'),
+     Output('user-drilldown-code', 'data')],
+    [Input('filters-store', 'data'),
+     Input('comments-table', 'active_cell'),
+     Input('regroupement-title-store', 'data'),
+     Input('data-version', 'data')],
+    [State('comments-table', 'derived_viewport_data'),
+     State('user-drilldown-code', 'data')]
+)
+def update_user_drilldown(filters, active_cell, title_from_store, real_time_update, viewport_data, current_code):
+    language = 'fr' if not title_from_store else ('en' if title_from_store in translations['en'].values() else 'fr')
+    t = translations[language]
+
+    # Code du commentaire cliqué, sinon celui du filtre ; conservé lors d'un changement de langue ou de données
+    triggered_id = dash.callback_context.triggered[0]['prop_id'].split('.')[0] if dash.callback_context.triggered else None
+    if triggered_id == 'comments-table' and active_cell and viewport_data and active_cell['row'] < len(viewport_data):
+        unique_code = viewport_data[active_cell['row']].get('unique_code')
+    elif triggered_id == 'filters-store' or not current_code:
+        unique_code = (filters or {}).get('unique_code')
+    else:
+        unique_code = current_code
+    if not unique_code:
+        return html.P(t['user_hint'], className="text-muted text-center"), None
+
+    timeline = get_user_timeline(unique_code)
+    if timeline.empty:
+        return html.P(t['no_data'], className="text-muted text-center"), unique_code
+    return build_user_panel(unique_code, timeline, t), unique_code
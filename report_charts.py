@@ -0,0 +1,99 @@
+import io
+import matplotlib
+matplotlib.use('Agg')  # Rendu hors écran, sans navigateur ni accès réseau
+import matplotlib.pyplot as plt
+import numpy as np
+
+# Rendu des graphiques du rapport PDF en images PNG avec matplotlib.
+# Module volontairement léger (ni dash ni base de données) : il est importé par les processus du pool de rendu,
+# qui ne reçoivent que des spécifications simples (listes, dictionnaires) construites à partir des agrégats.
+
+SENTIMENT_COLORS = {'positive': '#27AE60', 'neutral': '#F39C12', 'negative': '#E74C3C'}
+RATING_COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEEAD']
+FIGURE_SIZE = (7, 3.2)
+DPI = 110
+
+
+def _bar(ax, spec):
+    ax.bar([str(x) for x in spec['x']], spec['y'], color=RATING_COLORS[:len(spec['x'])] or None)
+    for position, value in enumerate(spec['y']):
+        ax.annotate(str(value), (position, value), ha='center', va='bottom', fontsize=8)
+
+
+def _pie(ax, spec):
+    ax.pie(spec['values'], labels=spec['labels'], autopct='%1.0f%%',
+           colors=[SENTIMENT_COLORS.get(label, '#3498DB') for label in spec['labels']],
+           wedgeprops=dict(width=0.7))
+    ax.axis('equal')
+
+
+def _stacked(ax, spec):
+    bottom = np.zeros(len(spec['x']))
+    for name, values in spec['series'].items():
+        ax.bar([str(x) for x in spec['x']], values, bottom=bottom, label=spec['labels'].get(name, name),
+               color=SENTIMENT_COLORS.get(name, '#3498DB'))
+        bottom += np.asarray(values, dtype=float)
+    ax.legend(fontsize=8)
+
+
+def _line(ax, spec):
+    x = np.array(spec['x'], dtype='datetime64[s]')
+    ax.plot(x, spec['y'], color='#3498DB', label=spec.get('label'))
+    if spec.get('trend') is not None:
+        ax.plot(x, spec['trend'], color='#E74C3C', linestyle='--', label='Tendance')
+        ax.legend(fontsize=8)
+    ax.figure.autofmt_xdate()
+
+
+def _area(ax, spec):
+    x = np.array(spec['x'], dtype='datetime64[s]')
+    ax.fill_between(x, spec['y'], color=(96 / 255, 125 / 255, 139 / 255, 0.5))
+    ax.figure.autofmt_xdate()
+
+
+def _barh(ax, spec):
+    ax.barh(spec['x'][::-1], spec['y'][::-1], color='#1ABC9C')
+
+
+def _heatmap(ax, spec):
+    image = ax.imshow(np.asarray(spec['z'], dtype=float), cmap='viridis', aspect='auto')
+    ax.set_xticks(range(len(spec['x'])), [str(x) for x in spec['x']])
+    ax.set_yticks(range(len(spec['y'])), spec['y'])
+    ax.figure.colorbar(image, ax=ax)
+
+
+# Boîtes à moustaches à partir de statistiques précalculées (pas de données brutes à transférer)
+def _box(ax, spec):
+    boxes = ax.bxp(spec['stats'], showmeans=True, patch_artist=True)
+    for patch, stats in zip(boxes['boxes'], spec['stats']):
+        patch.set_facecolor(SENTIMENT_COLORS.get(stats['label'], '#3498DB'))
+
+
+RENDERERS = {
+    'bar': _bar,
+    'pie': _pie,
+    'stacked': _stacked,
+    'line': _line,
+    'area': _area,
+    'barh': _barh,
+    'heatmap': _heatmap,
+    'box': _box,
+}
+
+
+# Point d'entrée du pool de processus : spécification -> octets PNG
+def render(spec):
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE, dpi=DPI)
+    try:
+        RENDERERS[spec['kind']](ax, spec)
+        ax.set_title(spec['title'], fontsize=11)
+        if spec.get('xlabel'):
+            ax.set_xlabel(spec['xlabel'])
+        if spec.get('ylabel'):
+            ax.set_ylabel(spec['ylabel'])
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png')
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
@@ -0,0 +1,243 @@
+import os
+import uuid
+import time
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+import figure_cache
+import aggregates
+import report_charts
+from word_index import word_index
+from sentiments import translations as sentiment_translations
+from frequences import translations as frequence_translations
+from distributions import translations as distribution_translations
+
+# File de génération des rapports PDF en arrière-plan.
+# - Pool de threads borné (REPORT_WORKERS) : une rafale de clics ne bloque pas les callbacks du tableau de bord
+# - Au plus REPORT_MAX_PENDING rapports en attente ; au-delà la demande est refusée (statut 'busy')
+# - Un même rapport (filtres, langue, version des données) n'est généré qu'une fois : les demandes identiques
+#   rejoignent le job en cours et les rapports terminés sont servis depuis figure_cache
+# - Statut des jobs publié dans le cache partagé (figure_cache.put_shared) : le polling peut arriver sur un
+#   autre worker gunicorn que celui qui génère le rapport
+MAX_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+MAX_PENDING = int(os.getenv("REPORT_MAX_PENDING", "8"))
+MAX_JOBS = 64  # Historique des jobs conservé pour le polling
+POLL_TIMEOUT = int(os.getenv("REPORT_POLL_TIMEOUT", "300"))  # Secondes d'attente d'un job au statut inconnu
+# Graphiques du rapport rendus en parallèle dans un pool de processus (matplotlib n'est pas thread-safe)
+CHART_PROCESSES = int(os.getenv("REPORT_CHART_PROCESSES", str(min(4, os.cpu_count() or 1))))
+CHART_ASPECT = report_charts.FIGURE_SIZE[1] / report_charts.FIGURE_SIZE[0]  # Hauteur / largeur des images
+REPORT_CHARTS = ['ratings', 'sentiments', 'sentiment_by_rating', 'timeline', 'cumulative', 'top_words', 'heatmap', 'distribution']
+
+_jobs = OrderedDict()
+_jobs_by_key = {}
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_chart_pool = None
+_chart_pool_pid = None
+
+
+# Pool créé à la première utilisation dans chaque processus (compatible preload_app de gunicorn)
+def _get_pool():
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='report')
+        _pool_pid = os.getpid()
+    return _pool
+
+
+# Pool de processus des graphiques, à démarrer tant que le processus n'a qu'un thread (post_fork de gunicorn,
+# lancement du serveur de développement) : les processus sont alors forkés sans hériter d'un verrou tenu par
+# un autre thread. Créé plus tard (threads des requêtes, du flux de changements, du rendu déjà actifs), il
+# passe par 'forkserver' : processus issus d'un serveur vierge qui n'a importé que report_charts.
+# Les processus n'exécutent que report_charts.render et n'utilisent pas la base.
+def start_chart_pool():
+    global _chart_pool, _chart_pool_pid
+    if _chart_pool is not None and _chart_pool_pid == os.getpid():
+        return _chart_pool
+    if threading.active_count() == 1:
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['report_charts'])
+    _chart_pool = ProcessPoolExecutor(max_workers=CHART_PROCESSES, mp_context=context)
+    _chart_pool_pid = os.getpid()
+    if context.get_start_method() == 'fork':
+        _chart_pool.submit(int).result()  # Tous les processus sont forkés ici, avant le démarrage d'autres threads
+    return _chart_pool
+
+
+def _get_chart_pool():
+    return start_chart_pool()
+
+
+def _remember(job):
+    _jobs[job['id']] = job
+    while len(_jobs) > MAX_JOBS:
+        _, old = _jobs.popitem(last=False)
+        if _jobs_by_key.get(old['key']) == old['id']:
+            del _jobs_by_key[old['key']]
+
+
+def _status_key(job_id):
+    return f"report-job|{job_id}"
+
+
+def _publish(job):
+    figure_cache.put_shared(_status_key(job['id']), {'status': job['status'], 'error': job['error']})
+
+
+def _run(job, build):
+    job['status'] = 'running'
+    _publish(job)
+    start = time.perf_counter()
+    try:
+        pdf = build()
+        figure_cache.put(job['key'], pdf)
+        job['status'] = 'done'
+        _publish(job)
+        print(f"✅ Rapport PDF généré en {time.perf_counter() - start:.2f}s ({len(pdf)} octets)")
+    except Exception as e:
+        job['status'] = 'error'
+        job['error'] = str(e)
+        _publish(job)
+        print(f"❌ Erreur lors de la génération du rapport PDF : {e}")
+    finally:
+        with _lock:
+            if _jobs_by_key.get(job['key']) == job['id']:
+                del _jobs_by_key[job['key']]
+
+
+# Demande un rapport ; `build` est appelé dans le pool et doit retourner les octets du PDF.
+# Retourne {'id', 'key', 'submitted'} (job déjà 'done' si le rapport est en cache) ou None si la file est pleine.
+def submit(filters, language, build):
+    key = figure_cache.make_key('report', filters, language)
+    submitted = time.time()
+    with _lock:
+        if key in _jobs_by_key:
+            return {'id': _jobs_by_key[key], 'key': key, 'submitted': submitted}
+        job = {'id': uuid.uuid4().hex, 'key': key, 'status': 'pending', 'error': None}
+        if figure_cache.get(key) is not figure_cache.MISSING:
+            job['status'] = 'done'
+            _remember(job)
+            return {'id': job['id'], 'key': key, 'submitted': submitted}
+        active = sum(1 for j in _jobs.values() if j['status'] in ('pending', 'running'))
+        if active >= MAX_PENDING:
+            print(f"ℹ️ File des rapports pleine ({active} en cours), demande refusée")
+            return None
+        _remember(job)
+        _jobs_by_key[key] = job['id']
+    _publish(job)
+    _get_pool().submit(_run, job, build)
+    return {'id': job['id'], 'key': key, 'submitted': submitted}
+
+
+# 'pending', 'running', 'done', 'error' ou 'unknown'. Job d'un autre worker : statut publié dans le cache
+# partagé, ou rapport cherché par sa clé ; 'unknown' si ni l'un ni l'autre n'est (encore) visible
+def status(job):
+    known = _jobs.get(job['id'])
+    if known is not None:
+        return known['status']
+    if figure_cache.get(job['key']) is not figure_cache.MISSING:
+        return 'done'
+    shared = figure_cache.get_shared(_status_key(job['id']))
+    return shared['status'] if shared is not figure_cache.MISSING else 'unknown'
+
+
+# Un job au statut inconnu peut encore aboutir sur un autre worker : attente bornée par POLL_TIMEOUT
+def expired(job):
+    return time.time() - job.get('submitted', 0) > POLL_TIMEOUT
+
+
+# Octets du PDF d'un job terminé (None si indisponible)
+def result(job):
+    pdf = figure_cache.get(job['key'])
+    return None if pdf is figure_cache.MISSING else pdf
+
+
+# Statistiques de boîte à moustaches pondérées par les effectifs du cube (une boîte par sentiment)
+def _box_stats(cube):
+    stats = []
+    rated = cube.dropna(subset=['sentiment', 'rating'])
+    for sentiment in aggregates.SENTIMENTS:
+        counts = rated[rated['sentiment'] == sentiment].groupby('rating')['count'].sum().sort_index()
+        if counts.empty:
+            continue
+        ratings = counts.index.to_numpy(dtype=float)
+        cumulative = counts.cumsum().to_numpy() / counts.sum()
+        q1, median, q3 = (ratings[np.searchsorted(cumulative, q)] for q in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        stats.append({
+            'label': sentiment, 'q1': q1, 'med': median, 'q3': q3,
+            'whislo': ratings[ratings >= q1 - 1.5 * iqr].min(), 'whishi': ratings[ratings <= q3 + 1.5 * iqr].max(),
+            'mean': float((ratings * counts.to_numpy()).sum() / counts.sum()), 'fliers': [],
+        })
+    return stats
+
+
+# Spécifications des graphiques du rapport, construites uniquement à partir des agrégats en cache
+def chart_specs(filters, language):
+    ts = sentiment_translations.get(language, sentiment_translations['fr'])
+    tf = frequence_translations.get(language, frequence_translations['fr'])
+    td = distribution_translations.get(language, distribution_translations['fr'])
+    rating_label = 'Note' if language == 'fr' else 'Rating'
+    count_label = 'Nombre de Commentaires' if language == 'fr' else 'Number of Comments'
+
+    cube = aggregates.get_cube(filters)
+    if aggregates.total(cube) == 0:
+        return {}
+    rating_counts = aggregates.rating_counts(cube)
+    sentiment_counts = aggregates.sentiment_counts(cube)
+    crosstab = aggregates.sentiment_by_rating(cube).reindex(aggregates.SENTIMENTS, fill_value=0)
+    freq, series = aggregates.time_series(cube, (filters or {}).get('date_range'))
+    timestamps = series['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist()
+    word_freq, _ = word_index.top_words(filters, top_n=15)
+    sentiment_names = {'positive': 'Positif', 'neutral': 'Neutre', 'negative': 'Négatif'} if language == 'fr' else {}
+
+    return {
+        'ratings': {'kind': 'bar', 'title': f"{ts['bar_chart_title']} (Moyenne: {aggregates.mean_rating(cube):.2f})",
+                    'x': [float(x) for x in rating_counts.index], 'y': [int(y) for y in rating_counts.values],
+                    'xlabel': rating_label, 'ylabel': count_label},
+        'sentiments': {'kind': 'pie', 'title': ts['pie_chart_title'],
+                       'labels': list(sentiment_counts.index), 'values': [int(v) for v in sentiment_counts.values]},
+        'sentiment_by_rating': {'kind': 'stacked', 'title': ts['stacked_bar_chart_title'],
+                                'x': [float(x) for x in crosstab.columns], 'labels': sentiment_names,
+                                'series': {s: [int(v) for v in crosstab.loc[s].values] for s in crosstab.index},
+                                'xlabel': rating_label, 'ylabel': count_label},
+        'timeline': {'kind': 'line', 'title': f"{ts['line_chart_title']} ({ts['time_bins'][freq]})",
+                     'x': timestamps, 'y': series['counts'].astype(int).tolist(),
+                     'trend': series['trend'].astype(float).tolist(), 'label': ts['time_bins'][freq], 'ylabel': count_label},
+        'cumulative': {'kind': 'area', 'title': ts['area_chart_title'],
+                       'x': timestamps, 'y': series['cumulative'].astype(int).tolist()},
+        'top_words': {'kind': 'barh', 'title': tf['wordfreq_title'],
+                      'x': list(word_freq.index), 'y': [int(v) for v in word_freq.values]},
+        'heatmap': {'kind': 'heatmap', 'title': tf['heatmap_title'],
+                    'x': [float(x) for x in crosstab.columns], 'y': list(crosstab.index),
+                    'z': crosstab.to_numpy().tolist(), 'xlabel': rating_label},
+        'distribution': {'kind': 'box', 'title': td['boxplot_title'], 'stats': _box_stats(cube), 'ylabel': rating_label},
+    }
+
+
+# Images PNG des graphiques du rapport, chacune en cache par (graphique, filtres, langue, version des données) ;
+# seules les images manquantes sont rendues, en parallèle dans le pool de processus
+def chart_images(filters, language):
+    images = {}
+    missing = {}
+    for name in REPORT_CHARTS:
+        key = figure_cache.make_key(f'report-chart:{name}', filters, language)
+        image = figure_cache.get(key)
+        if image is figure_cache.MISSING:
+            missing[name] = key
+        else:
+            images[name] = image
+    if missing:
+        start = time.perf_counter()
+        specs = chart_specs(filters, language)
+        futures = {name: _get_chart_pool().submit(report_charts.render, specs[name]) for name in missing if name in specs}
+        for name, future in futures.items():
+            images[name] = future.result()
+            figure_cache.put(missing[name], images[name])
+        print(f"✅ {len(futures)} graphiques du rapport rendus en {time.perf_counter() - start:.2f}s")
+    return [(name, images[name]) for name in REPORT_CHARTS if name in images]
@@ -1,18 +1,25 @@
+import os
 import pandas as pd
 import re
 from fastapi import FastAPI
 from pydantic import BaseModel
-from googletrans import Translator
 from textblob import TextBlob
-import joblib
 import numpy as np
 from langdetect import detect, DetectorFactory
-from typing import Dict
+from typing import Dict, Any
 from fastapi.middleware.cors import CORSMiddleware
+import comment_features
+import fast_scorer
 
 # Fixer la graine pour langdetect
 DetectorFactory.seed = 0
 
+# Traduction désactivable (SENTIMENT_TRANSLATION=0) : tests de charge sans appel au service de traduction,
+# le texte est alors analysé dans sa langue d'origine
+TRANSLATION_ENABLED = os.getenv("SENTIMENT_TRANSLATION", "1") == "1"
+if TRANSLATION_ENABLED:
+    from googletrans import Translator
+
 # Initialiser FastAPI
 app = FastAPI(title="Sentiment Analysis API", description="API pour prédire le sentiment des commentaires avec texte et emojis.")
 
@@ -29,24 +36,21 @@ app.add_middleware(
 class CommentRequest(BaseModel):
     comment: str
 
-# Charger le dictionnaire des emojis
-emoji_data = pd.read_csv('Emoji_Sentiment_Data.csv')
-
-def create_emoji_sentiment_dict(emoji_df):
-    emoji_dict = {}
-    for _, row in emoji_df.iterrows():
-        emoji = row['Emoji']
-        total = row['Negative'] + row['Neutral'] + row['Positive']
-        if total > 0:
-            score = (row['Positive'] - row['Negative']) / total
-            emoji_dict[emoji] = score
-    return emoji_dict
-
-emoji_sentiment = create_emoji_sentiment_dict(emoji_data)
-
-# Charger le modèle et le vectoriseur
-model = joblib.load('sentiment_model.pkl')
-vectorizer = joblib.load('tfidf_vectorizer.pkl')
+# Charger le dictionnaire des emojis (partagé avec comment_features)
+emoji_sentiment = comment_features.load_emoji_sentiment()
+
+# Charger le modèle : scorer NumPy exporté (python fast_scorer.py export) s'il existe et correspond aux .pkl,
+# sinon modèle et vectoriseur scikit-learn (joblib et scikit-learn ne sont alors importés que dans ce cas)
+SCORER_PATH = os.getenv("SENTIMENT_SCORER_PATH", fast_scorer.SCORER_PATH)
+scorer = model = vectorizer = None
+if os.path.exists(SCORER_PATH) and fast_scorer.is_current(SCORER_PATH):
+    scorer = fast_scorer.load(SCORER_PATH)
+else:
+    import joblib
+    model = joblib.load(fast_scorer.MODEL_PATH)
+    vectorizer = joblib.load(fast_scorer.VECTORIZER_PATH)
+    reason = "périmé (.pkl réentraînés sans nouvel export)" if os.path.exists(SCORER_PATH) else "introuvable"
+    print(f"ℹ️ Scorer {reason} ({SCORER_PATH}) : prédiction par scikit-learn")
 
 # Fonction pour extraire les emojis
 def extract_emojis(text):
@@ -84,7 +88,7 @@ def translate_to_english(text):
         return ''
     try:
         lang = detect(text)
-        if lang == 'en':
+        if lang == 'en' or not TRANSLATION_ENABLED:
             return text
         translated = Translator().translate(text, src=lang, dest='en').text
         if len(translated.split()) < 2 and not translated.isalpha():
@@ -123,24 +127,31 @@ def combine_sentiments(text_sentiment, emoji_sentiment):
         return 'negative'
     return text_sentiment
 
-# Pipeline de prédiction
-def predict_sentiment(comment):
-    emoji_score = get_emoji_score(comment)
+# Pipeline de prédiction (`emoji_score` fourni par l'appelant s'il est déjà calculé)
+def predict_sentiment(comment, emoji_score=None):
+    if emoji_score is None:
+        emoji_score = get_emoji_score(comment)
     emoji_sentiment = get_emoji_sentiment(emoji_score)
     cleaned_comment = clean_text(comment)
     translated_comment = translate_to_english(cleaned_comment)
     text_sentiment = get_text_sentiment(translated_comment)
     combined_sentiment = combine_sentiments(text_sentiment, emoji_sentiment)
-    text_tfidf = vectorizer.transform([translated_comment]).toarray()
-    features = np.hstack((text_tfidf, [[emoji_score * 0.5]]))
-    model_prediction = model.predict(features)[0]
+    if scorer is not None:
+        model_prediction = scorer.predict(translated_comment, [emoji_score * 0.5])
+    else:
+        text_tfidf = vectorizer.transform([translated_comment]).toarray()
+        features = np.hstack((text_tfidf, [[emoji_score * 0.5]]))
+        model_prediction = model.predict(features)[0]
     return combined_sentiment if combined_sentiment != model_prediction else model_prediction
 
-# Endpoint pour prédire le sentiment
+# Endpoint pour prédire le sentiment ; les caractéristiques dérivées sont renvoyées pour être
+# enregistrées avec le commentaire (colonnes de comment_features) au lieu d'être recalculées ensuite
 @app.post("/predict_feedback")
-async def predict(request: CommentRequest) -> Dict[str, str]:
-    sentiment = predict_sentiment(request.comment)
-    return {"comment": request.comment, "sentiment": sentiment}
+async def predict(request: CommentRequest) -> Dict[str, Any]:
+    emoji_score = get_emoji_score(request.comment)
+    sentiment = predict_sentiment(request.comment, emoji_score)
+    features = comment_features.compute_features(request.comment, score=emoji_score)
+    return {"comment": request.comment, "sentiment": sentiment, "features": features}
 
 if __name__ == "__main__":
     import uvicorn
@@ -4,7 +4,8 @@ import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
-from data_utils import get_feedback_data
+import figure_cache
+import aggregates
 
 # Dictionnaire de traductions (à synchroniser avec app.py)
 translations = {
@@ -14,7 +15,8 @@ translations = {
         'pie_chart_title': 'Répartition par Sentiment',
         'stacked_bar_chart_title': 'Notes par Sentiment',
         'line_chart_title': 'Évolution du Nombre de Commentaires',
-        'area_chart_title': 'Évolution Cumulative des Commentaires'
+        'area_chart_title': 'Évolution Cumulative des Commentaires',
+        'time_bins': {'h': 'par heure', 'D': 'par jour', 'W-MON': 'par semaine', 'MS': 'par mois', 'QS': 'par trimestre', 'YS': 'par année'}
     },
     'en': {
         'sentiments_title': 'Sentiments',
@@ -22,14 +24,14 @@ translations = {
         'pie_chart_title': 'Sentiment Distribution',
         'stacked_bar_chart_title': 'Ratings by Sentiment',
         'line_chart_title': 'Evolution of Comment Count',
-        'area_chart_title': 'Cumulative Evolution of Comments'
+        'area_chart_title': 'Cumulative Evolution of Comments',
+        'time_bins': {'h': 'per hour', 'D': 'per day', 'W-MON': 'per week', 'MS': 'per month', 'QS': 'per quarter', 'YS': 'per year'}
     }
 }
 
 def layout():
     return html.Div([
         html.H2(id='sentiments-title', className="text-center mb-4", style={"color": "#2c3e50", "font-family": "Roboto, sans-serif", "font-weight": "bold"}),
-        dcc.Store(id='sentiment-data-store'),
         dbc.Row([
             dbc.Col(dcc.Graph(id='bar-chart'), width=4, className="sentiment-graph-col"),
             dbc.Col(dcc.Graph(id='pie-chart'), width=4, className="sentiment-graph-col"),
@@ -47,23 +49,30 @@ def layout():
      Output('pie-chart', 'figure'),
      Output('stacked-bar-chart', 'figure'),
      Output('line-chart', 'figure'),
-     Output('area-chart', 'figure'),
-     Output('sentiment-data-store', 'data')],
+     Output('area-chart', 'figure')],
     [Input('filters-store', 'data'),
      Input('language-store', 'data'),
-     Input('interval-component', 'n_intervals')]  # Déclencheur d'intervalle
+     Input('data-version', 'data')]  # Déclenché uniquement si les données changent
 )
+@figure_cache.memoize('sentiments')  # Figures réutilisées tant que filtres, langue et données sont inchangés
 def update_sentiment_charts(filters, language, real_time_update):
     t = translations.get(language, translations['fr'])  # Par défaut à 'fr' si language est None
 
-    df = get_feedback_data(filters)
-    if df.empty:
-        return [t['sentiments_title']] + [go.Figure()] * 5 + [{}]
+    # Cube heure (ou jour, au-delà de quelques semaines) × sentiment × note partagé avec les autres onglets (données chargées seulement s'il n'est pas en cache)
+    cube = aggregates.get_cube(filters)
+    if aggregates.total(cube) == 0:
+        return [t['sentiments_title']] + [go.Figure()] * 5
 
-    df['timestamp'] = pd.to_datetime(df['timestamp']).dt.date
+    date_range = (filters or {}).get('date_range')
+    return [t['sentiments_title']] + build_sentiment_figures(cube, language, date_range)
+
+# Construction des figures à partir du cube agrégé uniquement : coût indépendant du nombre de commentaires
+def build_sentiment_figures(cube, language, date_range=None):
+    t = translations.get(language, translations['fr'])
+    crosstab = aggregates.sentiment_by_rating(cube).reindex(aggregates.SENTIMENTS, fill_value=0)
 
     # Graphique 1: Diagramme en barres
-    bar_data = df['rating'].value_counts().sort_index()
+    bar_data = aggregates.rating_counts(cube)
     bar_fig = go.Figure(
         data=[go.Bar(
             x=bar_data.index,
@@ -73,7 +82,7 @@ def update_sentiment_charts(filters, language, real_time_update):
             textposition='auto'
         )],
         layout=go.Layout(
-            title=f"{t['bar_chart_title']} (Moyenne: {df['rating'].mean():.2f})",
+            title=f"{t['bar_chart_title']} (Moyenne: {aggregates.mean_rating(cube):.2f})",
             xaxis={'title': 'Notes' if language == 'fr' else 'Ratings', 'tickmode': 'linear'},
             yaxis={'title': 'Nombre de Commentaires' if language == 'fr' else 'Number of Comments'},
             template='plotly_white',
@@ -89,23 +98,26 @@ def update_sentiment_charts(filters, language, real_time_update):
 
     # Graphique 2: Diagramme circulaire
     sentiment_colors = {'positive': '#27AE60', 'neutral': '#F39C12', 'negative': '#E74C3C'}  # Couleurs caractéristiques
-    pie_fig = px.pie(
-        df,
-        names='sentiment',
-        title=t['pie_chart_title'],
-        hole=0.3,
-        color='sentiment',
-        color_discrete_map=sentiment_colors,
-        height=300
+    sentiment_data = aggregates.sentiment_counts(cube)
+    dominant_sentiment = sentiment_data.idxmax() if not sentiment_data.empty else None
+    pie_fig = go.Figure(
+        data=[go.Pie(
+            labels=sentiment_data.index,
+            values=sentiment_data.values,
+            hole=0.3,
+            marker_colors=[sentiment_colors.get(s, '#3498DB') for s in sentiment_data.index],
+            textinfo='percent+label',
+            pull=[0.1 if s == dominant_sentiment else 0 for s in sentiment_data.index]  # Une entrée par sentiment
+        )],
+        layout=go.Layout(title=t['pie_chart_title'], height=300)
     )
-    pie_fig.update_traces(textinfo='percent+label', pull=[0.1 if s == df['sentiment'].mode()[0] else 0 for s in df['sentiment']])
 
     # Graphique 3: Diagramme en barres empilées
     stacked_fig = go.Figure(
         data=[
-            go.Bar(name='Positif' if language == 'fr' else 'Positive', x=df['rating'].value_counts().index, y=df[df['sentiment'] == 'positive']['rating'].value_counts().fillna(0), marker_color='#27AE60'),
-            go.Bar(name='Neutre' if language == 'fr' else 'Neutral', x=df['rating'].value_counts().index, y=df[df['sentiment'] == 'neutral']['rating'].value_counts().fillna(0), marker_color='#F39C12'),
-            go.Bar(name='Négatif' if language == 'fr' else 'Negative', x=df['rating'].value_counts().index, y=df[df['sentiment'] == 'negative']['rating'].value_counts().fillna(0), marker_color='#E74C3C')
+            go.Bar(name='Positif' if language == 'fr' else 'Positive', x=crosstab.columns, y=crosstab.loc['positive'].values, marker_color='#27AE60'),
+            go.Bar(name='Neutre' if language == 'fr' else 'Neutral', x=crosstab.columns, y=crosstab.loc['neutral'].values, marker_color='#F39C12'),
+            go.Bar(name='Négatif' if language == 'fr' else 'Negative', x=crosstab.columns, y=crosstab.loc['negative'].values, marker_color='#E74C3C')
         ],
         layout=go.Layout(
             title=t['stacked_bar_chart_title'],
@@ -119,30 +131,33 @@ def update_sentiment_charts(filters, language, real_time_update):
     )
 
     # Graphique 4: Graphique en ligne
-    line_data = df.groupby(df['timestamp']).size().reset_index(name='counts')
-    line_fig = px.line(
-        line_data,
-        x='timestamp',
-        y='counts',
-        title=t['line_chart_title'],
-        labels={'timestamp': 'Date', 'counts': 'Nombre de Commentaires' if language == 'fr' else 'Number of Comments'},
-        template='plotly_white',
-        height=300,
-        color_discrete_sequence=['#3498DB']
+    # Pas adapté à la période (heure, jour, semaine, mois...) : nombre de points borné, rendu WebGL
+    freq, series = aggregates.time_series(cube, date_range)
+    bin_label = t['time_bins'][freq]
+    line_fig = go.Figure(
+        data=[
+            go.Scattergl(x=series['timestamp'], y=series['counts'], mode='lines', name=bin_label, line=dict(color='#3498DB')),
+            go.Scattergl(x=series['timestamp'], y=series['trend'], mode='lines', name='Tendance', line=dict(color='#E74C3C', dash='dash'))
+        ],
+        layout=go.Layout(
+            title=f"{t['line_chart_title']} ({bin_label})",
+            xaxis={'title': 'Date'},
+            yaxis={'title': 'Nombre de Commentaires' if language == 'fr' else 'Number of Comments'},
+            template='plotly_white',
+            height=300
+        )
     )
-    line_fig.add_trace(go.Scatter(x=line_data['timestamp'], y=line_data['counts'].rolling(window=3).mean(), mode='lines', name='Tendance', line=dict(color='#E74C3C', dash='dash')))
     line_fig.add_annotation(
-        text=f"Moyenne: {line_data['counts'].mean():.2f}",
+        text=f"Moyenne: {series['counts'].mean():.2f}",
         xref="paper", yref="paper",
         x=0.95, y=0.95, showarrow=False, font=dict(color="#E74C3C")
     )
 
     # Graphique 5: Graphique en aires
-    area_data = df.groupby(df['timestamp']).size().cumsum().reset_index(name='cumulative_counts')
     area_fig = go.Figure(
-        data=[go.Scatter(
-            x=area_data['timestamp'],
-            y=area_data['cumulative_counts'],
+        data=[go.Scattergl(
+            x=series['timestamp'],
+            y=series['cumulative'],
             fill='tozeroy',
             mode='none',
             fillcolor='rgba(96, 125, 139, 0.5)'  # Gradient gris-bleu
@@ -157,9 +172,9 @@ def update_sentiment_charts(filters, language, real_time_update):
         )
     )
     area_fig.add_annotation(
-        text=f"Total: {area_data['cumulative_counts'].iloc[-1]}",
+        text=f"Total: {series['cumulative'].iloc[-1]}",
         xref="paper", yref="paper",
         x=0.95, y=0.95, showarrow=False
     )
 
-    return [t['sentiments_title']] + [bar_fig, pie_fig, stacked_fig, line_fig, area_fig] + [df.to_dict('records')]
\ No newline at end of file
+    return [bar_fig, pie_fig, stacked_fig, line_fig, area_fig]
\ No newline at end of file
@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from data_utils import get_engine
+from profiling import record_db
+import change_feed
+import comment_features
+
+# Instantané local de la table feedback chargée en mémoire, pour un redémarrage rapide des workers.
+# Au démarrage (wsgi.create_app, avant le fork), le processus charge le dernier instantané du disque puis ne lit
+# dans la base que le delta (id > plus grand id de l'instantané). Les colonnes numériques et horodatages sont
+# projetées en mémoire (np.load mmap_mode='r', lecture seule) : les workers d'une même machine partagent les
+# mêmes pages au lieu d'en garder chacun une copie ; les colonnes texte sont décodées une fois par processus.
+# Un nouvel instantané (lignes + cube horaire non filtré) est écrit au plus toutes les SNAPSHOT_INTERVAL
+# secondes, par un seul processus à la fois (verrou fichier). Si des lignes ont été modifiées ou supprimées en
+# base (compteur des UPDATE/DELETE de feedback_version différent de celui des données chargées, ou nombre de
+# lignes différent), la table est rechargée entièrement. Sans table feedback_version, seules les suppressions
+# sont détectées.
+# Activé par FEEDBACK_SNAPSHOT_DIR (ex. /tmp/feedback_snapshot) ; désactivé si la variable est vide.
+# Format Arrow (fichier Feather projeté en mémoire) si pyarrow est installé, sinon un fichier .npy par colonne.
+SNAPSHOT_DIR = os.getenv("FEEDBACK_SNAPSHOT_DIR", "")
+SNAPSHOT_INTERVAL = float(os.getenv("FEEDBACK_SNAPSHOT_INTERVAL", "300"))
+SNAPSHOT_KEEP = 2  # Instantanés conservés (l'ancien peut encore être projeté par des workers)
+
+try:
+    import pyarrow
+    import pyarrow.feather as feather
+except ImportError:
+    pyarrow = None
+
+# Colonnes texte à faible cardinalité : codes entiers projetés en mémoire + catégories dans meta.json
+CODED_COLUMNS = {'sentiment', 'language'}
+
+
+def _fetch(conn, after_id=0):
+    features = ", emojis, token_count, char_length" if comment_features.columns_available(conn) else ""
+    query = f"SELECT id, rating, sentiment, timestamp, language, unique_code, comment{features} FROM feedback WHERE id > :after_id"
+    query_start = time.perf_counter()
+    df = pd.read_sql_query(text(query), conn, params={'after_id': after_id})
+    record_db(time.perf_counter() - query_start, len(df))
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df = comment_features.fill_missing(df)
+    # Même ordre que get_feedback_data (plus récents d'abord)
+    return df.sort_values('timestamp', ascending=False, kind='stable').reset_index(drop=True)
+
+
+# Écriture colonne par colonne (format .npy) ; retourne la description des colonnes pour meta.json
+def _write_columns(df, path):
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        if name in CODED_COLUMNS:
+            codes, categories = pd.factorize(series, use_na_sentinel=True)
+            np.save(os.path.join(path, f"{name}.codes.npy"), codes.astype('int32'))
+            columns[name] = {'kind': 'coded', 'dtype': str(series.dtype), 'categories': [str(c) for c in categories]}
+        elif pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            np.save(os.path.join(path, f"{name}.npy"), series.to_numpy())
+            columns[name] = {'kind': 'array'}
+        else:
+            # Texte : chaîne UTF-8 concaténée + positions (en caractères) de chaque valeur
+            nulls = series.isna().to_numpy()
+            values = series.fillna('').astype(str).tolist()
+            offsets = np.zeros(len(values) + 1, dtype='int64')
+            np.cumsum([len(value) for value in values], out=offsets[1:])
+            np.save(os.path.join(path, f"{name}.data.npy"), np.frombuffer(''.join(values).encode('utf-8'), dtype='uint8'))
+            np.save(os.path.join(path, f"{name}.offsets.npy"), offsets)
+            np.save(os.path.join(path, f"{name}.nulls.npy"), nulls)
+            columns[name] = {'kind': 'text', 'dtype': str(series.dtype)}
+    return columns
+
+
+def _read_columns(path, columns):
+    data = {}
+    for name, spec in columns.items():
+        if spec['kind'] == 'array':
+            data[name] = pd.Series(np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r'), copy=False)
+        elif spec['kind'] == 'coded':
+            codes = np.load(os.path.join(path, f"{name}.codes.npy"), mmap_mode='r')
+            categories = np.array(spec['categories'] + [None], dtype=object)
+            data[name] = pd.Series(categories[codes], dtype=spec['dtype'])  # -1 (valeur nulle) -> None
+        else:
+            whole = np.load(os.path.join(path, f"{name}.data.npy"), mmap_mode='r').tobytes().decode('utf-8')
+            offsets = np.load(os.path.join(path, f"{name}.offsets.npy")).tolist()
+            nulls = np.load(os.path.join(path, f"{name}.nulls.npy"))
+            values = [whole[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+            series = pd.Series(values, dtype=object)
+            series[nulls] = None
+            data[name] = series.astype(spec['dtype'])
+    return pd.DataFrame(data, copy=False)
+
+
+def _write_frame(df, path, name):
+    if pyarrow is not None:
+        # Feather non compressé : projetable en mémoire à la lecture
+        feather.write_feather(df, os.path.join(path, f"{name}.arrow"), compression='uncompressed')
+        return {'format': 'arrow'}
+    folder = os.path.join(path, name)
+    os.makedirs(folder)
+    return {'format': 'npy', 'columns': _write_columns(df, folder)}
+
+
+def _read_frame(path, name, spec):
+    if spec['format'] == 'arrow':
+        return feather.read_table(os.path.join(path, f"{name}.arrow"), memory_map=True).to_pandas()
+    return _read_columns(os.path.join(path, name), spec['columns'])
+
+
+class FeedbackSnapshot:
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.base = None  # Lignes de l'instantané (colonnes projetées en mémoire)
+        self.base_cube = None
+        self.delta = None  # Lignes arrivées depuis (copie privée, petite)
+        self.high_water_id = 0
+        self.row_count = 0
+        self.snapshot_time = 0
+        self.modifications = None  # change_feed.modification_count() au moment de la lecture des lignes
+        self.version = None
+
+    def _load_snapshot(self):
+        try:
+            with open(os.path.join(self.directory, 'CURRENT')) as f:
+                path = os.path.join(self.directory, f.read().strip())
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            base = _read_frame(path, 'feedback', meta['feedback'])
+            base_cube = _read_frame(path, 'cube', meta['cube'])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"ℹ️ Aucun instantané utilisable ({e}), chargement complet")
+            return False
+        self.base, self.base_cube, self.delta = base, base_cube, base.iloc[:0]
+        self.high_water_id = meta['high_water_id']
+        self.row_count = meta['row_count']
+        self.snapshot_time = meta['created']
+        self.modifications = meta.get('modifications')
+        print(f"✅ Instantané chargé : {self.row_count} lignes (id ≤ {self.high_water_id})")
+        return True
+
+    # Écrit l'instantané dans un nouveau dossier puis bascule CURRENT (remplacement atomique)
+    def _write_snapshot(self, df, cube, modifications):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, 'lock'), 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None  # Un autre processus de la machine écrit déjà
+            start = time.perf_counter()
+            name = f"snapshot-{int(time.time() * 1000)}-{os.getpid()}"
+            path = os.path.join(self.directory, name)
+            os.makedirs(path)
+            meta = {
+                'high_water_id': int(df['id'].max()) if len(df) else 0,
+                'row_count': len(df),
+                'created': time.time(),
+                'modifications': modifications,
+                'feedback': _write_frame(df, path, 'feedback'),
+                'cube': _write_frame(cube, path, 'cube'),
+            }
+            with open(os.path.join(path, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            with open(os.path.join(self.directory, 'CURRENT.tmp'), 'w') as f:
+                f.write(name)
+            os.replace(os.path.join(self.directory, 'CURRENT.tmp'), os.path.join(self.directory, 'CURRENT'))
+            previous = sorted(entry for entry in os.listdir(self.directory) if entry.startswith('snapshot-'))
+            for entry in previous[:-SNAPSHOT_KEEP]:
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+            print(f"✅ Instantané écrit : {len(df)} lignes en {time.perf_counter() - start:.2f}s")
+            return path
+
+    def _full_load(self, conn):
+        from aggregates import build_cube
+        # Lu avant les lignes : une modification pendant la lecture déclenchera le rechargement suivant
+        modifications = change_feed.modification_count(conn)
+        df = _fetch(conn)
+        cube = build_cube(df)
+        self._reset()
+        if self._write_snapshot(df, cube, modifications) and self._load_snapshot():
+            return
+        # Écriture impossible ou en cours ailleurs : données gardées en mémoire privée
+        self.base, self.base_cube, self.delta = df, cube, df.iloc[:0]
+        self.high_water_id = int(df['id'].max()) if len(df) else 0
+        self.row_count = len(df)
+        self.modifications = modifications
+
+    # Mise à jour une fois par version des données : delta depuis le plus grand id connu
+    def refresh(self):
+        version = change_feed.current_version()
+        if self.version == version and self.base is not None:
+            return
+        with self._lock:
+            if self.version == version and self.base is not None:
+                return
+            if self.base is None:
+                self._load_snapshot()
+            with get_engine().connect() as conn:
+                modifications = change_feed.modification_count(conn)
+                if self.base is None:
+                    self._full_load(conn)
+                elif modifications is not None and modifications != self.modifications:
+                    print("ℹ️ Lignes modifiées ou supprimées depuis l'instantané, rechargement complet")
+                    self._full_load(conn)
+                else:
+                    delta = _fetch(conn, self.high_water_id)
+                    if not delta.empty:
+                        self.delta = pd.concat([delta, self.delta], ignore_index=True).sort_values(
+                            'timestamp', ascending=False, kind='stable').reset_index(drop=True)
+                        self.high_water_id = int(delta['id'].max())
+                        self.row_count += len(delta)
+                    expected_rows = conn.execute(text("SELECT COUNT(*) FROM feedback")).scalar()
+                    if expected_rows != self.row_count:
+                        print("ℹ️ Lignes supprimées depuis l'instantané, rechargement complet")
+                        self._full_load(conn)
+                    elif len(self.delta) and time.time() - self.snapshot_time > SNAPSHOT_INTERVAL:
+                        if self._write_snapshot(self._frame(), self._cube(), self.modifications):
+                            self._load_snapshot()  # Les lignes du delta passent dans la partie partagée
+            self.version = version
+
+    # Parties de la table (instantané, delta) triées par date décroissante : à filtrer séparément
+    def parts(self):
+        self.refresh()
+        return [self.delta, self.base] if len(self.delta) else [self.base]
+
+    def _frame(self):
+        return pd.concat([self.delta, self.base], ignore_index=True) if len(self.delta) else self.base
+
+    def _cube(self):
+        from aggregates import build_cube
+        if not len(self.delta):
+            return self.base_cube
+        merged = pd.concat([self.base_cube, build_cube(self.delta)], ignore_index=True)
+        return (merged.groupby(['hour', 'sentiment', 'rating'], dropna=False)['count']
+                      .sum()
+                      .reset_index())
+
+    def frame(self):
+        self.refresh()
+        return self._frame()
+
+    # Cube horaire non filtré : cube de l'instantané + cube du delta (comptes additifs)
+    def cube(self):
+        self.refresh()
+        return self._cube()
+
+
+feedback_snapshot = FeedbackSnapshot(SNAPSHOT_DIR) if SNAPSHOT_DIR else None
@@ -0,0 +1,20 @@
+import os
+import sys
+import pytest
+
+# Mesures des budgets de performance (benchmarks/check_budgets.py), faites une seule fois par session
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+from benchmarks import check_budgets
+
+
+@pytest.fixture(scope='session')
+def budget_config():
+    return check_budgets.load_config(os.getenv("PERF_BUDGETS", check_budgets.BUDGETS_PATH))
+
+
+@pytest.fixture(scope='session')
+def measures(budget_config):
+    data_dir = os.getenv("BENCHMARK_DATA_DIR", "/tmp/feedback_bench")
+    return check_budgets.measure(budget_config['rows'], data_dir)
@@ -0,0 +1,19 @@
+import os
+import pytest
+from benchmarks import check_budgets
+
+# Un test par budget de benchmarks/budgets.json : dépassement (tolérance comprise) ou mesure manquante = échec,
+# sauf mesure autorisée à manquer (PERF_ALLOW_MISSING=nom1,nom2)
+# Usage : python -m pytest tests/perf
+BUDGETS = check_budgets.load_config(os.getenv("PERF_BUDGETS", check_budgets.BUDGETS_PATH))['budgets']
+
+
+@pytest.mark.parametrize('name', sorted(BUDGETS))
+def test_budget(name, budget_config, measures):
+    result = check_budgets.check_one(name, budget_config['budgets'][name], measures.get(name), budget_config['tolerance'],
+                                     check_budgets.allowed_missing())
+    if result['status'] == 'skipped':
+        pytest.skip(f"{name} non mesuré (autorisé par PERF_ALLOW_MISSING)")
+    assert result['status'] != 'missing', f"{name} non mesuré : ajouter à PERF_ALLOW_MISSING si c'est attendu"
+    assert result['status'] == 'ok', (f"{name} = {result['value']} dépasse le budget {result['budget']} "
+                                      f"(limite {result['limit']} avec {int(budget_config['tolerance'] * 100)}% de tolérance)")
@@ -0,0 +1,40 @@
+import time
+import pandas as pd
+from sqlalchemy import text
+from data_utils import get_engine
+from profiling import record_db
+import figure_cache
+
+# Historique d'un répondant (unique_code) lu via l'index feedback(unique_code, timestamp) :
+# une recherche indexée par répondant, sans charger ni parcourir la table complète.
+# Mis en cache par code et version des données (invalidé dès qu'une ligne est ajoutée ou modifiée).
+
+SENTIMENT_SCORES = {'positive': 1, 'neutral': 0, 'negative': -1}
+TREND_WINDOW = 3
+
+
+def _load_timeline(unique_code):
+    query = """
+        SELECT id, timestamp, rating, sentiment, language, comment
+        FROM feedback
+        WHERE unique_code = :unique_code
+        ORDER BY timestamp
+    """
+    query_start = time.perf_counter()
+    with get_engine().connect() as conn:
+        df = pd.read_sql_query(text(query), conn, params={'unique_code': unique_code})
+    record_db(time.perf_counter() - query_start, len(df))
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    # Tendance du sentiment : moyenne glissante des scores (+1 positif, 0 neutre, -1 négatif)
+    df['sentiment_score'] = df['sentiment'].map(SENTIMENT_SCORES)
+    df['sentiment_trend'] = df['sentiment_score'].rolling(window=TREND_WINDOW, min_periods=1).mean()
+    return df
+
+
+def get_user_timeline(unique_code):
+    key = figure_cache.make_key('user-timeline', {'unique_code': unique_code}, '')
+    timeline = figure_cache.get(key)
+    if timeline is figure_cache.MISSING:
+        timeline = _load_timeline(unique_code)
+        figure_cache.put(key, timeline)
+    return timeline
@@ -0,0 +1,190 @@
+import re
+import time
+import threading
+from collections import Counter, defaultdict
+import pandas as pd
+from sqlalchemy import text
+from data_utils import get_engine, get_feedback_data
+from profiling import record_db
+import change_feed
+
+# Index des fréquences de mots maintenu de façon incrémentale.
+# Les comptes sont rangés par seau (jour, sentiment, langue, note) et mis à jour avec les nouveaux
+# commentaires (id > dernier id indexé) ; le top N d'une fenêtre de filtres fusionne les seaux concernés
+# au lieu de re-tokeniser tout le corpus ; seuls les jours de bordure d'un intervalle de dates couvert en partie
+# sont comptés sur leurs lignes. Si des lignes ont été modifiées ou supprimées (compteur des UPDATE/DELETE de
+# feedback_version, change_feed.modification_count, ou nombre de lignes différent), l'index est reconstruit ;
+# sans table feedback_version seules les suppressions sont détectées.
+
+STOP_WORDS = {
+    # Français
+    'au', 'aux', 'avec', 'ce', 'ces', 'cet', 'cette', 'dans', 'de', 'des', 'du', 'elle', 'en', 'et', 'eux',
+    'il', 'ils', 'je', 'la', 'le', 'les', 'leur', 'lui', 'ma', 'mais', 'me', 'mes', 'moi', 'mon', 'ne', 'nos',
+    'notre', 'nous', 'on', 'ou', 'par', 'pas', 'pour', 'qu', 'que', 'qui', 'sa', 'se', 'ses', 'son', 'sur',
+    'ta', 'te', 'tes', 'toi', 'ton', 'tu', 'un', 'une', 'vos', 'votre', 'vous', 'est', 'sont', 'suis', 'es',
+    'été', 'être', 'ai', 'as', 'avons', 'avez', 'ont', 'avoir', 'était', 'étais', 'fait', 'faire', 'très',
+    'plus', 'tout', 'tous', 'toutes', 'aussi', 'bien', 'ça', 'cela', 'ceci', 'donc', 'car', 'comme', 'si', 'là',
+    'y', 'à', 'où', 'quand', 'peu', 'trop', 'ni', 'même', 'faut',
+    # Anglais
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'been', 'but', 'by', 'can', 'did', 'do', 'does', 'for', 'from',
+    'had', 'has', 'have', 'he', 'her', 'him', 'his', 'how', 'if', 'in', 'into', 'is', 'it', 'its', 'just',
+    'me', 'my', 'no', 'not', 'of', 'on', 'or', 'our', 'out', 'she', 'so', 'than', 'that', 'the', 'their',
+    'them', 'then', 'there', 'these', 'they', 'this', 'to', 'too', 'up', 'us', 'very', 'was', 'we', 'were',
+    'what', 'when', 'where', 'which', 'who', 'will', 'with', 'would', 'you', 'your', 'i', 'am', 'all',
+}
+
+DAY = pd.Timedelta(days=1)
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]{2,}", re.UNICODE)  # Lettres uniquement (accents inclus), 2 caractères min.
+
+
+# Tokenisation FR/EN : minuscules, découpage sur tout caractère non alphabétique (l'hôpital -> hôpital)
+def tokenize(comment, remove_stop_words=True):
+    if not comment or not isinstance(comment, str):
+        return []
+    tokens = _TOKEN_PATTERN.findall(comment.lower())
+    if remove_stop_words:
+        return [token for token in tokens if token not in STOP_WORDS]
+    return tokens
+
+
+# Nombre de mots bruts (séparés par des espaces), comme l'affichage "Total Mots" d'origine
+def count_words(comment):
+    if not comment or not isinstance(comment, str):
+        return 0
+    return len(comment.split())
+
+
+class WordIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.buckets = defaultdict(Counter)
+        self.totals = defaultdict(int)
+        self.high_water_id = 0
+        self.row_count = 0
+        self.modifications = None  # change_feed.modification_count() lors de la dernière lecture
+        self.version = None
+
+    def _fetch(self, conn, after_id):
+        query = """
+            SELECT id, comment, sentiment, language, rating, timestamp
+            FROM feedback
+            WHERE id > :after_id
+            ORDER BY id
+        """
+        query_start = time.perf_counter()
+        df = pd.read_sql_query(text(query), conn, params={'after_id': after_id})
+        record_db(time.perf_counter() - query_start, len(df))
+        return df
+
+    def _add_rows(self, df):
+        if df.empty:
+            return
+        days = pd.to_datetime(df['timestamp']).dt.strftime('%Y-%m-%d')
+        ratings = pd.to_numeric(df['rating'], errors='coerce')
+        for comment, day, sentiment, language, rating in zip(df['comment'], days, df['sentiment'], df['language'], ratings):
+            key = (day, sentiment, language, None if pd.isna(rating) else float(rating))
+            self.buckets[key].update(tokenize(comment))
+            self.totals[key] += count_words(comment)
+        self.high_water_id = max(self.high_water_id, int(df['id'].max()))
+        self.row_count += len(df)
+
+    # Met l'index à jour si la version des données a changé
+    def refresh(self):
+        version = change_feed.current_version()
+        if self.version == version:
+            return
+        with self._lock:
+            if self.version == version:
+                return
+            with get_engine().connect() as conn:
+                # Lu avant les lignes : une modification pendant la lecture déclenchera la reconstruction suivante
+                modifications = change_feed.modification_count(conn)
+                delta = self._fetch(conn, self.high_water_id)
+                expected_rows = conn.execute(text("SELECT COUNT(*) FROM feedback")).scalar()
+            modified = modifications is not None and self.modifications is not None and modifications != self.modifications
+            if not modified and self.row_count + len(delta) == expected_rows:
+                self._add_rows(delta)
+            else:
+                # Mises à jour ou suppressions : reconstruction complète
+                self._reset()
+                with get_engine().connect() as conn:
+                    modifications = change_feed.modification_count(conn)
+                    self._add_rows(self._fetch(conn, 0))
+                print(f"✅ Index des mots reconstruit : {self.row_count} commentaires")
+            self.modifications = modifications
+            self.version = version
+
+    def _matches(self, key, filters):
+        day, sentiment, language, rating = key
+        if filters.get('language') and language not in filters['language']:
+            return False
+        if filters.get('sentiment') and sentiment not in filters['sentiment']:
+            return False
+        if filters.get('rating_range'):
+            low, high = filters['rating_range']
+            if rating is None or rating < low or rating > high:
+                return False
+        if filters.get('date_range'):
+            start, end = [pd.to_datetime(v) for v in filters['date_range']]
+            day_start = pd.Timestamp(day)
+            # Le seau (journée entière) doit être entièrement compris dans l'intervalle demandé ; les jours
+            # couverts en partie sont comptés sur leurs lignes (_edge_windows)
+            if day_start < start or day_start + DAY - pd.Timedelta(microseconds=1) > end:
+                return False
+        return True
+
+    # Fenêtres exactes des jours de début et de fin couverts en partie par date_range
+    @staticmethod
+    def _edge_windows(date_range):
+        start, end = [pd.to_datetime(v) for v in date_range]
+        if start > end:
+            return []
+        first_day, last_day = start.normalize(), end.normalize()
+        last_instant = lambda day: day + DAY - pd.Timedelta(microseconds=1)
+        if first_day == last_day:
+            return [] if start == first_day and end == last_instant(last_day) else [(start, end)]
+        windows = []
+        if start > first_day:
+            windows.append((start, last_instant(first_day)))
+        if end < last_instant(last_day):
+            windows.append((last_day, end))
+        return windows
+
+    # Top N des mots et nombre total de mots pour une fenêtre de filtres
+    def top_words(self, filters=None, top_n=20):
+        filters = filters or {}
+        if filters.get('text_search') or filters.get('unique_code'):
+            return self._search_top_words(filters, top_n)
+        self.refresh()
+        merged = Counter()
+        total_words = 0
+        with self._lock:
+            for key, counter in self.buckets.items():
+                if self._matches(key, filters):
+                    merged.update(counter)
+                    total_words += self.totals[key]
+        # Jours en bordure d'intervalle : mêmes bornes exactes que les graphiques de l'onglet
+        for window_start, window_end in self._edge_windows(filters['date_range']) if filters.get('date_range') else []:
+            edge = get_feedback_data(dict(filters, date_range=[str(window_start), str(window_end)]))
+            for comment in edge['comment']:
+                merged.update(tokenize(comment))
+                total_words += count_words(comment)
+        top = merged.most_common(top_n)
+        return pd.Series(dict(top), dtype='int64'), total_words
+
+    # Recherche texte ou code unique : les seaux ne savent pas filtrer par mot ni par répondant, on compte
+    # sur les seuls commentaires trouvés (les index SQL limitent le chargement aux lignes correspondantes)
+    @staticmethod
+    def _search_top_words(filters, top_n):
+        df = get_feedback_data(filters)
+        merged = Counter()
+        for comment in df['comment']:
+            merged.update(tokenize(comment))
+        total_words = int(df['token_count'].sum())  # Colonne précalculée (comment_features)
+        return pd.Series(dict(merged.most_common(top_n)), dtype='int64'), total_words
+
+
+word_index = WordIndex()
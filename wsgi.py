@@ -0,0 +1,38 @@
+import time
+import data_utils
+import change_feed
+import filter_metadata
+from word_index import word_index
+from projection import comment_projection
+from snapshot import feedback_snapshot
+
+# Point d'entrée WSGI (gunicorn -c gunicorn.conf.py wsgi:server).
+# create_app importe l'application et préchauffe les caches partagés avant le fork des workers.
+
+
+def create_app():
+    start = time.perf_counter()
+    from app import app
+    # Dash enregistre ses callbacks à la première requête : sous gthread, des premières requêtes simultanées
+    # dans un worker peuvent passer avant la fin de l'enregistrement (KeyError "Callback function not found").
+    # Une requête interne avant le fork fait cet enregistrement une seule fois, hérité par tous les workers.
+    with change_feed.preloading():
+        app.server.test_client().get('/health')
+    try:
+        if feedback_snapshot is not None:
+            # Instantané projeté en mémoire avant le fork : pages partagées par tous les workers
+            feedback_snapshot.refresh()
+        filter_metadata.get_filter_metadata()
+        word_index.refresh()
+        comment_projection.refresh()
+    except Exception as e:
+        # L'application démarre même si la base est momentanément indisponible
+        print(f"❌ Préchargement des caches impossible : {e}")
+    # Aucune connexion ouverte ne doit être héritée par les workers
+    data_utils.dispose_engine()
+    print(f"✅ Application préchargée en {time.perf_counter() - start:.2f}s")
+    return app
+
+
+app = create_app()
+server = app.server